@@ -0,0 +1,80 @@
+"""
+Apply the versioned SQL migrations in DB/migrations in order.
+
+Usage:
+    DATABASE_URL=postgresql://... python DB/migrate.py [--dry-run]
+
+Applied versions are recorded in public.schema_migrations. Files whose first line is
+"-- migrate:no-transaction" (e.g. CREATE INDEX CONCURRENTLY) run in autocommit mode;
+all others run inside a transaction together with their schema_migrations row.
+"""
+import os
+import sys
+import argparse
+import psycopg
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+
+
+def list_migrations():
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(f.split("_", 1)[0], os.path.join(MIGRATIONS_DIR, f)) for f in files]
+
+
+def applied_versions(conn):
+    conn.execute("""
+        create table if not exists public.schema_migrations (
+          version text primary key,
+          applied_at timestamp with time zone not null default now()
+        )
+    """)
+    return {row[0] for row in conn.execute("select version from public.schema_migrations")}
+
+
+def apply(conn, version, path):
+    with open(path, "r", encoding="utf-8") as f:
+        sql = f.read()
+
+    if sql.startswith(NO_TRANSACTION_MARKER):
+        # CONCURRENTLY statements must run one at a time outside a transaction block
+        for statement in split_statements(sql):
+            conn.execute(statement)
+        conn.execute("insert into public.schema_migrations (version) values (%s)", (version,))
+    else:
+        with conn.transaction():
+            conn.execute(sql)
+            conn.execute("insert into public.schema_migrations (version) values (%s)", (version,))
+
+
+def split_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only list pending migrations")
+    args = parser.parse_args(argv)
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("Error: DATABASE_URL not set.")
+        sys.exit(1)
+
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        done = applied_versions(conn)
+        pending = [(v, p) for v, p in list_migrations() if v not in done]
+
+        if not pending:
+            print("Database is up to date.")
+            return
+
+        for version, path in pending:
+            print(f"{'Pending' if args.dry_run else 'Applying'} {os.path.basename(path)}")
+            if not args.dry_run:
+                apply(conn, version, path)
+
+
+if __name__ == "__main__":
+    main()
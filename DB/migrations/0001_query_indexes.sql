@@ -0,0 +1,25 @@
+-- migrate:no-transaction
+-- Indexes for the query shapes ComicService actually issues.
+-- CONCURRENTLY so they can be built on a live database without blocking writes.
+
+-- get_characters_info: where user_id = ? order by affinity desc
+create index concurrently if not exists comic_character_user_affinity_idx
+  on public.comic_character (user_id, affinity desc);
+
+-- get_characters_info(comics_id=...), reorder_comic_characters:
+-- where user_id = ? and comics_id = ? order by affinity desc
+create index concurrently if not exists comic_character_user_comic_idx
+  on public.comic_character (user_id, comics_id, affinity desc);
+
+-- delete_comic: where comics_id = ? (also backs the comics_id foreign key)
+create index concurrently if not exists comic_character_comics_id_idx
+  on public.comic_character (comics_id);
+
+-- get_news_list_data: where user_id = ? and news_list = 'Y'
+-- Partial: only the few rows opted into news are indexed.
+create index concurrently if not exists comic_character_news_idx
+  on public.comic_character (user_id) include (comics_id, character_name)
+  where news_list = 'Y';
+
+-- photo_info needs no extra index: every access is "where id = ? [and num = ?] order by num",
+-- which the (id, num) primary key already serves.
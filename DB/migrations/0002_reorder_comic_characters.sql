@@ -0,0 +1,79 @@
+-- Apply a whole affinity ranking for one (user_id, comics_id) in a single transaction.
+-- Called from ComicService.reorder_comic_characters via supabase.rpc().
+--
+-- p_ranking: [{"id": 12, "affinity": 5}, {"id": 13, "affinity": 4}, ...]
+-- Returns the characters of the comic in their new order (affinity desc).
+create or replace function public.reorder_comic_characters(
+  p_user_id text,
+  p_comics_id bigint,
+  p_ranking jsonb
+)
+returns setof public.comic_character
+language plpgsql
+as $$
+declare
+  v_count integer;
+  v_distinct_ids integer;
+  v_distinct_affinity integer;
+  v_owned integer;
+  v_conflicts integer;
+begin
+  select count(*),
+         count(distinct (r->>'id')::bigint),
+         count(distinct (r->>'affinity')::bigint)
+    into v_count, v_distinct_ids, v_distinct_affinity
+    from jsonb_array_elements(p_ranking) as r;
+
+  if v_count = 0 then
+    raise exception 'ranking must not be empty';
+  end if;
+
+  if v_distinct_ids <> v_count then
+    raise exception 'ranking contains duplicate character ids';
+  end if;
+
+  -- "No duplicate rank" rule
+  if v_distinct_affinity <> v_count then
+    raise exception 'ranking contains duplicate affinity values';
+  end if;
+
+  -- Every character in the ranking must belong to this user's comic
+  select count(*)
+    into v_owned
+    from public.comic_character c
+    join jsonb_array_elements(p_ranking) as r on c.id = (r->>'id')::bigint
+   where c.user_id = p_user_id
+     and c.comics_id = p_comics_id;
+
+  if v_owned <> v_count then
+    raise exception 'ranking contains characters that do not belong to this user and comic';
+  end if;
+
+  -- Characters left out of the ranking must not end up sharing a rank with it
+  select count(*)
+    into v_conflicts
+    from public.comic_character c
+   where c.user_id = p_user_id
+     and c.comics_id = p_comics_id
+     and c.id not in (select (r->>'id')::bigint from jsonb_array_elements(p_ranking) as r)
+     and c.affinity in (select (r->>'affinity')::bigint from jsonb_array_elements(p_ranking) as r);
+
+  if v_conflicts > 0 then
+    raise exception 'ranking collides with the affinity of characters not included in it';
+  end if;
+
+  update public.comic_character c
+     set affinity = (r->>'affinity')::bigint
+    from jsonb_array_elements(p_ranking) as r
+   where c.id = (r->>'id')::bigint
+     and c.user_id = p_user_id
+     and c.comics_id = p_comics_id;
+
+  return query
+    select *
+      from public.comic_character
+     where user_id = p_user_id
+       and comics_id = p_comics_id
+     order by affinity desc, id;
+end;
+$$;
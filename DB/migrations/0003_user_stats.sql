@@ -0,0 +1,231 @@
+-- Incrementally maintained per-user statistics for /api/stats.
+-- Triggers on comics and comic_character keep the summary tables current, so reading
+-- stats is a handful of primary-key / LIMIT-1 index lookups regardless of library size.
+
+create table if not exists public.user_stats (
+  user_id text not null,
+  comics_count bigint not null default 0,
+  characters_count bigint not null default 0,
+  updated_at timestamp with time zone not null default now(),
+  constraint user_stats_pkey primary key (user_id)
+);
+
+create table if not exists public.user_author_stats (
+  user_id text not null,
+  author text not null,
+  comics_count bigint not null default 0,
+  constraint user_author_stats_pkey primary key (user_id, author)
+);
+create index if not exists user_author_stats_top_idx
+  on public.user_author_stats (user_id, comics_count desc);
+
+-- The current first-ranked (highest affinity) character of each comic
+create table if not exists public.comic_top_character (
+  comics_id bigint not null,
+  user_id text not null,
+  character_id bigint not null,
+  character_name character varying not null,
+  affinity bigint null,
+  constraint comic_top_character_pkey primary key (comics_id)
+);
+create index if not exists comic_top_character_user_idx
+  on public.comic_top_character (user_id, affinity desc nulls last);
+
+-- How many comics each character name is ranked first in, per user
+create table if not exists public.user_top_character_stats (
+  user_id text not null,
+  character_name character varying not null,
+  first_count bigint not null default 0,
+  constraint user_top_character_stats_pkey primary key (user_id, character_name)
+);
+create index if not exists user_top_character_stats_top_idx
+  on public.user_top_character_stats (user_id, first_count desc);
+
+
+create or replace function public.stats_bump_comic(p_user_id text, p_author text, p_delta bigint)
+returns void
+language plpgsql
+as $$
+begin
+  if p_user_id is null then
+    return;
+  end if;
+
+  insert into public.user_stats as s (user_id, comics_count)
+  values (p_user_id, greatest(p_delta, 0))
+  on conflict (user_id) do update
+    set comics_count = greatest(s.comics_count + p_delta, 0), updated_at = now();
+
+  if p_author is not null and p_author <> '' then
+    insert into public.user_author_stats as a (user_id, author, comics_count)
+    values (p_user_id, p_author, greatest(p_delta, 0))
+    on conflict (user_id, author) do update
+      set comics_count = greatest(a.comics_count + p_delta, 0);
+  end if;
+end;
+$$;
+
+create or replace function public.stats_refresh_comic_top(p_comics_id bigint)
+returns void
+language plpgsql
+as $$
+declare
+  v_old public.comic_top_character%rowtype;
+  v_new record;
+begin
+  select * into v_old from public.comic_top_character where comics_id = p_comics_id;
+
+  -- Served by comic_character_comics_id_idx; touches only this comic's characters
+  select id, user_id, character_name, affinity into v_new
+    from public.comic_character
+   where comics_id = p_comics_id
+   order by affinity desc nulls last, id
+   limit 1;
+
+  if v_old.comics_id is not null
+     and (v_new.id is null or v_old.character_name <> v_new.character_name or v_old.user_id <> v_new.user_id) then
+    update public.user_top_character_stats
+       set first_count = greatest(first_count - 1, 0)
+     where user_id = v_old.user_id and character_name = v_old.character_name;
+  end if;
+
+  if v_new.id is null then
+    delete from public.comic_top_character where comics_id = p_comics_id;
+    return;
+  end if;
+
+  if v_old.comics_id is null or v_old.character_name <> v_new.character_name or v_old.user_id <> v_new.user_id then
+    insert into public.user_top_character_stats as t (user_id, character_name, first_count)
+    values (v_new.user_id, v_new.character_name, 1)
+    on conflict (user_id, character_name) do update set first_count = t.first_count + 1;
+  end if;
+
+  insert into public.comic_top_character (comics_id, user_id, character_id, character_name, affinity)
+  values (p_comics_id, v_new.user_id, v_new.id, v_new.character_name, v_new.affinity)
+  on conflict (comics_id) do update
+    set user_id = excluded.user_id,
+        character_id = excluded.character_id,
+        character_name = excluded.character_name,
+        affinity = excluded.affinity;
+end;
+$$;
+
+create or replace function public.stats_comics_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.stats_bump_comic(old.user_id, old.author, -1);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.stats_bump_comic(new.user_id, new.author, 1);
+  end if;
+  return null;
+end;
+$$;
+
+create or replace function public.stats_comic_character_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into public.user_stats as s (user_id, characters_count) values (new.user_id, 1)
+    on conflict (user_id) do update set characters_count = s.characters_count + 1, updated_at = now();
+  elsif tg_op = 'DELETE' then
+    update public.user_stats
+       set characters_count = greatest(characters_count - 1, 0), updated_at = now()
+     where user_id = old.user_id;
+  elsif tg_op = 'UPDATE' and new.user_id is distinct from old.user_id then
+    -- Character reassigned to another user: move it between their counts
+    update public.user_stats
+       set characters_count = greatest(characters_count - 1, 0), updated_at = now()
+     where user_id = old.user_id;
+    insert into public.user_stats as s (user_id, characters_count) values (new.user_id, 1)
+    on conflict (user_id) do update set characters_count = s.characters_count + 1, updated_at = now();
+  end if;
+
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.stats_refresh_comic_top(old.comics_id);
+  end if;
+  if tg_op = 'INSERT' or (tg_op = 'UPDATE' and new.comics_id is distinct from old.comics_id) then
+    perform public.stats_refresh_comic_top(new.comics_id);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists comics_stats on public.comics;
+create trigger comics_stats
+  after insert or delete or update of user_id, author on public.comics
+  for each row execute function public.stats_comics_trigger();
+
+drop trigger if exists comic_character_stats on public.comic_character;
+create trigger comic_character_stats
+  after insert or delete or update of comics_id, user_id, character_name, affinity on public.comic_character
+  for each row execute function public.stats_comic_character_trigger();
+
+
+-- One round-trip read used by ComicService.get_user_stats
+create or replace function public.get_user_stats(p_user_id text)
+returns jsonb
+language sql
+stable
+as $$
+  select jsonb_build_object(
+    'user_id', p_user_id,
+    'comics_count', coalesce((select comics_count from public.user_stats where user_id = p_user_id), 0),
+    'characters_count', coalesce((select characters_count from public.user_stats where user_id = p_user_id), 0),
+    'top_author', (
+      select jsonb_build_object('author', author, 'comics_count', comics_count)
+        from public.user_author_stats
+       where user_id = p_user_id and comics_count > 0
+       order by comics_count desc
+       limit 1
+    ),
+    'top_first_character', (
+      select jsonb_build_object('character_name', character_name, 'first_count', first_count)
+        from public.user_top_character_stats
+       where user_id = p_user_id and first_count > 0
+       order by first_count desc
+       limit 1
+    ),
+    'first_ranked_characters', coalesce((
+      select jsonb_agg(t)
+        from (
+          select character_id, character_name, comics_id, affinity
+            from public.comic_top_character
+           where user_id = p_user_id
+           order by affinity desc nulls last
+           limit 5
+        ) t
+    ), '[]'::jsonb)
+  );
+$$;
+
+
+-- Backfill from existing rows
+insert into public.user_stats (user_id, comics_count)
+select user_id, count(*) from public.comics where user_id is not null group by user_id
+on conflict (user_id) do update set comics_count = excluded.comics_count;
+
+insert into public.user_stats as s (user_id, characters_count)
+select user_id, count(*) from public.comic_character group by user_id
+on conflict (user_id) do update set characters_count = excluded.characters_count;
+
+insert into public.user_author_stats (user_id, author, comics_count)
+select user_id, author, count(*) from public.comics
+ where user_id is not null and author is not null and author <> ''
+ group by user_id, author
+on conflict (user_id, author) do update set comics_count = excluded.comics_count;
+
+insert into public.comic_top_character (comics_id, user_id, character_id, character_name, affinity)
+select distinct on (comics_id) comics_id, user_id, id, character_name, affinity
+  from public.comic_character
+ order by comics_id, affinity desc nulls last, id
+on conflict (comics_id) do nothing;
+
+insert into public.user_top_character_stats (user_id, character_name, first_count)
+select user_id, character_name, count(*) from public.comic_top_character group by user_id, character_name
+on conflict (user_id, character_name) do update set first_count = excluded.first_count;
@@ -0,0 +1,13 @@
+-- Per-user comprehensive news precomputed by the nightly batch job (services/news_digest.py).
+-- /api/search/comprehensive serves the stored items directly while they are fresh and
+-- still cover the user's current news_list characters.
+
+create table if not exists public.news_digest (
+  user_id text not null,
+  items jsonb not null default '[]'::jsonb,
+  -- "character (title)" targets the items were collected for
+  targets jsonb not null default '[]'::jsonb,
+  generated_at timestamp with time zone not null default now(),
+  constraint news_digest_pkey primary key (user_id)
+);
+
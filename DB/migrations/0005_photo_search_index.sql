@@ -0,0 +1,10 @@
+-- migrate:no-transaction
+-- Keyword/note search over a user's photo gallery (ComicService.search_gallery).
+-- A trigram GIN index over keyword1/keyword2/note serves substring (ILIKE) matches;
+-- Postgres keeps it in sync on every add_photo_info / delete_photo_info_by_id write.
+
+create extension if not exists pg_trgm;
+
+create index concurrently if not exists photo_info_search_trgm_idx
+  on public.photo_info
+  using gin ((coalesce(keyword1, '') || ' ' || coalesce(keyword2, '') || ' ' || coalesce(note, '')) gin_trgm_ops);
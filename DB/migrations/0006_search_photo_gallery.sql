@@ -0,0 +1,37 @@
+-- Keyword/note search over a user's photo gallery, called from ComicService.search_gallery
+-- via supabase.rpc(). Uses photo_info_search_trgm_idx (0005_photo_search_index.sql).
+--
+-- Newest first, paginated. Returns {"total": n, "items": [...]}.
+-- Queries shorter than three characters can't use trigrams; they are still cheap because
+-- the user's characters (comic_character_user_affinity_idx) bound the photos scanned.
+create or replace function public.search_photo_gallery(
+  p_user_id text,
+  p_query text,
+  p_limit integer default 20,
+  p_offset integer default 0
+)
+returns jsonb
+language sql
+stable
+as $$
+  with matches as (
+    select p.id, p.num, p.photo_base64, p.keyword1, p.keyword2, p.note, p.created_at,
+           c.character_name, c.comics_id
+      from public.photo_info p
+      join public.comic_character c on c.id = p.id
+     where c.user_id = p_user_id
+       and (coalesce(p.keyword1, '') || ' ' || coalesce(p.keyword2, '') || ' ' || coalesce(p.note, ''))
+           ilike '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+  )
+  select jsonb_build_object(
+    'total', (select count(*) from matches),
+    'items', coalesce((
+      select jsonb_agg(m order by m.created_at desc, m.id, m.num)
+        from (
+          select * from matches
+           order by created_at desc, id, num
+           limit p_limit offset p_offset
+        ) m
+    ), '[]'::jsonb)
+  );
+$$;
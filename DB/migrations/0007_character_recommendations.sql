@@ -0,0 +1,141 @@
+-- Character recommendations built from every user's comic_character rows, grouped by comic title.
+-- Triggers on comic_character and comics keep the counts current, so the character search can
+-- answer "who do people register for this title" from one index range scan before asking Gemini.
+
+-- Titles and names are matched ignoring case and spaces ("원피스" = "원 피스")
+create or replace function public.recommendation_key(p_text text)
+returns text
+language sql
+immutable
+as $$
+  select lower(replace(coalesce(p_text, ''), ' ', ''))
+$$;
+
+create table if not exists public.character_recommendation (
+  title_key text not null,
+  character_key text not null,
+  character_name character varying not null,
+  registrations bigint not null default 0,
+  affinity_sum bigint not null default 0,
+  photo_url text null,
+  updated_at timestamp with time zone not null default now(),
+  constraint character_recommendation_pkey primary key (title_key, character_key)
+);
+create index if not exists character_recommendation_rank_idx
+  on public.character_recommendation (title_key, registrations desc, affinity_sum desc);
+
+
+create or replace function public.recommendation_bump(
+  p_comics_id bigint,
+  p_character_name text,
+  p_affinity bigint,
+  p_photo_url text,
+  p_delta bigint
+)
+returns void
+language plpgsql
+as $$
+declare
+  v_title_key text;
+begin
+  select public.recommendation_key(title) into v_title_key from public.comics where id = p_comics_id;
+  if v_title_key is null or v_title_key = '' then
+    return;
+  end if;
+
+  insert into public.character_recommendation as r
+    (title_key, character_key, character_name, registrations, affinity_sum, photo_url)
+  values (v_title_key, public.recommendation_key(p_character_name), p_character_name,
+          greatest(p_delta, 0), greatest(p_delta, 0) * coalesce(p_affinity, 0), p_photo_url)
+  on conflict (title_key, character_key) do update
+    set registrations = greatest(r.registrations + p_delta, 0),
+        affinity_sum = r.affinity_sum + p_delta * coalesce(p_affinity, 0),
+        photo_url = coalesce(case when p_delta > 0 then excluded.photo_url end, r.photo_url),
+        updated_at = now();
+end;
+$$;
+
+create or replace function public.recommendation_comic_character_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.recommendation_bump(old.comics_id, old.character_name, old.affinity, old.photo_url, -1);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.recommendation_bump(new.comics_id, new.character_name, new.affinity, new.photo_url, 1);
+  end if;
+  return null;
+end;
+$$;
+
+-- Renaming a comic moves its characters to the new title
+create or replace function public.recommendation_comics_trigger()
+returns trigger
+language plpgsql
+as $$
+declare
+  v_char record;
+begin
+  for v_char in select character_name, affinity, photo_url from public.comic_character where comics_id = new.id loop
+    update public.character_recommendation
+       set registrations = greatest(registrations - 1, 0),
+           affinity_sum = affinity_sum - coalesce(v_char.affinity, 0),
+           updated_at = now()
+     where title_key = public.recommendation_key(old.title)
+       and character_key = public.recommendation_key(v_char.character_name);
+    perform public.recommendation_bump(new.id, v_char.character_name, v_char.affinity, v_char.photo_url, 1);
+  end loop;
+  return null;
+end;
+$$;
+
+drop trigger if exists comic_character_recommendation on public.comic_character;
+create trigger comic_character_recommendation
+  after insert or delete or update of comics_id, character_name, affinity, photo_url on public.comic_character
+  for each row execute function public.recommendation_comic_character_trigger();
+
+drop trigger if exists comics_recommendation on public.comics;
+create trigger comics_recommendation
+  after update of title on public.comics
+  for each row when (public.recommendation_key(old.title) is distinct from public.recommendation_key(new.title))
+  execute function public.recommendation_comics_trigger();
+
+
+-- Backfill from existing rows
+insert into public.character_recommendation as r
+  (title_key, character_key, character_name, registrations, affinity_sum, photo_url)
+select public.recommendation_key(b.title),
+       public.recommendation_key(a.character_name),
+       min(a.character_name),
+       count(*),
+       coalesce(sum(a.affinity), 0),
+       max(a.photo_url)
+  from public.comic_character a
+  join public.comics b on b.id = a.comics_id
+ where public.recommendation_key(b.title) <> ''
+ group by 1, 2
+on conflict (title_key, character_key) do update
+  set registrations = excluded.registrations,
+      affinity_sum = excluded.affinity_sum,
+      photo_url = coalesce(excluded.photo_url, r.photo_url);
+
+
+-- Read used by ComicService.get_character_recommendations
+create or replace function public.get_character_recommendations(p_title text, p_limit integer default 10)
+returns jsonb
+language sql
+stable
+as $$
+  select coalesce(jsonb_agg(t order by t.registrations desc, t.avg_affinity desc nulls last), '[]'::jsonb)
+    from (
+      select character_name, registrations,
+             round(affinity_sum::numeric / nullif(registrations, 0), 2) as avg_affinity,
+             photo_url
+        from public.character_recommendation
+       where title_key = public.recommendation_key(p_title) and registrations > 0
+       order by registrations desc, affinity_sum desc
+       limit p_limit
+    ) t
+$$;
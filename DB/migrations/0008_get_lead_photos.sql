@@ -0,0 +1,19 @@
+-- First photo (lowest num) per character, called from SupabaseRepository.get_lead_photos via
+-- supabase.rpc(). Picking the lead row here returns one row per id, so a character with many
+-- photos can't push others past PostgREST's max-rows cap. distinct on walks photo_info_pkey (id, num).
+create or replace function public.get_lead_photos(p_ids integer[])
+returns table (
+  id integer,
+  num integer,
+  photo_base64 character varying,
+  keyword1 text,
+  keyword2 text
+)
+language sql
+stable
+as $$
+  select distinct on (p.id) p.id, p.num, p.photo_base64, p.keyword1, p.keyword2
+    from public.photo_info p
+   where p.id = any(p_ids)
+   order by p.id, p.num;
+$$;
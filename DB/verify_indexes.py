@@ -0,0 +1,150 @@
+"""
+Check that every ComicService query shape is served by an index.
+
+Builds the schema from DB/table_create_script.sql in a SCRATCH database, applies
+DB/migrations, loads a synthetic dataset (1M comic_character rows by default),
+then runs EXPLAIN on each query and fails if any of them sequentially scans a table.
+
+Usage:
+    DATABASE_URL=postgresql://.../scratch python DB/verify_indexes.py --scratch [--rows 1000000]
+
+--scratch is required because the script DROPS comics, comic_character and photo_info.
+"""
+import os
+import sys
+import argparse
+import psycopg
+
+DB_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(DB_DIR)
+
+from migrate import list_migrations, apply, applied_versions
+
+USER_ID = "user_42"
+COMIC_ID = 4242
+CHARACTER_ID = 42424
+
+# (name, sql) — PostgREST-equivalent SQL for each ComicService / repository query
+QUERIES = [
+    ("get_comic_by_id",
+     f"select * from public.comics where id = {COMIC_ID}"),
+    ("get_comics_summary",
+     f'select id, title, rating, "coverImage" from public.comics where id = any(array[{COMIC_ID}, {COMIC_ID + 1}, {COMIC_ID + 2}])'),
+    ("get_character_by_id",
+     f"select * from public.comic_character where id = {CHARACTER_ID}"),
+    ("get_characters_info",
+     f"select * from public.comic_character where user_id = '{USER_ID}' order by affinity desc"),
+    ("get_characters_info(comics_id)",
+     f"select * from public.comic_character where user_id = '{USER_ID}' and comics_id = {COMIC_ID} order by affinity desc"),
+    ("get_news_list_data",
+     f"select a.character_name, b.title from public.comic_character a "
+     f"join public.comics b on b.id = a.comics_id "
+     f"where a.user_id = '{USER_ID}' and a.news_list = 'Y'"),
+    ("delete_comic (characters)",
+     f"select id from public.comic_character where comics_id = {COMIC_ID}"),
+    ("get_photo_info_by_id",
+     f"select * from public.photo_info where id = {CHARACTER_ID} order by num"),
+    ("add_photo_info (max num)",
+     f"select num from public.photo_info where id = {CHARACTER_ID} order by num desc limit 1"),
+    ("delete_photo_info_by_id",
+     f"select * from public.photo_info where id = {CHARACTER_ID} and num = 1"),
+]
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def reset_schema(conn):
+    conn.execute("drop table if exists public.photo_info, public.comic_character, public.comics cascade")
+    conn.execute("drop table if exists public.schema_migrations")
+    conn.execute("drop table if exists public.user_stats, public.user_author_stats, "
+                 "public.comic_top_character, public.user_top_character_stats")
+    with open(os.path.join(DB_DIR, "table_create_script.sql"), "r", encoding="utf-8") as f:
+        script = f.read()
+
+    # comic_character references comics, so create comics first
+    statements = [s.strip() for s in script.split(";") if s.strip()]
+    statements.sort(key=lambda s: 0 if "public.comics " in s else 1 if "public.comic_character " in s else 2)
+    for statement in statements:
+        conn.execute(statement)
+
+
+def load_synthetic_data(conn, rows):
+    users = max(1, rows // 50)
+    comics = max(1, rows // 5)
+    print(f"Loading {comics} comics, {rows} characters ({users} users), {rows} photos...")
+
+    conn.execute(f"""
+        insert into public.comics (id, title, author, review, rating, "coverImage", user_id)
+        select g, 'title ' || g, 'author ' || (g % 5000), repeat('review ', 20), g % 6,
+               'covers/' || g || '.jpg', 'user_' || (g % {users})
+          from generate_series(1, {comics}) g
+    """)
+    conn.execute(f"""
+        insert into public.comic_character (id, user_id, comics_id, character_name, affinity, news_list)
+        select g, 'user_' || (g % {users}), 1 + (g % {comics}), 'character ' || g, g % 6,
+               case when g % 10 = 0 then 'Y' else 'N' end
+          from generate_series(1, {rows}) g
+    """)
+    conn.execute(f"""
+        insert into public.photo_info (id, num, photo_base64, keyword1, keyword2)
+        select 1 + (g % {rows}), 1 + (g / {rows}), 'AI_photo/p' || g || '.jpg', '어깨 동무', '환하게 웃는 얼굴'
+          from generate_series(0, {rows} - 1) g
+    """)
+    conn.execute("analyze public.comics")
+    conn.execute("analyze public.comic_character")
+    conn.execute("analyze public.photo_info")
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk(child)
+
+
+def check(conn):
+    failures = 0
+    for name, sql in QUERIES:
+        plan = conn.execute(f"explain (format json) {sql}").fetchone()[0][0]["Plan"]
+        nodes = list(walk(plan))
+        seq_scans = [n.get("Relation Name") for n in nodes if n["Node Type"] == "Seq Scan"]
+        indexes = sorted({n.get("Index Name") for n in nodes if n["Node Type"] in INDEX_NODES})
+
+        if seq_scans or not indexes:
+            failures += 1
+            print(f"FAIL  {name:<32} seq scan on {', '.join(seq_scans) or '-'}")
+        else:
+            print(f"ok    {name:<32} {', '.join(indexes)}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scratch", action="store_true", help="confirm DATABASE_URL is a disposable database")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url or not args.scratch:
+        print("Error: set DATABASE_URL to a scratch database and pass --scratch.")
+        sys.exit(1)
+
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        reset_schema(conn)
+        load_synthetic_data(conn, args.rows)
+
+        applied_versions(conn)
+        for version, path in list_migrations():
+            print(f"Applying {os.path.basename(path)}")
+            apply(conn, version, path)
+        conn.execute("analyze public.comic_character")
+
+        failures = check(conn)
+
+    if failures:
+        print(f"\n{failures} query shape(s) are not index-backed.")
+        sys.exit(1)
+    print("\nAll query shapes use an index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,39 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Size-capped streaming multipart parsing (files hashed/sniffed as they arrive)
+from utils.uploads import init_uploads
+init_uploads(app)
+
+# Structured logging with a request id per request
+from utils.log import init_request_logging
+init_request_logging(app)
+
+# Per-caller token buckets for expensive endpoints: 429 before any body parsing or downstream call
+from utils.rate_limit import init_rate_limiting
+init_rate_limiting(app)
+
+# orjson encoding, ETag / 304 and gzip/brotli for JSON responses
+from utils.responses import init_response_layer
+from utils.metrics import snapshot as metrics_snapshot
+init_response_layer(app)
+
+# Opt-in per-request profiling (no hooks installed unless PROFILE_TOKEN / PROFILE_SAMPLE_RATE is set)
+from services.profiling import init_profiling, profiling_bp
+init_profiling(app)
+
+# Opt-in anonymized request traces for capacity planning (no hooks unless TRAFFIC_RECORD_DIR is set)
+from utils.traffic import init_traffic_recording
+init_traffic_recording(app)
+
 # Import services (we will define these blueprints/routes next)
 from services.make_photo import make_photo_bp
 from services.search_info import search_info_bp
 from services.news import news_bp
 from services.comics import comics_bp
 from services.naver_search import naver_bp
+from services.image_proxy import image_proxy_bp
+from services.stats import stats_bp
 
 # Register Blueprints
 app.register_blueprint(make_photo_bp, url_prefix='/api')
@@ -22,11 +49,18 @@ app.register_blueprint(search_info_bp, url_prefix='/api')
 app.register_blueprint(news_bp, url_prefix='/api')
 app.register_blueprint(comics_bp, url_prefix='/api')
 app.register_blueprint(naver_bp, url_prefix='/api')
+app.register_blueprint(image_proxy_bp, url_prefix='/api')
+app.register_blueprint(stats_bp, url_prefix='/api')
+app.register_blueprint(profiling_bp, url_prefix='/api')
 
 @app.route('/')
 def health_check():
     return jsonify({"status": "healthy", "service": "comiclib-api"}), 200
 
+@app.route('/api/metrics')
+def metrics():
+    return jsonify(metrics_snapshot()), 200
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,171 @@
+"""
+Exercise the Gemini prompt-cache flow of the structured agents offline, against a stub client.
+
+Usage (from comiclib-api/):
+    python benchmarks/bench_prompt_cache.py [-n 60] [--ttl 4] [--evict-every 25] [--reject-create]
+                                            [--min-tokens 1024] [--fail-every 0]
+
+The stub implements caches.create / update / delete, models.count_tokens and generate_content with
+usage metadata and a latency proportional to the uncached prompt tokens. Like the real API it
+refuses to cache prefixes below --min-tokens (the agents' real prefixes are below Gemini's 1024, so
+pass e.g. --min-tokens 100 to exercise the cached path). A short TTL exercises refreshes,
+--evict-every drops server-side caches to exercise the inline fallback, --fail-every returns a 503
+on every Nth call and --reject-create makes every create fail. Prints the per-agent "prompt_cache"
+metrics and the caches still live on the stub at the end.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import threading
+from types import SimpleNamespace
+from google.genai import errors
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+SECONDS_PER_1K_UNCACHED_TOKENS = 0.02
+
+
+def estimate_tokens(value):
+    # Roughly Gemini's tokenizer: ~4 characters per token for ASCII, ~1.5 per Hangul/other character
+    text = str(value or "")
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return max(1, ascii_chars // 4 + (len(text) - ascii_chars) * 2 // 3)
+
+
+def api_error(code, status, message):
+    cls = errors.ClientError if code < 500 else errors.ServerError
+    return cls(code, {"error": {"code": code, "status": status, "message": message}})
+
+
+class StubCaches:
+    def __init__(self, reject_create=False, min_tokens=1024):
+        self.reject_create = reject_create
+        self.min_tokens = min_tokens
+        self.live = {}
+        self.deleted = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, model, config):
+        tokens = estimate_tokens(config.system_instruction) + estimate_tokens(config.tools)
+        if self.reject_create or tokens < self.min_tokens:
+            raise api_error(400, "INVALID_ARGUMENT", f"Cached content is too small. total_token_count={tokens}, "
+                                                     f"min_total_token_count={self.min_tokens}")
+        name = f"cachedContents/stub-{next(self._ids)}"
+        with self._lock:
+            self.live[name] = {"tokens": tokens, "expires_at": time.monotonic() + int(config.ttl.rstrip("s"))}
+        return SimpleNamespace(name=name)
+
+    def update(self, name, config):
+        with self._lock:
+            if name not in self.live:
+                raise api_error(404, "NOT_FOUND", name)
+            self.live[name]["expires_at"] = time.monotonic() + int(config.ttl.rstrip("s"))
+        return SimpleNamespace(name=name)
+
+    def delete(self, name):
+        with self._lock:
+            if self.live.pop(name, None) is None:
+                raise api_error(404, "NOT_FOUND", name)
+            self.deleted += 1
+
+    def evict_all(self):
+        with self._lock:
+            self.live.clear()
+
+    def lookup(self, name):
+        with self._lock:
+            cache = self.live.get(name)
+            if cache is None or cache["expires_at"] <= time.monotonic():
+                self.live.pop(name, None)
+                return None
+            return cache
+
+
+class StubModels:
+    def __init__(self, caches, fail_every=0):
+        self.caches = caches
+        self.fail_every = fail_every
+        self._calls = itertools.count(1)
+
+    def count_tokens(self, model, contents):
+        return SimpleNamespace(total_tokens=estimate_tokens(contents))
+
+    def generate_content(self, model, contents, config):
+        if self.fail_every and next(self._calls) % self.fail_every == 0:
+            raise api_error(503, "UNAVAILABLE", "The model is overloaded")
+        cached_tokens = 0
+        if config.cached_content:
+            if config.system_instruction or config.tools:
+                raise api_error(400, "INVALID_ARGUMENT", "cached_content cannot be combined with system_instruction/tools")
+            cache = self.caches.lookup(config.cached_content)
+            if cache is None:
+                raise api_error(404, "NOT_FOUND", config.cached_content)
+            cached_tokens = cache["tokens"]
+            prompt_tokens = cached_tokens + estimate_tokens(contents)
+        else:
+            prompt_tokens = estimate_tokens(config.system_instruction) + estimate_tokens(config.tools) + estimate_tokens(contents)
+
+        time.sleep((prompt_tokens - cached_tokens) / 1000 * SECONDS_PER_1K_UNCACHED_TOKENS)
+        list_field = next(iter(config.response_schema.model_fields))
+        return SimpleNamespace(
+            parsed=None,
+            text=json.dumps({list_field: []}),
+            candidates=[],
+            usage_metadata=SimpleNamespace(prompt_token_count=prompt_tokens, cached_content_token_count=cached_tokens or None),
+        )
+
+
+class StubClient:
+    def __init__(self, reject_create=False, min_tokens=1024, fail_every=0):
+        self.caches = StubCaches(reject_create, min_tokens)
+        self.models = StubModels(self.caches, fail_every)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--iterations", type=int, default=60)
+    parser.add_argument("--ttl", type=int, default=4, help="cache TTL in seconds (refresh margin is half of it)")
+    parser.add_argument("--evict-every", type=int, default=25, help="drop all server-side caches every N iterations (0 = never)")
+    parser.add_argument("--reject-create", action="store_true")
+    parser.add_argument("--min-tokens", type=int, default=1024, help="smallest prefix the stub (and the app) will cache")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth generate call with a 503 (0 = never)")
+    args = parser.parse_args()
+
+    # Module constants are read at import time
+    os.environ["PROMPT_CACHE_TTL_S"] = str(args.ttl)
+    os.environ["PROMPT_CACHE_REFRESH_MARGIN_S"] = str(args.ttl // 2)
+    os.environ["PROMPT_CACHE_RETRY_S"] = str(args.ttl)
+    os.environ["PROMPT_CACHE_MIN_TOKENS"] = str(args.min_tokens)
+
+    from services import search_info
+    from utils.prompt_cache import prompt_cache_stats
+
+    client = StubClient(reject_create=args.reject_create, min_tokens=args.min_tokens, fail_every=args.fail_every)
+    search_info.genai.Client = lambda api_key=None: client
+
+    failed = 0
+    for i in range(1, args.iterations + 1):
+        for call in (lambda: search_info.get_game_search_info("원피스 게임", "stub-key"),
+                     lambda: search_info.get_character_info("원피스", "stub-key"),
+                     lambda: search_info.search_comprehensive_targets(["루피 (작품: 원피스)"], "stub-key", client=client)):
+            try:
+                call()
+            except search_info.StructuredOutputError:
+                failed += 1
+        if args.evict_every and i % args.evict_every == 0:
+            client.caches.evict_all()
+        time.sleep(0.1)
+
+    print(json.dumps(prompt_cache_stats(), indent=2, ensure_ascii=False))
+    print(json.dumps({"failed_calls": failed, "live_caches": len(client.caches.live),
+                      "deleted_caches": client.caches.deleted}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the PostgREST and direct Postgres read backends on the same hot queries.
+
+Usage (from comiclib-api/):
+    python benchmarks/bench_read_backends.py --comic-id 1 --character-id 1 --user-id <uid> \
+        [--summary-ids 1,2,3] [-n 200]
+
+Requires SUPABASE_URL / SUPABASE_KEY and DATABASE_URL in the environment (.env).
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from repositories import create_repository
+from services.read_backend import create_read_backend
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(backend_name, label, fn, iterations, warmup=5):
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    print(f"{backend_name:<10} {label:<22} "
+          f"mean={statistics.mean(samples):7.2f}ms "
+          f"p50={percentile(samples, 50):7.2f}ms "
+          f"p95={percentile(samples, 95):7.2f}ms "
+          f"p99={percentile(samples, 99):7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comic-id", type=int, required=True)
+    parser.add_argument("--character-id", type=int, required=True)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--summary-ids", help="comma-separated comic ids for get_comics_summary (default: the user's comics)")
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    repository = create_repository("supabase")
+    if args.summary_ids:
+        summary_ids = [int(i) for i in args.summary_ids.split(",")]
+    else:
+        # What get_characters_info asks for: the comics behind the user's characters
+        summary_ids = sorted({c["comics_id"] for c in repository.get_user_characters(args.user_id) if c.get("comics_id")})
+        summary_ids = summary_ids or [args.comic_id]
+    for name in ("postgrest", "postgres"):
+        backend = create_read_backend(repository, name)
+        run(name, "get_comic_by_id", lambda: backend.get_comic_by_id(args.comic_id), args.iterations)
+        run(name, "get_character_by_id", lambda: backend.get_character_by_id(args.character_id), args.iterations)
+        run(name, "get_user_characters", lambda: backend.get_user_characters(args.user_id), args.iterations)
+        run(name, f"get_comics_summary({len(summary_ids)})", lambda: backend.get_comics_summary(summary_ids), args.iterations)
+        print()
+
+
+if __name__ == "__main__":
+    main()
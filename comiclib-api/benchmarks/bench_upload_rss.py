@@ -0,0 +1,107 @@
+"""
+Peak RSS of parsing one multipart image upload, default Flask request vs utils.uploads.
+
+Usage (from comiclib-api/):
+    python benchmarks/bench_upload_rss.py [--sizes-mb 1 8 32 64]
+
+Each measurement runs in a fresh subprocess: the body is written to a temp file and
+streamed into the app through the test client, so only server-side parsing is counted.
+With the default request class peak RSS grows with the file size; with UploadRequest
+it should stay flat (bounded by UPLOAD_SPOOL_THRESHOLD).
+"""
+import os
+import sys
+import json
+import argparse
+import resource
+import subprocess
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+BOUNDARY = "benchboundary7MA4YWxkTrZu0gW"
+CHUNK = 1024 * 1024
+
+
+def write_body(path, size_bytes):
+    with open(path, "wb") as f:
+        f.write((f"--{BOUNDARY}\r\n"
+                 'Content-Disposition: form-data; name="file"; filename="big.jpg"\r\n'
+                 "Content-Type: image/jpeg\r\n\r\n").encode())
+        f.write(b"\xff\xd8\xff\xe0" + b"\0" * 28)
+        remaining = size_bytes - 32
+        block = os.urandom(CHUNK)
+        while remaining > 0:
+            f.write(block[:min(CHUNK, remaining)])
+            remaining -= CHUNK
+        f.write(f"\r\n--{BOUNDARY}--\r\n".encode())
+        return f.tell()
+
+
+def child(mode, size_mb):
+    # Limits out of the way: this measures memory, not rejection
+    os.environ["UPLOAD_MAX_REQUEST_BYTES"] = str(1 << 40)
+    os.environ["UPLOAD_MAX_FILE_BYTES"] = str(1 << 40)
+
+    from flask import Flask, request, jsonify
+    from utils.uploads import init_uploads, upload_info
+
+    app = Flask(__name__)
+    if mode == "streaming":
+        init_uploads(app)
+
+    @app.route("/upload", methods=["POST"])
+    def upload():
+        file = request.files["file"]
+        info = upload_info(file)
+        return jsonify({"size": info["size"], "format": info["format"]})
+
+    with tempfile.NamedTemporaryFile(suffix=".multipart", delete=False) as tmp:
+        body_path = tmp.name
+    try:
+        length = write_body(body_path, size_mb * 1024 * 1024)
+        client = app.test_client()
+        baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with open(body_path, "rb") as body:
+            response = client.post(
+                "/upload",
+                input_stream=body,
+                content_length=length,
+                content_type=f"multipart/form-data; boundary={BOUNDARY}"
+            )
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    finally:
+        os.remove(body_path)
+
+    print(json.dumps({
+        "mode": mode,
+        "size_mb": size_mb,
+        "status": response.status_code,
+        "rss_growth_mb": round((peak_kb - baseline_kb) / 1024, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "SIZE_MB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'mode':<10} {'size':>7} {'status':>6} {'peak RSS growth':>16}")
+    for size_mb in args.sizes_mb:
+        for mode in ("default", "streaming"):
+            out = subprocess.run([sys.executable, __file__, "--child", mode, str(size_mb)],
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{result['mode']:<10} {result['size_mb']:>5}MB {result['status']:>6} "
+                  f"{result['rss_growth_mb']:>14}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Replay traces written by the traffic recorder (utils/traffic.py) against a running instance.
+
+Usage (from comiclib-api/):
+    python benchmarks/replay_traffic.py --base-url http://localhost:5000 traces/traffic-*.jsonl \
+        [--speed 4] [--concurrency 32] [--param user_id=<test-user>] [--include-writes] [--limit N]
+
+Requests are sent on the recorded schedule compressed by --speed (0 = as fast as possible),
+with at most --concurrency in flight. Anonymized values ("anon:...") are sent as-is unless
+--param maps that parameter to a real fixture value. Only GET/HEAD are replayed by default;
+--include-writes also sends other methods with synthetic bodies of the recorded size.
+Reports throughput and latency percentiles per blueprint, plus the recorded server time
+and downstream time for comparison.
+
+Latency is measured from each request's scheduled send time, not from when a free slot let it
+out: once the instance saturates and all --concurrency slots are busy, the wait counts against
+it instead of quietly slowing the replay (coordinated omission). "service" is the time from the
+actual send, and "lag" how far sends fell behind the schedule. With --speed 0 there is no
+schedule, so latency is service time.
+"""
+import re
+import sys
+import json
+import glob
+import time
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+_CONVERTER = re.compile(r"<(?:[^:<>]+:)?([^<>]+)>")
+JPEG_HEADER = b"\xff\xd8\xff\xe0" + b"\0" * 28
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_traces(patterns, include_writes, limit):
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    traces = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    trace = json.loads(line)
+                except ValueError:
+                    continue
+                if not trace.get("route"):
+                    continue
+                if trace["method"] not in ("GET", "HEAD") and not include_writes:
+                    continue
+                traces.append(trace)
+    traces.sort(key=lambda t: t["ts"])
+    return traces[:limit] if limit else traces
+
+
+def build_request(trace, params):
+    view_args = {k: params.get(k, v) for k, v in trace.get("view_args", {}).items()}
+    path = _CONVERTER.sub(lambda m: str(view_args.get(m.group(1), m.group(0))), trace["route"])
+    query = [(k, params.get(k, v)) for k, values in trace.get("args", {}).items() for v in values]
+
+    kwargs = {"params": query}
+    if trace["method"] not in ("GET", "HEAD"):
+        content_type = trace.get("content_type")
+        if content_type == "multipart/form-data":
+            files = trace.get("file_bytes") or []
+            kwargs["files"] = {f"image{i + 1}": (f"replay{i + 1}.jpg", JPEG_HEADER + b"\0" * max(0, (size or 0) - len(JPEG_HEADER)), "image/jpeg")
+                               for i, size in enumerate(files)}
+        elif trace.get("request_bytes"):
+            padding = "x" * max(0, trace["request_bytes"] - 16)
+            kwargs["data"] = json.dumps({"_replay": padding})
+            kwargs["headers"] = {"Content-Type": content_type or "application/json"}
+    return path, kwargs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="trace files or glob patterns")
+    parser.add_argument("--base-url", required=True)
+    parser.add_argument("--speed", type=float, default=1.0, help="N x recorded speed (0 = no pacing)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="replace a (usually anonymized) query/path parameter")
+    parser.add_argument("--include-writes", action="store_true")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=180)
+    args = parser.parse_args()
+
+    params = dict(p.split("=", 1) for p in args.param)
+    traces = load_traces(args.traces, args.include_writes, args.limit)
+    if not traces:
+        print("No replayable traces found")
+        sys.exit(1)
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=args.concurrency, pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    results = defaultdict(lambda: {"latencies": [], "service_ms": [], "lag_ms": [], "errors": 0,
+                                   "statuses": defaultdict(int), "recorded_ms": [], "downstream_ms": []})
+    results_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(args.concurrency)
+
+    def send(trace, scheduled):
+        try:
+            path, kwargs = build_request(trace, params)
+            started = time.perf_counter()
+            if scheduled is None:
+                scheduled = started
+            try:
+                response = session.request(trace["method"], args.base_url.rstrip("/") + path, timeout=args.timeout, **kwargs)
+                status = response.status_code
+            except requests.exceptions.RequestException:
+                status = None
+            finished = time.perf_counter()
+            with results_lock:
+                bucket = results[trace.get("blueprint") or "app"]
+                bucket["latencies"].append((finished - scheduled) * 1000)
+                bucket["service_ms"].append((finished - started) * 1000)
+                bucket["lag_ms"].append((started - scheduled) * 1000)
+                bucket["statuses"][status or "error"] += 1
+                if status is None or status >= 500:
+                    bucket["errors"] += 1
+                bucket["recorded_ms"].append(trace.get("duration_ms") or 0)
+                bucket["downstream_ms"].append(sum(d["ms"] for d in trace.get("downstream", [])))
+        finally:
+            slots.release()
+
+    first_ts = traces[0]["ts"]
+    replay_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for trace in traces:
+            scheduled = None
+            if args.speed > 0:
+                scheduled = replay_started + (trace["ts"] - first_ts) / args.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            # May hold the schedule back when saturated; latency still counts from `scheduled`
+            slots.acquire()
+            executor.submit(send, trace, scheduled)
+    wall_s = time.perf_counter() - replay_started
+
+    print(f"Replayed {len(traces)} requests in {wall_s:.1f}s "
+          f"(speed={args.speed}x, concurrency={args.concurrency}, {len(traces) / wall_s:.1f} req/s)\n")
+    print(f"{'blueprint':<16} {'reqs':>6} {'req/s':>7} {'err':>5} "
+          f"{'p50':>9} {'p95':>9} {'p99':>9} {'svc p99':>9} {'lag p99':>9} {'rec p50':>9} {'dwn p50':>9}  statuses")
+    for blueprint, bucket in sorted(results.items()):
+        samples = bucket["latencies"]
+        statuses = ", ".join(f"{k}:{v}" for k, v in sorted(bucket["statuses"].items(), key=lambda kv: str(kv[0])))
+        print(f"{blueprint:<16} {len(samples):>6} {len(samples) / wall_s:>7.2f} {bucket['errors']:>5} "
+              f"{percentile(samples, 50):>7.1f}ms {percentile(samples, 95):>7.1f}ms {percentile(samples, 99):>7.1f}ms "
+              f"{percentile(bucket['service_ms'], 99):>7.1f}ms {percentile(bucket['lag_ms'], 99):>7.1f}ms "
+              f"{percentile(bucket['recorded_ms'], 50):>7.1f}ms {percentile(bucket['downstream_ms'], 50):>7.1f}ms  {statuses}")
+
+
+if __name__ == "__main__":
+    main()
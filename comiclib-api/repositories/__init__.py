@@ -0,0 +1,32 @@
+import os
+import threading
+
+# COMICLIB_STORAGE=supabase (default) | sqlite
+STORAGE_BACKEND = os.environ.get("COMICLIB_STORAGE", "supabase")
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def create_repository(backend: str = None):
+    backend = backend or STORAGE_BACKEND
+    if backend == "supabase":
+        from utils.db import get_supabase
+        from repositories.supabase_repository import SupabaseRepository
+        return SupabaseRepository(get_supabase())
+    if backend == "sqlite":
+        from repositories.sqlite_repository import SqliteRepository
+        return SqliteRepository()
+    raise ValueError(f"Unknown COMICLIB_STORAGE: {backend}")
+
+
+def get_repository():
+    """Process-wide repository shared by every ComicService instance."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                # Method calls are timed into recorded traffic traces when recording is enabled
+                from utils.traffic import timed_proxy
+                _repository = timed_proxy(create_repository(), "db")
+    return _repository
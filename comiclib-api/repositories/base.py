@@ -0,0 +1,97 @@
+class ComicRepository:
+    """
+    Storage interface under ComicService.
+    Rows are plain dicts shaped like the PostgREST responses the frontend already consumes;
+    insert/update/delete return the list of affected rows.
+    """
+
+    name = "base"
+
+    # comics
+    def list_comics(self):
+        raise NotImplementedError
+
+    def get_comic_by_id(self, comic_id: int):
+        raise NotImplementedError
+
+    def get_comics_summary(self, comic_ids: list):
+        """id, title, rating, coverImage for each comic in comic_ids."""
+        raise NotImplementedError
+
+    def insert_comic(self, comic_data: dict):
+        raise NotImplementedError
+
+    def update_comic(self, comic_id: int, updates: dict):
+        raise NotImplementedError
+
+    def delete_comic(self, comic_id: int):
+        raise NotImplementedError
+
+    # comic_character
+    def get_character_by_id(self, character_id: int):
+        raise NotImplementedError
+
+    def get_user_characters(self, user_id: str, comics_id: int = None):
+        """Characters of a user ordered by affinity desc, optionally for one comic."""
+        raise NotImplementedError
+
+    def list_character_ids_for_comic(self, comics_id: int):
+        raise NotImplementedError
+
+    def get_news_list(self, user_id: str):
+        """[{"character_name": ..., "comics": {"title": ...}}] for news_list = 'Y'."""
+        raise NotImplementedError
+
+    def list_news_subscriptions(self):
+        """[{"user_id": ..., "character_name": ..., "comics": {"title": ...}}] for every user, news_list = 'Y'."""
+        raise NotImplementedError
+
+    def insert_character(self, character_data: dict):
+        raise NotImplementedError
+
+    def update_character(self, character_id: int, updates: dict):
+        raise NotImplementedError
+
+    def delete_character(self, character_id: int):
+        raise NotImplementedError
+
+    def reorder_characters(self, user_id: str, comics_id: int, ranking: list):
+        """Apply [{"id", "affinity"}, ...] atomically; return the comic's characters in new order."""
+        raise NotImplementedError
+
+    def get_user_stats(self, user_id: str):
+        """Precomputed library statistics (comics read, top author, first-ranked characters)."""
+        raise NotImplementedError
+
+    def get_character_recommendations(self, title: str, limit: int = 10):
+        """Characters registered for this comic title across all users, most registered first."""
+        raise NotImplementedError
+
+    # news_digest
+    def get_news_digest(self, user_id: str):
+        """{"user_id", "items", "targets", "generated_at"} or None."""
+        raise NotImplementedError
+
+    def save_news_digest(self, user_id: str, items: list, targets: list, generated_at: str):
+        raise NotImplementedError
+
+    # photo_info
+    def list_photos(self, id: int, num: int = None):
+        raise NotImplementedError
+
+    def get_lead_photos(self, character_ids: list):
+        """The first (lowest num) photo_info row of each character in character_ids, in one query."""
+        raise NotImplementedError
+
+    def search_photos(self, user_id: str, query: str, limit: int, offset: int):
+        """{"total": n, "items": [...]} of the user's photos whose keywords/note contain query, newest first."""
+        raise NotImplementedError
+
+    def get_max_photo_num(self, id: int):
+        raise NotImplementedError
+
+    def insert_photo(self, photo_data: dict):
+        raise NotImplementedError
+
+    def delete_photos(self, id: int, num: int = None):
+        raise NotImplementedError
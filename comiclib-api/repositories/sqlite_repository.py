@@ -0,0 +1,447 @@
+import os
+import json
+import sqlite3
+import threading
+from repositories.base import ComicRepository
+
+# Mirrors DB/table_create_script.sql, including photo_info's (id, num) composite key,
+# plus indexes for the query shapes ComicService actually uses.
+SCHEMA = """
+create table if not exists comics (
+  id integer primary key autoincrement,
+  title text null,
+  author text null,
+  review text null,
+  rating integer null,
+  "coverImage" text null,
+  "createdAt" text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  user_id text null
+);
+
+create table if not exists comic_character (
+  id integer primary key autoincrement,
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  user_id text not null,
+  comics_id integer not null references comics (id),
+  photo_id integer null,
+  note text null,
+  character_name text not null,
+  photo_url text null,
+  affinity integer null default 1,
+  news_list text null
+);
+
+create table if not exists photo_info (
+  id integer not null references comic_character (id),
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  photo_base64 text null,
+  note text null,
+  keyword1 text null,
+  keyword2 text null,
+  num integer not null,
+  primary key (id, num)
+);
+
+create index if not exists comic_character_user_affinity_idx on comic_character (user_id, affinity desc);
+create index if not exists comic_character_user_comic_idx on comic_character (user_id, comics_id, affinity desc);
+create index if not exists comic_character_comics_id_idx on comic_character (comics_id);
+create index if not exists comic_character_news_idx on comic_character (user_id) where news_list = 'Y';
+create index if not exists comics_user_id_idx on comics (user_id);
+
+create table if not exists news_digest (
+  user_id text primary key,
+  items text not null default '[]',
+  targets text not null default '[]',
+  generated_at text not null
+);
+"""
+
+
+def _refresh_comic_top_sql(comics_id):
+    """Trigger body that recomputes the first-ranked character of one comic (see DB/migrations/0003_user_stats.sql)."""
+    return f"""
+  update user_top_character_stats set first_count = max(first_count - 1, 0)
+   where (user_id, character_name) in (select user_id, character_name from comic_top_character where comics_id = {comics_id});
+  delete from comic_top_character where comics_id = {comics_id};
+  insert into comic_top_character (comics_id, user_id, character_id, character_name, affinity)
+  select comics_id, user_id, id, character_name, affinity from comic_character
+   where comics_id = {comics_id}
+   order by affinity desc nulls last, id
+   limit 1;
+  insert into user_top_character_stats (user_id, character_name, first_count)
+  select user_id, character_name, 1 from comic_top_character where comics_id = {comics_id} and true
+  on conflict (user_id, character_name) do update set first_count = first_count + 1;
+"""
+
+
+def _bump_comic_sql(row, delta):
+    return f"""
+  insert into user_stats (user_id, comics_count) select {row}.user_id, max({delta}, 0) where {row}.user_id is not null
+  on conflict (user_id) do update set comics_count = max(comics_count + {delta}, 0);
+  insert into user_author_stats (user_id, author, comics_count)
+  select {row}.user_id, {row}.author, max({delta}, 0)
+   where {row}.user_id is not null and {row}.author is not null and {row}.author <> ''
+  on conflict (user_id, author) do update set comics_count = max(comics_count + {delta}, 0);
+"""
+
+
+# Incrementally maintained aggregates for get_user_stats, mirroring DB/migrations/0003_user_stats.sql
+STATS_SCHEMA = f"""
+create table if not exists user_stats (
+  user_id text primary key,
+  comics_count integer not null default 0,
+  characters_count integer not null default 0
+);
+create table if not exists user_author_stats (
+  user_id text not null,
+  author text not null,
+  comics_count integer not null default 0,
+  primary key (user_id, author)
+);
+create index if not exists user_author_stats_top_idx on user_author_stats (user_id, comics_count desc);
+create table if not exists comic_top_character (
+  comics_id integer primary key,
+  user_id text not null,
+  character_id integer not null,
+  character_name text not null,
+  affinity integer null
+);
+create index if not exists comic_top_character_user_idx on comic_top_character (user_id, affinity desc);
+create table if not exists user_top_character_stats (
+  user_id text not null,
+  character_name text not null,
+  first_count integer not null default 0,
+  primary key (user_id, character_name)
+);
+create index if not exists user_top_character_stats_top_idx on user_top_character_stats (user_id, first_count desc);
+
+create trigger if not exists comics_stats_insert after insert on comics
+begin {_bump_comic_sql("new", 1)} end;
+create trigger if not exists comics_stats_delete after delete on comics
+begin {_bump_comic_sql("old", -1)} end;
+create trigger if not exists comics_stats_update after update of user_id, author on comics
+begin {_bump_comic_sql("old", -1)} {_bump_comic_sql("new", 1)} end;
+
+create trigger if not exists comic_character_stats_insert after insert on comic_character
+begin
+  insert into user_stats (user_id, characters_count) values (new.user_id, 1)
+  on conflict (user_id) do update set characters_count = characters_count + 1;
+  {_refresh_comic_top_sql("new.comics_id")}
+end;
+create trigger if not exists comic_character_stats_delete after delete on comic_character
+begin
+  update user_stats set characters_count = max(characters_count - 1, 0) where user_id = old.user_id;
+  {_refresh_comic_top_sql("old.comics_id")}
+end;
+create trigger if not exists comic_character_stats_update
+after update of comics_id, user_id, character_name, affinity on comic_character
+begin
+  update user_stats set characters_count = max(characters_count - 1, 0)
+   where user_id = old.user_id and new.user_id is not old.user_id;
+  insert into user_stats (user_id, characters_count) select new.user_id, 1 where new.user_id is not old.user_id
+  on conflict (user_id) do update set characters_count = characters_count + 1;
+  {_refresh_comic_top_sql("old.comics_id")}
+  {_refresh_comic_top_sql("new.comics_id")}
+end;
+"""
+
+def _key_sql(expr):
+    """recommendation_key() from DB/migrations/0007_character_recommendations.sql"""
+    return f"lower(replace(coalesce({expr}, ''), ' ', ''))"
+
+
+def _recommendation_bump_sql(row, delta):
+    return f"""
+  insert into character_recommendation (title_key, character_key, character_name, registrations, affinity_sum, photo_url)
+  select {_key_sql("title")}, {_key_sql(f"{row}.character_name")}, {row}.character_name,
+         max({delta}, 0), max({delta}, 0) * coalesce({row}.affinity, 0), {row}.photo_url
+    from comics where id = {row}.comics_id and {_key_sql("title")} <> ''
+  on conflict (title_key, character_key) do update
+    set registrations = max(registrations + {delta}, 0),
+        affinity_sum = affinity_sum + {delta} * coalesce({row}.affinity, 0),
+        photo_url = coalesce(case when {delta} > 0 then excluded.photo_url end, photo_url);
+"""
+
+
+# Character recommendations grouped by comic title, mirroring DB/migrations/0007_character_recommendations.sql
+RECOMMENDATION_SCHEMA = f"""
+create table if not exists character_recommendation (
+  title_key text not null,
+  character_key text not null,
+  character_name text not null,
+  registrations integer not null default 0,
+  affinity_sum integer not null default 0,
+  photo_url text null,
+  primary key (title_key, character_key)
+);
+create index if not exists character_recommendation_rank_idx
+  on character_recommendation (title_key, registrations desc, affinity_sum desc);
+
+create trigger if not exists comic_character_recommendation_insert after insert on comic_character
+begin {_recommendation_bump_sql("new", 1)} end;
+create trigger if not exists comic_character_recommendation_delete after delete on comic_character
+begin {_recommendation_bump_sql("old", -1)} end;
+create trigger if not exists comic_character_recommendation_update
+after update of comics_id, character_name, affinity, photo_url on comic_character
+begin {_recommendation_bump_sql("old", -1)} {_recommendation_bump_sql("new", 1)} end;
+
+create trigger if not exists comics_recommendation_title after update of title on comics
+when {_key_sql("old.title")} <> {_key_sql("new.title")}
+begin
+  update character_recommendation
+     set registrations = max(registrations - (select count(*) from comic_character c
+                                               where c.comics_id = new.id
+                                                 and {_key_sql("c.character_name")} = character_recommendation.character_key), 0),
+         affinity_sum = affinity_sum - (select coalesce(sum(c.affinity), 0) from comic_character c
+                                         where c.comics_id = new.id
+                                           and {_key_sql("c.character_name")} = character_recommendation.character_key)
+   where title_key = {_key_sql("old.title")};
+  insert into character_recommendation (title_key, character_key, character_name, registrations, affinity_sum, photo_url)
+  select {_key_sql("new.title")}, {_key_sql("c.character_name")}, min(c.character_name),
+         count(*), coalesce(sum(c.affinity), 0), max(c.photo_url)
+    from comic_character c where c.comics_id = new.id and {_key_sql("new.title")} <> ''
+   group by 2
+  on conflict (title_key, character_key) do update
+    set registrations = registrations + excluded.registrations,
+        affinity_sum = affinity_sum + excluded.affinity_sum,
+        photo_url = coalesce(excluded.photo_url, photo_url);
+end;
+"""
+
+COLUMNS = {
+    "comics": {"id", "title", "author", "review", "rating", "coverImage", "createdAt", "user_id"},
+    "comic_character": {"id", "created_at", "user_id", "comics_id", "photo_id", "note", "character_name",
+                        "photo_url", "affinity", "news_list"},
+    "photo_info": {"id", "created_at", "photo_base64", "note", "keyword1", "keyword2", "num"},
+}
+
+
+def _quote(column):
+    return f'"{column}"'
+
+
+class SqliteRepository(ComicRepository):
+    """
+    Embedded ComicRepository for offline / single-node deployments.
+    One connection per thread; WAL mode lets readers proceed while a write is in progress.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = None):
+        self.path = path or os.environ.get("SQLITE_PATH", "comiclib.db")
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.executescript(STATS_SCHEMA)
+        conn.executescript(RECOMMENDATION_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode = wal")
+            conn.execute("pragma synchronous = normal")
+            conn.execute("pragma foreign_keys = on")
+            conn.execute("pragma temp_store = memory")
+            conn.execute("pragma mmap_size = 268435456")
+            self._local.conn = conn
+        return conn
+
+    def _all(self, sql, params=()):
+        return [dict(row) for row in self._conn().execute(sql, params).fetchall()]
+
+    def _one(self, sql, params=()):
+        row = self._conn().execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def _columns(self, table, data):
+        unknown = set(data) - COLUMNS[table]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(sorted(unknown))}")
+        return list(data)
+
+    def _insert(self, table, data):
+        columns = self._columns(table, data)
+        sql = (f"insert into {table} ({', '.join(_quote(c) for c in columns)}) "
+               f"values ({', '.join('?' for _ in columns)}) returning *")
+        conn = self._conn()
+        with conn:
+            return [dict(row) for row in conn.execute(sql, [data[c] for c in columns]).fetchall()]
+
+    def _update(self, table, updates, where, params):
+        columns = self._columns(table, updates)
+        if not columns:
+            return []
+        sql = (f"update {table} set {', '.join(f'{_quote(c)} = ?' for c in columns)} "
+               f"where {where} returning *")
+        conn = self._conn()
+        with conn:
+            return [dict(row) for row in conn.execute(sql, [updates[c] for c in columns] + list(params)).fetchall()]
+
+    def _delete(self, table, where, params):
+        conn = self._conn()
+        with conn:
+            return [dict(row) for row in conn.execute(f"delete from {table} where {where} returning *", params).fetchall()]
+
+    # comics
+    def list_comics(self):
+        return self._all("select * from comics")
+
+    def get_comic_by_id(self, comic_id: int):
+        return self._one("select * from comics where id = ?", (comic_id,))
+
+    def get_comics_summary(self, comic_ids: list):
+        if not comic_ids:
+            return []
+        placeholders = ", ".join("?" for _ in comic_ids)
+        return self._all(f'select id, title, rating, "coverImage" from comics where id in ({placeholders})',
+                         [int(i) for i in comic_ids])
+
+    def insert_comic(self, comic_data: dict):
+        return self._insert("comics", comic_data)
+
+    def update_comic(self, comic_id: int, updates: dict):
+        return self._update("comics", updates, "id = ?", (comic_id,))
+
+    def delete_comic(self, comic_id: int):
+        return self._delete("comics", "id = ?", (comic_id,))
+
+    # comic_character
+    def get_character_by_id(self, character_id: int):
+        return self._one("select * from comic_character where id = ?", (character_id,))
+
+    def get_user_characters(self, user_id: str, comics_id: int = None):
+        # Postgres sorts nulls first on desc; keep the same order
+        if comics_id:
+            return self._all("select * from comic_character where user_id = ? and comics_id = ? "
+                             "order by affinity is not null, affinity desc", (user_id, int(comics_id)))
+        return self._all("select * from comic_character where user_id = ? "
+                         "order by affinity is not null, affinity desc", (user_id,))
+
+    def list_character_ids_for_comic(self, comics_id: int):
+        return [row["id"] for row in self._all("select id from comic_character where comics_id = ?", (comics_id,))]
+
+    def get_news_list(self, user_id: str):
+        rows = self._all("select a.character_name, b.title from comic_character a "
+                         "join comics b on a.comics_id = b.id "
+                         "where a.user_id = ? and a.news_list = 'Y'", (user_id,))
+        return [{"character_name": r["character_name"], "comics": {"title": r["title"]}} for r in rows]
+
+    def list_news_subscriptions(self):
+        rows = self._all("select a.user_id, a.character_name, b.title from comic_character a "
+                         "join comics b on a.comics_id = b.id "
+                         "where a.news_list = 'Y' order by a.id")
+        return [{"user_id": r["user_id"], "character_name": r["character_name"], "comics": {"title": r["title"]}}
+                for r in rows]
+
+    def insert_character(self, character_data: dict):
+        return self._insert("comic_character", character_data)
+
+    def update_character(self, character_id: int, updates: dict):
+        return self._update("comic_character", updates, "id = ?", (character_id,))
+
+    def delete_character(self, character_id: int):
+        return self._delete("comic_character", "id = ?", (character_id,))
+
+    def reorder_characters(self, user_id: str, comics_id: int, ranking: list):
+        # Same checks as DB/migrations/0002_reorder_comic_characters.sql, in one transaction
+        conn = self._conn()
+        ids = [int(r["id"]) for r in ranking]
+        affinities = {int(r["affinity"]) for r in ranking}
+        with conn:
+            conn.execute("begin immediate")
+            rows = conn.execute("select id, affinity from comic_character where user_id = ? and comics_id = ?",
+                                (user_id, comics_id)).fetchall()
+            owned = {row["id"] for row in rows}
+            if not set(ids) <= owned:
+                raise ValueError("ranking contains characters that do not belong to this user and comic")
+            if any(row["id"] not in ids and row["affinity"] in affinities for row in rows):
+                raise ValueError("ranking collides with the affinity of characters not included in it")
+
+            conn.executemany("update comic_character set affinity = ? where id = ?",
+                             [(int(r["affinity"]), int(r["id"])) for r in ranking])
+
+        return self._all("select * from comic_character where user_id = ? and comics_id = ? "
+                         "order by affinity desc, id", (user_id, comics_id))
+
+    def get_user_stats(self, user_id: str):
+        stats = self._one("select comics_count, characters_count from user_stats where user_id = ?", (user_id,)) or {}
+        top_author = self._one("select author, comics_count from user_author_stats "
+                               "where user_id = ? and comics_count > 0 order by comics_count desc limit 1", (user_id,))
+        top_first = self._one("select character_name, first_count from user_top_character_stats "
+                              "where user_id = ? and first_count > 0 order by first_count desc limit 1", (user_id,))
+        first_ranked = self._all("select character_id, character_name, comics_id, affinity from comic_top_character "
+                                 "where user_id = ? order by affinity desc nulls last limit 5", (user_id,))
+        return {
+            "user_id": user_id,
+            "comics_count": stats.get("comics_count", 0),
+            "characters_count": stats.get("characters_count", 0),
+            "top_author": top_author,
+            "top_first_character": top_first,
+            "first_ranked_characters": first_ranked
+        }
+
+    def get_character_recommendations(self, title: str, limit: int = 10):
+        return self._all("select character_name, registrations, "
+                         "round(cast(affinity_sum as real) / registrations, 2) as avg_affinity, photo_url "
+                         f"from character_recommendation where title_key = {_key_sql('?')} and registrations > 0 "
+                         "order by registrations desc, affinity_sum desc limit ?", (title, int(limit)))
+
+    # news_digest
+    def get_news_digest(self, user_id: str):
+        row = self._one("select * from news_digest where user_id = ?", (user_id,))
+        if row:
+            row["items"] = json.loads(row["items"])
+            row["targets"] = json.loads(row["targets"])
+        return row
+
+    def save_news_digest(self, user_id: str, items: list, targets: list, generated_at: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("insert into news_digest (user_id, items, targets, generated_at) values (?, ?, ?, ?) "
+                         "on conflict (user_id) do update set items = excluded.items, "
+                         "targets = excluded.targets, generated_at = excluded.generated_at",
+                         (user_id, json.dumps(items, ensure_ascii=False),
+                          json.dumps(targets, ensure_ascii=False), generated_at))
+        return [self.get_news_digest(user_id)]
+
+    # photo_info
+    def list_photos(self, id: int, num: int = None):
+        if num is not None:
+            return self._all("select * from photo_info where id = ? and num = ? order by num", (id, int(num)))
+        return self._all("select * from photo_info where id = ? order by num", (id,))
+
+    def get_lead_photos(self, character_ids: list):
+        if not character_ids:
+            return []
+        placeholders = ", ".join("?" for _ in character_ids)
+        return self._all("select p.id, p.num, p.photo_base64, p.keyword1, p.keyword2 from photo_info p "
+                         f"join (select id, min(num) as num from photo_info where id in ({placeholders}) group by id) m "
+                         "on p.id = m.id and p.num = m.num order by p.id", [int(i) for i in character_ids])
+
+    def search_photos(self, user_id: str, query: str, limit: int, offset: int):
+        # A user's gallery is small; scan it through comic_character_user_affinity_idx
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where = ("from photo_info p join comic_character c on c.id = p.id "
+                 "where c.user_id = ? and (coalesce(p.keyword1, '') || ' ' || coalesce(p.keyword2, '') || ' ' || "
+                 "coalesce(p.note, '')) like ? escape '\\'")
+        total = self._one(f"select count(*) as total {where}", (user_id, pattern))["total"]
+        items = self._all("select p.id, p.num, p.photo_base64, p.keyword1, p.keyword2, p.note, p.created_at, "
+                          f"c.character_name, c.comics_id {where} order by p.created_at desc, p.id, p.num "
+                          "limit ? offset ?", (user_id, pattern, limit, offset))
+        return {"total": total, "items": items}
+
+    def get_max_photo_num(self, id: int):
+        row = self._one("select max(num) as num from photo_info where id = ?", (id,))
+        return (row or {}).get("num") or 0
+
+    def insert_photo(self, photo_data: dict):
+        return self._insert("photo_info", photo_data)
+
+    def delete_photos(self, id: int, num: int = None):
+        if num is not None:
+            return self._delete("photo_info", "id = ? and num = ?", (id, int(num)))
+        return self._delete("photo_info", "id = ?", (id,))
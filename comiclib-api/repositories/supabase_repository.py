@@ -0,0 +1,157 @@
+from repositories.base import ComicRepository
+
+
+class SupabaseRepository(ComicRepository):
+    """ComicRepository over supabase-py / PostgREST."""
+
+    name = "supabase"
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    # comics
+    def list_comics(self):
+        return self.supabase.table("comics").select("*").execute().data
+
+    def get_comic_by_id(self, comic_id: int):
+        # None when missing, like the sqlite and direct-Postgres readers (.single() would raise)
+        response = self.supabase.table("comics").select("*").eq("id", comic_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def get_comics_summary(self, comic_ids: list):
+        response = self.supabase.table("comics")\
+            .select("id, title, rating, coverImage")\
+            .in_("id", comic_ids)\
+            .execute()
+        return response.data
+
+    def insert_comic(self, comic_data: dict):
+        return self.supabase.table("comics").insert(comic_data).execute().data
+
+    def update_comic(self, comic_id: int, updates: dict):
+        return self.supabase.table("comics").update(updates).eq("id", comic_id).execute().data
+
+    def delete_comic(self, comic_id: int):
+        return self.supabase.table("comics").delete().eq("id", comic_id).execute().data
+
+    # comic_character
+    def get_character_by_id(self, character_id: int):
+        response = self.supabase.table("comic_character").select("*").eq("id", character_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def get_user_characters(self, user_id: str, comics_id: int = None):
+        query = self.supabase.table("comic_character").select("*").eq("user_id", user_id).order("affinity", desc=True)
+        if comics_id:
+            query = query.eq("comics_id", comics_id)
+        return query.execute().data
+
+    def list_character_ids_for_comic(self, comics_id: int):
+        chars = self.supabase.table("comic_character").select("id").eq("comics_id", comics_id).execute()
+        return [c['id'] for c in chars.data]
+
+    def get_news_list(self, user_id: str):
+        # 'comics!inner' forces an inner join (like a.comics_id = b.id)
+        response = self.supabase.table("comic_character")\
+            .select("character_name, comics!inner(title)")\
+            .eq("user_id", user_id)\
+            .eq("news_list", "Y")\
+            .execute()
+        return response.data
+
+    def list_news_subscriptions(self):
+        # PostgREST caps rows per response; page through with range()
+        rows, start, page = [], 0, 1000
+        while True:
+            response = self.supabase.table("comic_character")\
+                .select("user_id, character_name, comics!inner(title)")\
+                .eq("news_list", "Y")\
+                .order("id")\
+                .range(start, start + page - 1)\
+                .execute()
+            rows.extend(response.data)
+            if len(response.data) < page:
+                return rows
+            start += page
+
+    def insert_character(self, character_data: dict):
+        return self.supabase.table("comic_character").insert(character_data).execute().data
+
+    def update_character(self, character_id: int, updates: dict):
+        return self.supabase.table("comic_character").update(updates).eq("id", character_id).execute().data
+
+    def delete_character(self, character_id: int):
+        return self.supabase.table("comic_character").delete().eq("id", character_id).execute().data
+
+    def reorder_characters(self, user_id: str, comics_id: int, ranking: list):
+        # Single transaction server-side: DB/migrations/0002_reorder_comic_characters.sql
+        response = self.supabase.rpc("reorder_comic_characters", {
+            "p_user_id": user_id,
+            "p_comics_id": comics_id,
+            "p_ranking": ranking
+        }).execute()
+        return response.data
+
+    def get_user_stats(self, user_id: str):
+        # Aggregates maintained by triggers: DB/migrations/0003_user_stats.sql
+        return self.supabase.rpc("get_user_stats", {"p_user_id": user_id}).execute().data
+
+    def get_character_recommendations(self, title: str, limit: int = 10):
+        # Trigger-maintained index: DB/migrations/0007_character_recommendations.sql
+        return self.supabase.rpc("get_character_recommendations", {"p_title": title, "p_limit": limit}).execute().data
+
+    # news_digest (DB/migrations/0004_news_digest.sql)
+    def get_news_digest(self, user_id: str):
+        response = self.supabase.table("news_digest").select("*").eq("user_id", user_id).execute()
+        return response.data[0] if response.data else None
+
+    def save_news_digest(self, user_id: str, items: list, targets: list, generated_at: str):
+        return self.supabase.table("news_digest").upsert({
+            "user_id": user_id,
+            "items": items,
+            "targets": targets,
+            "generated_at": generated_at
+        }).execute().data
+
+    # photo_info
+    def list_photos(self, id: int, num: int = None):
+        query = self.supabase.table("photo_info").select("*").eq("id", id)
+        if num is not None:
+            query = query.eq("num", num)
+        return query.order("num").execute().data
+
+    def get_lead_photos(self, character_ids: list):
+        if not character_ids:
+            return []
+        # One row per id, picked server-side: DB/migrations/0008_get_lead_photos.sql
+        return self.supabase.rpc("get_lead_photos", {
+            "p_ids": [int(i) for i in character_ids]
+        }).execute().data
+
+    def search_photos(self, user_id: str, query: str, limit: int, offset: int):
+        # Trigram-indexed search: DB/migrations/0005_photo_search_index.sql, 0006_search_photo_gallery.sql
+        return self.supabase.rpc("search_photo_gallery", {
+            "p_user_id": user_id,
+            "p_query": query,
+            "p_limit": limit,
+            "p_offset": offset
+        }).execute().data
+
+    def get_max_photo_num(self, id: int):
+        response = self.supabase.table("photo_info")\
+            .select("num")\
+            .eq("id", id)\
+            .order("num", desc=True)\
+            .limit(1)\
+            .execute()
+        if response.data:
+            return response.data[0].get('num', 0)
+        return 0
+
+    def insert_photo(self, photo_data: dict):
+        return self.supabase.table("photo_info").insert(photo_data).execute().data
+
+    def delete_photos(self, id: int, num: int = None):
+        query = self.supabase.table("photo_info").delete().eq("id", id)
+        if num is not None:
+            query = query.eq("num", num)
+        return query.execute().data
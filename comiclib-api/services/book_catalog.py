@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+from collections import deque
+from utils.metrics import Counters, register_metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Every book Naver returns is kept in a local SQLite catalog (deduplicated by ISBN) and indexed
+# in memory, so autocomplete and repeat searches are answered without calling openapi.naver.com.
+BOOK_CATALOG_PATH = os.environ.get("BOOK_CATALOG_PATH", "book_catalog.db")
+# A local search must find at least this many books (or `display`, if smaller) to skip Naver
+BOOK_CATALOG_MIN_RESULTS = int(os.environ.get("BOOK_CATALOG_MIN_RESULTS", 5))
+LATENCY_WINDOW = 500
+
+SCHEMA = """
+create table if not exists books (
+  isbn text primary key,
+  title text not null,
+  author text null,
+  item text not null,
+  hits integer not null default 0,
+  updated_at integer not null
+);
+"""
+
+_TAG = re.compile(r"<[^>]+>")
+_TOKEN = re.compile(r"[\w]+")
+
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", _TAG.sub("", text or "")).lower().strip()
+
+
+def _isbn_key(item):
+    # Naver sends "ISBN10 ISBN13" (either may be missing); key on the 13-digit one when present
+    parts = (item.get("isbn") or "").split()
+    return parts[-1] if parts else None
+
+
+def _bigrams(text):
+    compact = "".join(_TOKEN.findall(text))
+    return {compact[i:i + 2] for i in range(len(compact) - 1)} if len(compact) > 1 else {compact} - {""}
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class PrefixTrie:
+    """Token prefix -> ids; every node keeps the ids of all tokens below it, so lookup is O(len(prefix))."""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, token, id_):
+        node = self.root
+        for ch in token:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.ids.add(id_)
+
+    def remove(self, token, id_):
+        node = self.root
+        path = []
+        for ch in token:
+            child = node.children.get(ch)
+            if child is None:
+                return
+            child.ids.discard(id_)
+            path.append((node, ch, child))
+            node = child
+        # Drop nodes no token reaches any more
+        for parent, ch, child in reversed(path):
+            if child.ids:
+                break
+            del parent.children[ch]
+
+    def lookup(self, prefix):
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.ids
+
+
+class BookCatalog:
+    """
+    Persistent ISBN-keyed book store plus two in-memory indexes over title and author:
+    a token-prefix trie (autocomplete as you type) and a character-bigram index
+    (Korean titles written without spaces, e.g. "피스" in "원피스").
+    """
+
+    def __init__(self, path=BOOK_CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.executescript(SCHEMA)
+        self._books = {}
+        self._hits = {}
+        self._trie = PrefixTrie()
+        self._grams = {}
+        for isbn, item, hits in self._conn.execute("select isbn, item, hits from books"):
+            self._index(isbn, json.loads(item), hits)
+
+    def _index(self, isbn, item, hits=0):
+        # Caller holds self._lock (or is __init__)
+        if isbn in self._books:
+            # Refreshed book: its old title/author must no longer match
+            self._unindex(isbn)
+        self._books[isbn] = item
+        self._hits[isbn] = hits
+        text = normalize(f"{item.get('title', '')} {item.get('author', '')}")
+        for token in _TOKEN.findall(text):
+            self._trie.add(token, isbn)
+        for gram in _bigrams(text):
+            self._grams.setdefault(gram, set()).add(isbn)
+
+    def _unindex(self, isbn):
+        # Caller holds self._lock
+        book = self._books[isbn]
+        text = normalize(f"{book.get('title', '')} {book.get('author', '')}")
+        for token in _TOKEN.findall(text):
+            self._trie.remove(token, isbn)
+        for gram in _bigrams(text):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(isbn)
+                if not ids:
+                    del self._grams[gram]
+
+    def __len__(self):
+        return len(self._books)
+
+    def ingest(self, items):
+        """Add/refresh books from a Naver response; returns how many were new."""
+        now = int(time.time())
+        rows, new = [], 0
+        with self._lock:
+            for item in items or []:
+                isbn = _isbn_key(item)
+                if not isbn:
+                    continue
+                item = {**item, "title": _TAG.sub("", item.get("title", "")), "author": _TAG.sub("", item.get("author", ""))}
+                if isbn not in self._books:
+                    new += 1
+                self._index(isbn, item, self._hits.get(isbn, 0))
+                rows.append((isbn, item["title"], item["author"], json.dumps(item, ensure_ascii=False), now))
+            if rows:
+                with self._conn:
+                    self._conn.executemany(
+                        "insert into books (isbn, title, author, item, updated_at) values (?, ?, ?, ?, ?) "
+                        "on conflict (isbn) do update set title = excluded.title, author = excluded.author, "
+                        "item = excluded.item, updated_at = excluded.updated_at",
+                        rows
+                    )
+        return new
+
+    def search(self, query, limit=10):
+        """Books matching every query token (as a token prefix, else as a substring), most popular first."""
+        text = normalize(query)
+        tokens = _TOKEN.findall(text)
+        if not tokens:
+            return []
+
+        with self._lock:
+            ids = None
+            for token in tokens:
+                matches = self._trie.lookup(token)
+                if not matches:
+                    # Not a token prefix: fall back to bigrams (substring of a spaceless title)
+                    matches = self._gram_matches(token)
+                ids = set(matches) if ids is None else ids & matches
+                if not ids:
+                    return []
+
+            ranked = sorted(ids, key=lambda isbn: (-self._hits.get(isbn, 0), len(self._books[isbn].get("title", ""))))
+            return [self._books[isbn] for isbn in ranked[:limit]]
+
+    def _gram_matches(self, token):
+        grams = _bigrams(token)
+        if not grams:
+            return set()
+        ids = None
+        for gram in grams:
+            found = self._grams.get(gram, set())
+            ids = set(found) if ids is None else ids & found
+            if not ids:
+                return set()
+        # Bigram sets can match out of order; confirm the substring
+        return {isbn for isbn in ids if token in self._compact_text(isbn)}
+
+    def _compact_text(self, isbn):
+        book = self._books[isbn]
+        return "".join(_TOKEN.findall(normalize(f"{book.get('title', '')} {book.get('author', '')}")))
+
+    def record_selection(self, items):
+        """Bump popularity for books that were served (used for ranking)."""
+        isbns = [isbn for isbn in (_isbn_key(item) for item in items) if isbn]
+        if not isbns:
+            return
+        with self._lock:
+            for isbn in isbns:
+                self._hits[isbn] = self._hits.get(isbn, 0) + 1
+            with self._conn:
+                self._conn.executemany("update books set hits = hits + 1 where isbn = ?", [(i,) for i in isbns])
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+_counters = Counters("local_hits", "local_misses", "deep_searches", "upstream_calls", "upstream_errors",
+                     "autocomplete_requests", "books_added")
+_autocomplete_ms = deque(maxlen=LATENCY_WINDOW)
+_latency_lock = threading.Lock()
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = BookCatalog()
+    return _catalog
+
+
+def record_autocomplete_latency(ms):
+    with _latency_lock:
+        _autocomplete_ms.append(ms)
+
+
+def catalog_stats():
+    stats = _counters.snapshot()
+    with _latency_lock:
+        ordered = sorted(_autocomplete_ms)
+    stats["books"] = len(get_catalog())
+    stats["autocomplete_p50_ms"] = round(ordered[len(ordered) // 2], 3) if ordered else None
+    stats["autocomplete_p95_ms"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3) if ordered else None
+    searches = stats["local_hits"] + stats["local_misses"]
+    stats["local_hit_rate"] = round(stats["local_hits"] / searches, 4) if searches else 0.0
+    return stats
+
+
+def count(name, amount=1):
+    _counters.incr(name, amount)
+
+
+register_metrics("book_catalog", catalog_stats)
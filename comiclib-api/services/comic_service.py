@@ -1,31 +1,80 @@
-from utils.db import get_supabase
-from google.cloud import storage
+from repositories import get_repository
+from utils.gcs import BUCKET_NAME, get_storage_client, signing_kwargs, sign_blob_urls, forget_signed_urls
+from services.read_backend import create_read_backend
+from utils.cache import get_view_cache, ALL_USERS
+from utils.log import get_logger
 import base64
+import threading
 from datetime import timedelta
-import datetime
+
+logger = get_logger(__name__)
+
+COVER_PREFIX = "covers/"
+COVER_MAX_BYTES = 10 * 1024 * 1024
+# A direct upload is bound to the user (and comic) that created its session through object
+# metadata the signed URL / resumable session fixes; complete_upload only accepts a matching caller
+UPLOAD_USER_META = "comiclib-user-id"
+UPLOAD_COMIC_META = "comiclib-comic-id"
+
+# Cached read views; each mutator invalidates exactly the views it can change
+VIEW_COMICS = "comics"
+VIEW_CHARACTERS = "characters"
+VIEW_NEWS = "news_list"
+
+PHOTO_PREFIX = "AI_photo/"
+GALLERY_MAX_PAGE_SIZE = 50
+PHOTO_PUBLIC_URL_PREFIX = f"https://storage.googleapis.com/{BUCKET_NAME}/"
+
+
+def _photo_blob_path(photo_val):
+    """GCS object path for a photo_info.photo_base64 value, or None for inline/legacy data."""
+    if not photo_val:
+        return None
+    # Case 1: Stored as relative path (New way)
+    if photo_val.startswith(PHOTO_PREFIX):
+        return photo_val
+    # Case 2: Stored as full public URL
+    if photo_val.startswith(PHOTO_PUBLIC_URL_PREFIX):
+        return photo_val[len(PHOTO_PUBLIC_URL_PREFIX):]
+    return None
 
 class ComicService:
     def __init__(self):
-        self.supabase = get_supabase()
+        # Storage backend (COMICLIB_STORAGE=supabase|sqlite)
+        self.repo = get_repository()
         self.table_name = "comics"
+        # Hot read paths (COMICLIB_READ_BACKEND=postgrest|postgres)
+        self.reads = create_read_backend(self.repo)
+        # Per-user read-through cache (COMICLIB_CACHE=memory|redis|off)
+        self.cache = get_view_cache()
+
+    def _invalidate_rows(self, rows, *views):
+        """Invalidate the given views for every user owning one of the affected rows."""
+        for user_id in {row.get('user_id') for row in (rows or []) if isinstance(row, dict)}:
+            self.cache.invalidate(user_id, *views)
+
+    def _invalidate_character_owner(self, character_id, *views):
+        """photo_info rows carry no user_id; invalidate through the owning character."""
+        character = self.repo.get_character_by_id(character_id)
+        if character:
+            self._invalidate_rows([character], *views)
 
     def get_comics(self):
         """Fetch all comics."""
-        response = self.supabase.table(self.table_name).select("*").execute()
-        return response.data
+        return self.cache.get_or_load(ALL_USERS, VIEW_COMICS, "", self.repo.list_comics)
 
     def get_comic_by_id(self, comic_id: int):
         """Fetch a single comic by ID."""
-        response = self.supabase.table(self.table_name).select("*").eq("id", comic_id).single().execute()
-        return response.data
+        return self.reads.get_comic_by_id(comic_id)
 
     def add_comic(self, comic_data: dict):
         """
         Add a new comic.
         comic_data should contain: title, author, review, rating, coverImage
         """
-        response = self.supabase.table(self.table_name).insert(comic_data).execute()
-        return response.data
+        result = self.repo.insert_comic(comic_data)
+        self.cache.invalidate(ALL_USERS, VIEW_COMICS)
+        return result
 
     def add_comic_character(self, character_data: dict):
         """
@@ -33,66 +82,132 @@ class ComicService:
         Table: comic_character
         Columns: usesr_id, comics_id, photo_id, note, character_name
         """
-
-        response = self.supabase.table("comic_character").insert(character_data).execute()
-
-        return response.data
+        result = self.repo.insert_character(character_data)
+        self._invalidate_rows(result, VIEW_CHARACTERS, VIEW_NEWS)
+        return result
 
     def update_comic(self, comic_id: int, updates: dict):
         """Update a comic by ID."""
-        response = self.supabase.table(self.table_name).update(updates).eq("id", comic_id).execute()
-        return response.data
+        result = self.repo.update_comic(comic_id, updates)
+        self.cache.invalidate(ALL_USERS, VIEW_COMICS)
+        # Character and news views embed the comic's title/rating/coverImage
+        self._invalidate_rows(result, VIEW_CHARACTERS, VIEW_NEWS)
+        return result
 
     def delete_comic(self, comic_id: int):
         """Delete a comic by ID."""
         # 1. Get all characters for this comic
-        chars = self.supabase.table("comic_character").select("id").eq("comics_id", comic_id).execute()
-        
-        for char in chars.data:
-            char_id = char['id']
+        char_ids = self.repo.list_character_ids_for_comic(comic_id)
+
+        for char_id in char_ids:
             # 2. Delete all photos for this character (GCS + DB)
             # The 'id' in photo_info corresponds to comic_character.id
             self.delete_photo_info_by_id(char_id)
             
             # 3. Delete the character
-            self.supabase.table("comic_character").delete().eq("id", char_id).execute()
+            deleted = self.repo.delete_character(char_id)
+            self._invalidate_rows(deleted, VIEW_CHARACTERS, VIEW_NEWS)
             
         # 4. Delete the comic
-        response = self.supabase.table(self.table_name).delete().eq("id", comic_id).execute()
-        return response.data
+        result = self.repo.delete_comic(comic_id)
+        self.cache.invalidate(ALL_USERS, VIEW_COMICS)
+        self._invalidate_rows(result, VIEW_CHARACTERS, VIEW_NEWS)
+        return result
 
     def delete_comic_character(self, character_id: int):
         """Delete a comic character by ID."""
-        response = self.supabase.table("comic_character").delete().eq("id", character_id).execute()
-        return response.data
+        result = self.repo.delete_character(character_id)
+        self._invalidate_rows(result, VIEW_CHARACTERS, VIEW_NEWS)
+        return result
 
     def get_character_by_id(self, character_id: int):
         """Fetch a single character by ID."""
-        response = self.supabase.table("comic_character").select("*").eq("id", character_id).single().execute()
-        return response.data
+        return self.reads.get_character_by_id(character_id)
 
     def update_comic_character(self, character_id: int, updates: dict):
         """Update a comic character by ID."""
-        response = self.supabase.table("comic_character").update(updates).eq("id", character_id).execute()
-        return response.data
+        result = self.repo.update_character(character_id, updates)
+        self._invalidate_rows(result, VIEW_CHARACTERS, VIEW_NEWS)
+        return result
+
+    def reorder_comic_characters(self, user_id: str, comics_id: int, ranking: list):
+        """
+        Apply a whole affinity ranking for one comic in a single round-trip.
+        ranking: [{"id": character_id, "affinity": value}, ...]
+        On Supabase this is the reorder_comic_characters RPC (DB/migrations/0002_reorder_comic_characters.sql),
+        which updates every row in one transaction and returns the new ordering.
+        """
+        if not ranking:
+            raise ValueError("ranking must not be empty")
+
+        ids = []
+        affinities = []
+        for entry in ranking:
+            if not isinstance(entry, dict) or 'id' not in entry or 'affinity' not in entry:
+                raise ValueError("each ranking entry needs 'id' and 'affinity'")
+            ids.append(int(entry['id']))
+            affinities.append(int(entry['affinity']))
+
+        # Reject early so a bad ordering never reaches the database
+        if len(set(ids)) != len(ids):
+            raise ValueError("ranking contains duplicate character ids")
+        if len(set(affinities)) != len(affinities):
+            raise ValueError("ranking contains duplicate affinity values")
+
+        payload = [{"id": i, "affinity": a} for i, a in zip(ids, affinities)]
+        result = self.repo.reorder_characters(user_id, comics_id, payload)
+        self.cache.invalidate(user_id, VIEW_CHARACTERS)
+        return result
 
-    def get_characters_info(self, user_id: str, comics_id: int = None):
+    def get_characters_info(self, user_id: str, comics_id: int = None, with_photos: bool = False):
         """
         Fetch characters with their associated comic info.
         Optionally filter by comics_id.
-        Since foreign key relationship might be missing, we do a manual join.
+        Served from the per-user cache; see _load_characters_info for the query.
+        with_photos adds each character's first photo as "lead_photo" (signed URL included),
+        so the client doesn't need a photo-info request per character.
         """
+        characters = self.cache.get_or_load(
+            user_id, VIEW_CHARACTERS, comics_id or "",
+            lambda: self._load_characters_info(user_id, comics_id)
+        )
+        if not with_photos or not characters:
+            return characters
+        return self._attach_lead_photos(user_id, comics_id, characters)
+
+    def _attach_lead_photos(self, user_id: str, comics_id, characters: list):
+        # Lead rows are cached with the characters view (photo mutations invalidate it);
+        # URLs are signed per response since they expire.
+        ids = [c['id'] for c in characters if c.get('id') is not None]
+        leads = self.cache.get_or_load(
+            user_id, VIEW_CHARACTERS, f"{comics_id or ''}:lead_photos",
+            lambda: {str(p['id']): p for p in self.repo.get_lead_photos(ids)}
+        )
+
+        paths = {char_id: _photo_blob_path(p.get('photo_base64')) for char_id, p in leads.items()}
+        urls = sign_blob_urls([path for path in paths.values() if path]) if any(paths.values()) else {}
 
-        
-        # 1. Fetch characters for the user
-        query = self.supabase.table("comic_character").select("*").eq("user_id", user_id).order("affinity", desc=True)
-        
-        if comics_id:
-            query = query.eq("comics_id", comics_id)
-
-        chars_response = query.execute()
+        result = []
+        for char in characters:
+            lead = leads.get(str(char.get('id')))
+            lead_photo = None
+            if lead:
+                lead_photo = {
+                    "num": lead.get('num'),
+                    "keyword1": lead.get('keyword1'),
+                    "keyword2": lead.get('keyword2'),
+                    "url": urls.get(paths.get(str(char.get('id'))))
+                }
+            # Copy: cached rows are shared between requests
+            result.append({**char, "lead_photo": lead_photo})
+        return result
 
-        characters = chars_response.data
+    def _load_characters_info(self, user_id: str, comics_id: int = None):
+        """
+        Since foreign key relationship might be missing, we do a manual join.
+        """
+        # 1. Fetch characters for the user
+        characters = self.reads.get_user_characters(user_id, comics_id)
         if not characters:
             return []
 
@@ -102,12 +217,7 @@ class ComicService:
             return characters # Return characters without comic info if no IDs
 
         # 3. Fetch comics details
-        comics_response = self.supabase.table("comics")\
-            .select("id, title, rating, coverImage")\
-            .in_("id", comic_ids)\
-            .execute()
-        
-        comics_map = {c['id']: c for c in comics_response.data}
+        comics_map = {c['id']: c for c in self.reads.get_comics_summary(comic_ids)}
 
         # 4. Merge data
         result = []
@@ -124,6 +234,22 @@ class ComicService:
             
         return result
 
+    def get_user_stats(self, user_id: str):
+        """
+        Library statistics for the stats screen.
+        Read from aggregates the database keeps up to date on every add/delete/ranking change,
+        so the cost doesn't grow with the size of the library.
+        """
+        return self.repo.get_user_stats(user_id)
+
+    def get_character_recommendations(self, title: str, limit: int = 10):
+        """
+        Characters other users registered for this comic title (case/space-insensitive),
+        ranked by how often they were registered, then by affinity.
+        Backed by an index the database updates on every character/comic write.
+        """
+        return self.repo.get_character_recommendations(title, limit) or []
+
     def get_news_list_data(self, user_id: str):
         """
         Fetch data for news list where user_id matches and news_list is 'Y'.
@@ -135,105 +261,50 @@ class ComicService:
         and a.user_id = :user_id
         and a.news_list = 'Y'
         """
-        # Using Supabase embedding (joins)
-        # We select from comic_character (a) and join comics (b)
-        # 'comics!inner' forces an inner join (like a.comics_id = b.id)
-        # Filters are applied on comic_character
-        response = self.supabase.table("comic_character")\
-            .select("character_name, comics!inner(title)")\
-            .eq("user_id", user_id)\
-            .eq("news_list", "Y")\
-            .execute()
-
-        return response.data
+        return self.cache.get_or_load(user_id, VIEW_NEWS, "", lambda: self.repo.get_news_list(user_id))
 
     def get_photo_info_by_id(self, id: int):
         """Fetch photo_info by id (character id)."""
-        response = self.supabase.table("photo_info").select("*").eq("id", id).order("num").execute()
+        photos = self.repo.list_photos(id)
 
-        photos = response.data
-
-        # Generate Signed URLs for GCS paths
-        key_path = "hackton-team-pro-68bac217be8c.json"
-        
-        credentials = None
-        import os
-        from google.oauth2 import service_account
-        import google.auth
-        import google.auth.transport.requests
-
-        if os.path.exists(key_path):
-             # Local Dev with Key File
-             try:
-                 credentials = service_account.Credentials.from_service_account_file(key_path)
-                 client = storage.Client(credentials=credentials)
-             except Exception as e:
-                 print(f"Failed to load key file: {e}")
-                 client = storage.Client()
-        else:
-             # Cloud Run / Prod (No Key File) -> Use IAM Signing
-             try:
-                credentials, project_id = google.auth.default()
-                
-                # Refresh credentials to ensure we have a token and email
-                if not credentials.valid:
-                    request = google.auth.transport.requests.Request()
-                    credentials.refresh(request)
-                
-                client = storage.Client(credentials=credentials)
-             except Exception as e:
-                 print(f"Auth default failed: {e}")
-                 client = storage.Client()
-
-        bucket = client.bucket("2dfriend_photo")
-        
-        for photo in photos:
-            photo_val = photo.get('photo_base64', '')
-            blob_path = None
-
-            # Case 1: Stored as relative path (New way)
-            if photo_val and photo_val.startswith('AI_photo/'):
-                blob_path = photo_val
-            
-            # Case 2: Stored as full public URL
-            elif photo_val and photo_val.startswith('https://storage.googleapis.com/2dfriend_photo/'):
-                blob_path = photo_val.replace('https://storage.googleapis.com/2dfriend_photo/', '')
-
-            if blob_path:
-                try:
-                    blob = bucket.blob(blob_path)
-                    
-                    kwargs = {
-                        "version": "v4",
-                        "expiration": datetime.timedelta(hours=1),
-                        "method": "GET"
-                    }
-
-                    # Determine if we need to pass IAM credentials explicitly
-                    # (Standard Compute Engine creds don't sign locally)
-                    service_account_email = None
-                    if credentials:
-                        if hasattr(credentials, 'service_account_email'):
-                            service_account_email = credentials.service_account_email
-                        elif hasattr(credentials, 'signer_email'):
-                            service_account_email = credentials.signer_email
-
-                        # If using IAM (not a local Service Account Key), pass email and token
-                        if service_account_email and not isinstance(credentials, service_account.Credentials):
-                             kwargs["service_account_email"] = service_account_email
-                             kwargs["access_token"] = credentials.token
-                    
-                    signed_url = blob.generate_signed_url(**kwargs)
-                    photo['photo_base64'] = signed_url
-                    
-                except Exception as e:
-                    print(f"Error generating signed URL for {photo_val}: {e}")
-                    if "private key" in str(e):
-                         print("HINT: On Cloud Run, ensure Service Account has 'Service Account Token Creator' role.")
-                    pass
+        # Generate Signed URLs for GCS paths (one credential lookup for the whole list)
+        paths = [_photo_blob_path(photo.get('photo_base64', '')) for photo in photos]
+        urls = sign_blob_urls([path for path in paths if path]) if any(paths) else {}
+        for photo, blob_path in zip(photos, paths):
+            if blob_path and blob_path in urls:
+                photo['photo_base64'] = urls[blob_path]
 
         return photos
 
+    def search_gallery(self, user_id: str, query: str, page: int = 1, page_size: int = 20):
+        """
+        Search all of a user's photos by keyword1/keyword2/note (substring match), newest first.
+        Each result carries a signed "url"; the page is signed in one batch.
+        """
+        query = (query or "").strip()
+        if not query:
+            raise ValueError("query must not be empty")
+        page = max(1, int(page))
+        page_size = min(max(1, int(page_size)), GALLERY_MAX_PAGE_SIZE)
+
+        found = self.repo.search_photos(user_id, query, page_size, (page - 1) * page_size)
+        items = found.get("items") or []
+
+        paths = [_photo_blob_path(item.get('photo_base64')) for item in items]
+        urls = sign_blob_urls([path for path in paths if path]) if any(paths) else {}
+        for item, blob_path in zip(items, paths):
+            item['url'] = urls.get(blob_path)
+            item.pop('photo_base64', None)
+
+        total = found.get("total") or 0
+        return {
+            "items": items,
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "has_more": page * page_size < total
+        }
+
     def delete_photo_info_by_id(self, id: int, num: int = None):
         """
         Delete photo_info and associated GCS files by id.
@@ -241,73 +312,31 @@ class ComicService:
         """
         
         # 1. Fetch records to get file paths
-        query = self.supabase.table("photo_info").select("*").eq("id", id)
-        if num is not None:
-             query = query.eq("num", num)
-        
-        target_photos = query.execute().data
+        target_photos = self.repo.list_photos(id, num)
+        blob_paths = [path for path in (_photo_blob_path(p.get('photo_base64', '')) for p in target_photos) if path]
         
-        if target_photos:
+        if blob_paths:
             try:
-                # 2. Setup GCS Client (Reusing auth logic)
-                key_path = "hackton-team-pro-68bac217be8c.json"
-                credentials = None
-                import os
-                from google.oauth2 import service_account
-                import google.auth
-                import google.auth.transport.requests
-
-                if os.path.exists(key_path):
-                     try:
-                         credentials = service_account.Credentials.from_service_account_file(key_path)
-                         client = storage.Client(credentials=credentials)
-                     except Exception as e:
-                         print(f"Failed to load key file: {e}")
-                         client = storage.Client()
-                else:
-                     try:
-                        credentials, project_id = google.auth.default()
-                        if not credentials.valid:
-                            request = google.auth.transport.requests.Request()
-                            credentials.refresh(request)
-                        client = storage.Client(credentials=credentials)
-                     except Exception as e:
-                         print(f"Auth default failed: {e}")
-                         client = storage.Client()
-
-                bucket = client.bucket("2dfriend_photo")
-
-                # 3. Delete files from GCS
-                for photo in target_photos:
-                    photo_val = photo.get('photo_base64', '')
-                    blob_path = None
-                    
-                    if photo_val:
-                        # Handle raw path or full URL
-                        if photo_val.startswith('AI_photo/'):
-                             blob_path = photo_val
-                        elif photo_val.startswith('https://storage.googleapis.com/2dfriend_photo/'):
-                             blob_path = photo_val.replace('https://storage.googleapis.com/2dfriend_photo/', '')
-                    
-                    if blob_path:
-                        try:
-                            blob = bucket.blob(blob_path)
-                            blob.delete()
-                            print(f"Deleted GCS blob: {blob_path}")
-                        except Exception as e:
-                            print(f"Failed to delete GCS blob {blob_path}: {e}")
-                            pass
+                # 2. Delete files from GCS
+                client, _ = get_storage_client()
+                bucket = client.bucket(BUCKET_NAME)
+
+                for blob_path in blob_paths:
+                    try:
+                        bucket.blob(blob_path).delete()
+                        logger.debug("Deleted GCS blob", extra={"blob_path": blob_path})
+                    except Exception as e:
+                        logger.warning("Failed to delete GCS blob", extra={"blob_path": blob_path, "error": str(e)})
 
             except Exception as e:
-                print(f"GCS Setup/Deletion Error: {e}")
+                logger.error("GCS Setup/Deletion Error", extra={"error": str(e)})
+            forget_signed_urls(blob_paths)
 
-        # 4. Delete from Database
-        delete_query = self.supabase.table("photo_info").delete().eq("id", id)
-        if num is not None:
-            delete_query = delete_query.eq("num", num)
-            
-        response = delete_query.execute()
-        return response.data
+        # 3. Delete from Database
+        result = self.repo.delete_photos(id, num)
+        if target_photos:
+            self._invalidate_character_owner(id, VIEW_CHARACTERS)
+        return result
 
     def add_photo_info(self, photo_data: dict):
         """
@@ -319,17 +348,8 @@ class ComicService:
         char_id = photo_data.get('id')
 
         # Query for the maximum num for this character ID
-        max_num_response = self.supabase.table("photo_info")\
-            .select("num")\
-            .eq("id", char_id)\
-            .order("num", desc=True)\
-            .limit(1)\
-            .execute()
-            
-        current_max_num = 0
-        if max_num_response.data:
-            current_max_num = max_num_response.data[0].get('num', 0)
-            
+        current_max_num = self.repo.get_max_photo_num(char_id)
+
         # Set the next num value
         photo_data['num'] = current_max_num + 1
         
@@ -339,12 +359,11 @@ class ComicService:
             image_data = base64.b64decode(photo_data.get('photo_base64'))
             
             # Determine the blob name
-            blob_name = f"AI_photo/character_{char_id}_{photo_data['num']}.jpg"
+            blob_name = f"{PHOTO_PREFIX}character_{char_id}_{photo_data['num']}.jpg"
             
             # GCS Upload
-            # Note: This requires GOOGLE_APPLICATION_CREDENTIALS to be set or 'gcloud auth application-default login'
-            client = storage.Client()
-            bucket = client.bucket("2dfriend_photo")
+            client, _ = get_storage_client()
+            bucket = client.bucket(BUCKET_NAME)
             blob = bucket.blob(blob_name)
             
             # Upload from string (bytes)
@@ -358,13 +377,140 @@ class ComicService:
             photo_data['photo_base64'] = blob_name
             
         except Exception as e:
-            print(f"GCS Upload Failed: {e}")
+            logger.error("GCS Upload Failed", extra={"character_id": char_id, "error": str(e)})
             if "invalid_grant" in str(e):
-                print("HINT: Run 'gcloud auth application-default login' or set GOOGLE_APPLICATION_CREDENTIALS")
+                logger.error("HINT: Run 'gcloud auth application-default login' or set GOOGLE_APPLICATION_CREDENTIALS")
             # Proceeding might fail if photo_base64 is still binary and schema expects text (URL/Path).
             # But if validation fails, it fails.
 
 
-        response = self.supabase.table("photo_info").insert(photo_data).execute()
-        return response.data
+        result = self.repo.insert_photo(photo_data)
+        self._invalidate_character_owner(char_id, VIEW_CHARACTERS)
+        return result
+
+    def create_upload_session(self, object_name: str, content_type: str, user_id: str, comic_id: int = None,
+                              resumable: bool = False, origin: str = None):
+        """
+        Create a direct-to-bucket upload for a cover image, bound to user_id (and comic_id).
+        Returns a V4 signed PUT URL (or a resumable session URI) so the client
+        uploads the bytes straight to GCS without going through this API.
+        """
+        if comic_id is not None:
+            comic = self.get_comic_by_id(comic_id)
+            if not comic:
+                raise ValueError("Comic not found")
+            if str(comic.get('user_id')) != str(user_id):
+                raise PermissionError("Comic belongs to another user")
+
+        metadata = {UPLOAD_USER_META: str(user_id), UPLOAD_COMIC_META: "" if comic_id is None else str(comic_id)}
+        client, credentials = get_storage_client()
+        blob = client.bucket(BUCKET_NAME).blob(object_name)
+
+        if resumable:
+            # Session URI is itself the credential; valid for up to a week. Metadata is fixed when
+            # the session starts; the size can't be, so complete_upload checks it.
+            blob.metadata = metadata
+            upload_url = blob.create_resumable_upload_session(
+                content_type=content_type,
+                size=None,
+                origin=origin
+            )
+            return {
+                "object_name": object_name,
+                "upload_url": upload_url,
+                "method": "PUT",
+                "resumable": True,
+                "headers": {"Content-Type": content_type}
+            }
 
+        # Signed headers: the PUT must send exactly these, so GCS enforces the size limit and
+        # the binding can't be changed by the client
+        headers = {
+            "x-goog-content-length-range": f"0,{COVER_MAX_BYTES}",
+            **{f"x-goog-meta-{key}": value for key, value in metadata.items()},
+        }
+        upload_url = blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(minutes=15),
+            method="PUT",
+            content_type=content_type,
+            headers=headers,
+            **signing_kwargs(credentials)
+        )
+        return {
+            "object_name": object_name,
+            "upload_url": upload_url,
+            "method": "PUT",
+            "resumable": False,
+            "expires_in": 15 * 60,
+            "headers": {"Content-Type": content_type, **headers}
+        }
+
+    def complete_upload(self, object_name: str, user_id: str, comic_id: int = None, cover_url: str = None):
+        """
+        Completion callback for a direct upload.
+        Verifies the object landed in the bucket and was uploaded through a session created by
+        this user for this comic, records it on the comic (coverImage) when comic_id is given,
+        and kicks off post-processing in the background.
+        """
+        client, credentials = get_storage_client()
+        blob = client.bucket(BUCKET_NAME).get_blob(object_name)
+        if blob is None:
+            raise ValueError("Uploaded object not found")
+
+        bound = blob.metadata or {}
+        if (bound.get(UPLOAD_USER_META) != str(user_id)
+                or bound.get(UPLOAD_COMIC_META, "") != ("" if comic_id is None else str(comic_id))):
+            raise PermissionError("Upload session belongs to another user or comic")
+
+        if not (blob.content_type or '').startswith('image/') or (blob.size or 0) > COVER_MAX_BYTES:
+            # Reject and clean up anything that isn't a reasonably sized image
+            try:
+                blob.delete()
+            except Exception as e:
+                logger.warning("Failed to delete rejected upload", extra={"object_name": object_name, "error": str(e)})
+            raise ValueError("Uploaded object must be an image of at most 10MB")
+
+        if comic_id is not None and cover_url:
+            self.update_comic(comic_id, {"coverImage": cover_url})
+
+        threading.Thread(target=self._post_process_upload, args=(blob,), daemon=True).start()
+
+        return {
+            "object_name": object_name,
+            "size": blob.size,
+            "content_type": blob.content_type
+        }
+
+    def upload_cover(self, object_name: str, stream, size: int, content_type: str):
+        """
+        Store a cover that was posted to the legacy /comics/upload route in the bucket.
+        The bytes are already size-capped and sniffed (utils.uploads); stream is rewound first.
+        """
+        if size > COVER_MAX_BYTES:
+            raise ValueError("Cover must be an image of at most 10MB")
+        client, _ = get_storage_client()
+        blob = client.bucket(BUCKET_NAME).blob(object_name)
+        # Covers are immutable (unique object names), so let browsers and CDNs cache them
+        blob.cache_control = "public, max-age=31536000, immutable"
+        blob.upload_from_file(stream, size=size, content_type=content_type, rewind=True)
+        return {"object_name": object_name, "size": size, "content_type": content_type}
+
+    def _post_process_upload(self, blob):
+        """Covers are immutable (unique object names), so let browsers and CDNs cache them."""
+        try:
+            blob.cache_control = "public, max-age=31536000, immutable"
+            blob.patch()
+        except Exception as e:
+            logger.warning("Upload post-processing failed", extra={"object_name": blob.name, "error": str(e)})
+
+    def get_cover_signed_url(self, object_name: str):
+        """Short-lived signed GET URL for a cover stored in the bucket."""
+        client, credentials = get_storage_client()
+        blob = client.bucket(BUCKET_NAME).blob(object_name)
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(hours=1),
+            method="GET",
+            **signing_kwargs(credentials)
+        )
@@ -7,14 +7,14 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 import uuid
-from flask import Blueprint, request, jsonify, url_for, current_app, Flask
-from services.comic_service import ComicService
+from flask import Blueprint, request, jsonify, url_for, redirect, Flask
+from services.comic_service import ComicService, COVER_PREFIX
 from werkzeug.utils import secure_filename
+from utils.uploads import upload_info
 
 comics_bp = Blueprint('comics', __name__)
 comic_service = ComicService()
 
-UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
 def allowed_file(filename):
@@ -33,6 +33,8 @@ def get_comics():
 def get_comic_by_id(comic_id):
     try:
         data = comic_service.get_comic_by_id(comic_id)
+        if data is None:
+            return jsonify({"error": "Comic not found"}), 404
         return jsonify(data), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -77,7 +79,6 @@ def add_comic_character():
 @comics_bp.route('/comics/character/<int:character_id>', methods=['DELETE'])
 def delete_comic_character(character_id):
     try:
-        print(character_id)
         result = comic_service.delete_comic_character(character_id)
         return jsonify(result), 200
     except Exception as e:
@@ -87,6 +88,8 @@ def delete_comic_character(character_id):
 def get_character_by_id(character_id):
     try:
         data = comic_service.get_character_by_id(character_id)
+        if data is None:
+            return jsonify({"error": "Character not found"}), 404
         return jsonify(data), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -100,34 +103,127 @@ def update_comic_character(character_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@comics_bp.route('/comics/<int:comic_id>/characters/ranking', methods=['PUT'])
+def reorder_comic_characters(comic_id):
+    try:
+        data = request.json or {}
+        user_id = data.get('user_id')
+        ranking = data.get('ranking')
+
+        if not user_id:
+             return jsonify({'error': 'user_id is required'}), 400
+        if not isinstance(ranking, list) or not ranking:
+             return jsonify({'error': 'ranking must be a non-empty list'}), 400
+
+        result = comic_service.reorder_comic_characters(user_id, comic_id, ranking)
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @comics_bp.route('/comics/upload', methods=['POST'])
 def upload_file():
+    """
+    Legacy multipart upload, kept for older clients: the worker pushes the cover to the bucket
+    and returns its stable cover URL. New clients should use /comics/upload/session +
+    /comics/upload/complete so the bytes go straight to GCS.
+    """
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
     file = request.files['file']
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Generate unique filename
-        filename = f"{uuid.uuid4()}_{filename}"
-        
-        # Ensure upload directory exists
-        upload_path = os.path.join(current_app.root_path, UPLOAD_FOLDER)
-        os.makedirs(upload_path, exist_ok=True)
-        
-        file.save(os.path.join(upload_path, filename))
-        
-        # Construct full URL (assuming api is serving static files)
-        # Note: In production, you might want to serve these differently.
-        # For now, we'll return a relative URL that the frontend can use or a full URL.
-        # Since frontend proxies /api to backend, we can return /static/uploads/...
-        # But we need to make sure app serves static.
-        
-        file_url = url_for('static', filename=f'uploads/{filename}', _external=True)
-        
-        return jsonify({'url': file_url}), 200
-    return jsonify({'error': 'File type not allowed'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+
+    # The extension alone isn't trusted; the bytes were sniffed while parsing (utils.uploads)
+    info = upload_info(file)
+    if info["mime_type"] is None:
+        return jsonify({'error': 'File is not a supported image'}), 415
+
+    try:
+        object_name = f"{COVER_PREFIX}{uuid.uuid4()}_{secure_filename(file.filename)}"
+        comic_service.upload_cover(object_name, file.stream, info["size"], info["mime_type"])
+        return jsonify({'url': url_for('comics.get_cover', object_name=object_name, _external=True)}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@comics_bp.route('/comics/upload/session', methods=['POST'])
+def create_upload_session():
+    """
+    Step 1 of a direct upload: returns a signed URL the client PUTs the file to.
+    Replaces streaming the bytes through /comics/upload onto local disk.
+    The session is bound to user_id (and comic_id); step 2 must come from the same user and comic.
+    """
+    try:
+        data = request.json or {}
+        filename = data.get('filename', '')
+        content_type = data.get('content_type', '')
+        user_id = data.get('user_id')
+        comic_id = data.get('comic_id')
+
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+        if not filename or not allowed_file(filename):
+            return jsonify({'error': 'File type not allowed'}), 400
+        if not content_type.startswith('image/'):
+            return jsonify({'error': 'content_type must be an image type'}), 400
+
+        object_name = f"{COVER_PREFIX}{uuid.uuid4()}_{secure_filename(filename)}"
+        result = comic_service.create_upload_session(
+            object_name,
+            content_type,
+            user_id,
+            comic_id,
+            resumable=bool(data.get('resumable')),
+            origin=request.headers.get('Origin')
+        )
+        return jsonify(result), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@comics_bp.route('/comics/upload/complete', methods=['POST'])
+def complete_upload():
+    """Step 2 of a direct upload: record the object and return its stable cover URL."""
+    try:
+        data = request.json or {}
+        object_name = data.get('object_name', '')
+        user_id = data.get('user_id')
+        if not object_name.startswith(COVER_PREFIX) or '..' in object_name:
+            return jsonify({'error': 'Invalid object_name'}), 400
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+
+        cover_url = url_for('comics.get_cover', object_name=object_name, _external=True)
+        result = comic_service.complete_upload(object_name, user_id, data.get('comic_id'), cover_url)
+        return jsonify({**result, 'url': cover_url}), 200
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@comics_bp.route('/comics/cover/<path:object_name>', methods=['GET'])
+def get_cover(object_name):
+    """Stable cover URL stored in comics.coverImage; redirects to a fresh signed URL."""
+    if not object_name.startswith(COVER_PREFIX) or '..' in object_name:
+        return jsonify({'error': 'Invalid object_name'}), 400
+    try:
+        signed_url = comic_service.get_cover_signed_url(object_name)
+        response = redirect(signed_url, code=302)
+        # Signed URL lives for an hour; let the browser reuse the redirect for most of it
+        response.headers['Cache-Control'] = 'private, max-age=3000'
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @comics_bp.route('/comics/search', methods=['GET'])
 def search_comics():
@@ -150,14 +246,34 @@ def get_characters_info():
         if not user_id:
              return jsonify({'error': 'user_id is required'}), 400
              
-        data = comic_service.get_characters_info(user_id, comics_id)
-        print(data)
+        # with_photos=true embeds each character's first photo (signed URL) as "lead_photo"
+        with_photos = request.args.get('with_photos', 'false').lower() == 'true'
+        data = comic_service.get_characters_info(user_id, comics_id, with_photos=with_photos)
         return jsonify(data), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 
+@comics_bp.route('/comics/gallery/search', methods=['GET'])
+def search_gallery():
+    try:
+        user_id = request.args.get('user_id')
+        query = request.args.get('q', '')
+        page = request.args.get('page', 1, type=int)
+        page_size = request.args.get('page_size', 20, type=int)
+
+        if not user_id:
+             return jsonify({'error': 'user_id is required'}), 400
+
+        data = comic_service.search_gallery(user_id, query, page, page_size)
+        return jsonify(data), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @comics_bp.route('/comics/news-list', methods=['GET'])
 def get_news_list_data():
     try:
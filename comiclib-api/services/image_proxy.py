@@ -0,0 +1,318 @@
+import os
+import io
+import socket
+import hashlib
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Blueprint, request, jsonify, Response
+from utils.metrics import register_metrics
+from utils.disk_cache import DiskLRUCache
+from utils.log import get_logger
+from utils.traffic import downstream
+
+image_proxy_bp = Blueprint('image_proxy', __name__)
+logger = get_logger(__name__)
+
+# Third-party cover/character images are fetched once and served from a size-bounded on-disk LRU cache.
+CACHE_DIR = os.environ.get('IMAGE_PROXY_CACHE_DIR', '/tmp/comiclib-image-cache')
+CACHE_MAX_BYTES = int(os.environ.get('IMAGE_PROXY_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+FETCH_TIMEOUT = float(os.environ.get('IMAGE_PROXY_FETCH_TIMEOUT', 5))
+MAX_IMAGE_BYTES = int(os.environ.get('IMAGE_PROXY_MAX_IMAGE_BYTES', 10 * 1024 * 1024))
+MAX_WIDTH = 2048
+BROWSER_MAX_AGE = 86400
+PREFETCH_WORKERS = int(os.environ.get('IMAGE_PROXY_PREFETCH_WORKERS', 8))
+# Redirects are followed by hand so every hop goes through _validate_url
+MAX_REDIRECTS = int(os.environ.get('IMAGE_PROXY_MAX_REDIRECTS', 5))
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Raster formats only: the bytes are served from the API origin, so an SVG (or anything a browser
+# might sniff as HTML) would run script there
+ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/avif"}
+# Proxied bytes are never rendered as a document even if a browser navigates to them
+RESPONSE_SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "default-src 'none'; sandbox",
+}
+
+# Some hosts refuse hotlinking without a browser-like UA
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; comiclib-image-proxy/1.0)",
+    "Accept": "image/avif,image/webp,image/*,*/*;q=0.8"
+}
+
+
+class ImageProxyError(Exception):
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Single-flight: concurrent requests for the same uncached image share one upstream fetch
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskLRUCache(CACHE_DIR, CACHE_MAX_BYTES)
+    return _cache
+
+
+register_metrics("image_proxy", lambda: get_cache().stats())
+
+
+def _cache_key(url, width=None):
+    raw = f"{url}|w={width or ''}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _validate_url(url):
+    """
+    Only public http(s) hosts may be proxied (blocks SSRF into internal addresses).
+    Returns the checked address; the fetch connects to it rather than resolving again.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ImageProxyError("Only http(s) image URLs are allowed", 400)
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, parsed.port or 443, proto=socket.IPPROTO_TCP)
+    except socket.gaierror:
+        raise ImageProxyError("Image host could not be resolved", 502)
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0])
+        if ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved or ip.is_multicast:
+            raise ImageProxyError("Image host is not allowed", 400)
+    return infos[0][4][0]
+
+
+class PinnedAdapter(HTTPAdapter):
+    """
+    Connects to the address _validate_url checked for each host instead of resolving it again,
+    so a DNS-rebinding host can't swap in an internal address between the check and the fetch.
+    Host, SNI and certificate verification still use the hostname.
+    """
+
+    def __init__(self):
+        self.pins = {}
+        super().__init__(max_retries=0)
+
+    def pin(self, hostname, ip):
+        self.pins[hostname.lower()] = ip
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        hostname = getattr(request, "pinned_hostname", None)
+        if hostname and host_params["scheme"] == "https":
+            pool_kwargs["server_hostname"] = hostname
+            pool_kwargs["assert_hostname"] = hostname
+        return host_params, pool_kwargs
+
+    def send(self, request, **kwargs):
+        parsed = urlparse(request.url)
+        ip = self.pins.get((parsed.hostname or "").lower())
+        if ip is None:
+            raise requests.exceptions.InvalidURL(f"Host was not validated: {parsed.hostname}")
+        address = f"[{ip}]" if ":" in ip else ip
+        request.headers["Host"] = parsed.netloc.rsplit("@", 1)[-1]
+        request.pinned_hostname = parsed.hostname
+        request.url = parsed._replace(netloc=f"{address}:{parsed.port}" if parsed.port else address).geturl()
+        return super().send(request, **kwargs)
+
+
+def _fetch_upstream(url):
+    adapter = PinnedAdapter()
+    with requests.Session() as session:
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                adapter.pin(urlparse(url).hostname, _validate_url(url))
+                with downstream("image_fetch"):
+                    response = session.get(url, headers=FETCH_HEADERS, timeout=FETCH_TIMEOUT, stream=True,
+                                           allow_redirects=False)
+                    if response.status_code not in REDIRECT_STATUSES:
+                        response.raise_for_status()
+                        break
+                location = response.headers.get('Location')
+                response.close()
+                if not location:
+                    raise ImageProxyError("Upstream redirect has no Location", 502)
+                url = urljoin(url, location)
+            else:
+                raise ImageProxyError("Too many upstream redirects", 502)
+        except requests.exceptions.Timeout:
+            raise ImageProxyError("Upstream image fetch timed out", 504)
+        except requests.exceptions.RequestException as e:
+            raise ImageProxyError(f"Upstream image fetch failed: {str(e)}", 502)
+
+        with response:
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type not in ALLOWED_CONTENT_TYPES:
+                raise ImageProxyError("Upstream did not return a supported image type", 502)
+
+            buf = io.BytesIO()
+            try:
+                for chunk in response.iter_content(64 * 1024):
+                    buf.write(chunk)
+                    if buf.tell() > MAX_IMAGE_BYTES:
+                        raise ImageProxyError("Upstream image is too large", 502)
+            except requests.exceptions.RequestException as e:
+                raise ImageProxyError(f"Upstream image fetch failed: {str(e)}", 502)
+            return buf.getvalue(), content_type
+
+
+def _resize(data, width):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        if img.width <= width:
+            return data, None
+        height = max(1, round(img.height * width / img.width))
+        resized = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        resized = resized.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        if resized.mode == "RGBA":
+            resized.save(out, format="PNG", optimize=True)
+            return out.getvalue(), "image/png"
+        resized.save(out, format="JPEG", quality=85, optimize=True)
+        return out.getvalue(), "image/jpeg"
+
+
+def _load_original(url):
+    cache = get_cache()
+    key = _cache_key(url)
+    cached = cache.get(key)
+    if cached:
+        return cached
+
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = threading.Event()
+            _inflight[key] = event
+
+    if not leader:
+        event.wait(FETCH_TIMEOUT * 2)
+        cached = cache.get(key)
+        if cached:
+            return cached
+        # Leader failed; fall through and try ourselves
+
+    try:
+        data, content_type = _fetch_upstream(url)
+        meta = {
+            "content_type": content_type,
+            "etag": hashlib.sha256(data).hexdigest()[:32]
+        }
+        cache.set(key, data, meta)
+        return data, meta
+    finally:
+        if leader:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+            event.set()
+
+
+def get_image(url, width=None):
+    """
+    Returns (bytes, meta) for url, optionally resized to width.
+    Both the original and each resized variant are cached.
+    """
+    if not width:
+        return _load_original(url)
+
+    cache = get_cache()
+    key = _cache_key(url, width)
+    cached = cache.get(key)
+    if cached:
+        return cached
+
+    data, meta = _load_original(url)
+    try:
+        resized, content_type = _resize(data, width)
+    except Exception as e:
+        # Resizing is best-effort; serve the original if Pillow can't decode it
+        logger.warning("Image resize failed", extra={"url": url, "error": str(e)})
+        return data, meta
+
+    if content_type is None:
+        return data, meta
+
+    resized_meta = {
+        "content_type": content_type,
+        "etag": hashlib.sha256(resized).hexdigest()[:32]
+    }
+    cache.set(key, resized, resized_meta)
+    return resized, resized_meta
+
+
+def prefetch_images(urls, width=None):
+    """Warm the cache for many URLs concurrently. Returns {url: 'ok' | error message}."""
+    def _one(url):
+        try:
+            get_image(url, width)
+            return url, "ok"
+        except ImageProxyError as e:
+            return url, str(e)
+
+    return dict(_executor.map(_one, urls))
+
+
+@image_proxy_bp.route('/image-proxy', methods=['GET'])
+def image_proxy():
+    url = request.args.get('url')
+    if not url:
+        return jsonify({"error": "url parameter is required"}), 400
+
+    width = request.args.get('w', type=int)
+    if width is not None and not (0 < width <= MAX_WIDTH):
+        return jsonify({"error": f"w must be between 1 and {MAX_WIDTH}"}), 400
+
+    try:
+        data, meta = get_image(url, width)
+    except ImageProxyError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    if meta["content_type"] not in ALLOWED_CONTENT_TYPES:
+        # Cached before the raster-only rule
+        return jsonify({"error": "Upstream did not return a supported image type"}), 502
+
+    etag = f'"{meta["etag"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={BROWSER_MAX_AGE}",
+        **RESPONSE_SECURITY_HEADERS,
+    }
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers=headers)
+
+    return Response(data, mimetype=meta["content_type"], headers=headers)
+
+
+@image_proxy_bp.route('/image-proxy/prefetch', methods=['POST'])
+def image_proxy_prefetch():
+    data = request.json or {}
+    urls = data.get('urls')
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "urls must be a non-empty list"}), 400
+    if not all(isinstance(url, str) and url for url in urls):
+        return jsonify({"error": "urls must contain only non-empty strings"}), 400
+
+    width = data.get('w')
+    if width is not None and (not isinstance(width, int) or not (0 < width <= MAX_WIDTH)):
+        return jsonify({"error": f"w must be between 1 and {MAX_WIDTH}"}), 400
+
+    results = prefetch_images(urls[:50], width)
+    return jsonify({"results": results, "cache": get_cache().stats()}), 200
@@ -1,33 +1,166 @@
 import os
 import io
+import time
 import base64
-import tempfile
+import hashlib
+import logging
+import threading
+import unicodedata
 from flask import Blueprint, request, jsonify
 from google import genai
 from google.genai import types
+from utils.log import get_logger
+from utils.metrics import Counters, register_metrics
+from utils.disk_cache import DiskLRUCache
+from utils.resilience import call_with_fallback, ModelUnavailableError
+from utils.uploads import upload_info, read_upload
+from utils.traffic import downstream
 
 make_photo_bp = Blueprint('make_photo', __name__)
+logger = get_logger(__name__)
+
+# Tried in order; the fallback is faster and is also used to hedge a slow primary
+IMAGE_MODELS = [
+    os.environ.get("IMAGE_MODEL_PRIMARY", "gemini-3-pro-image-preview"),
+    os.environ.get("IMAGE_MODEL_FALLBACK", "gemini-2.5-flash-image"),
+]
+# Per-call HTTP deadline, and the most a request will wait overall
+IMAGE_CALL_TIMEOUT_S = float(os.environ.get("IMAGE_CALL_TIMEOUT_S", 90))
+IMAGE_TOTAL_DEADLINE_S = float(os.environ.get("IMAGE_TOTAL_DEADLINE_S", 120))
+# Start the fallback in parallel if the primary hasn't answered after this long (0 = no hedging)
+IMAGE_HEDGE_DELAY_S = float(os.environ.get("IMAGE_HEDGE_DELAY_S", 45))
+
+
+# Generated images keyed by (both input images, normalized keywords, model); fresh=true bypasses it
+PHOTO_MEMO_DIR = os.environ.get("PHOTO_MEMO_DIR", "/tmp/comiclib-photo-memo")
+PHOTO_MEMO_MAX_BYTES = int(os.environ.get("PHOTO_MEMO_MAX_BYTES", 1024 * 1024 * 1024))
+
+_memo = None
+_memo_lock = threading.Lock()
+_memo_counters = Counters("hits", "misses", "stored", "bypassed", "not_stored_fallback")
+
+
+def get_photo_memo():
+    global _memo
+    if _memo is None:
+        with _memo_lock:
+            if _memo is None:
+                _memo = DiskLRUCache(PHOTO_MEMO_DIR, PHOTO_MEMO_MAX_BYTES)
+    return _memo
+
+
+def _normalize_keyword(keyword):
+    return " ".join(unicodedata.normalize("NFC", keyword or "").split()).lower()
+
+
+def photo_memo_key(img1_sha256, img2_sha256, keyword1, keyword2, model_name):
+    h = hashlib.sha256()
+    for part in (img1_sha256, img2_sha256, _normalize_keyword(keyword1), _normalize_keyword(keyword2), model_name):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _photo_memo_stats():
+    stats = _memo_counters.snapshot()
+    stats.update(get_photo_memo().stats())
+    return stats
+
+
+register_metrics("photo_memo", _photo_memo_stats)
+
+
+class ImageNotGeneratedError(Exception):
+    """The model answered but returned no image (e.g. a text refusal); not a model health failure."""
+
 
 def generate_merged_photo(path1, path2, keyword1, keyword2, api_key):
     """
     Uploads two images via inline bytes and requests merged generation.
     Returns: Base64 encoded image string or raises Exception.
     """
-    client = genai.Client(api_key=api_key)
-    
     # Read files as bytes for Inline Data
     with open(path1, "rb") as f:
         img1_data = f.read()
     with open(path2, "rb") as f:
         img2_data = f.read()
 
+    encoded, _ = _generate_from_bytes(img1_data, img2_data, keyword1, keyword2, api_key)
+    return encoded
+
+
+def generate_merged_photo_memoized(file1, file2, keyword1, keyword2, api_key, fresh=False):
+    """
+    generate_merged_photo for two uploaded files, behind the content-addressed memo.
+    The files were hashed while the request was parsed (utils.uploads), so a memo hit
+    never reads the images back. Returns (base64 image, cached). Only results from the
+    primary model are stored, so a fallback image isn't replayed once the primary is healthy again.
+    """
+    info1, info2 = upload_info(file1), upload_info(file2)
+
+    memo = get_photo_memo()
+    key = photo_memo_key(info1["sha256"], info2["sha256"], keyword1, keyword2, IMAGE_MODELS[0])
+    if fresh:
+        _memo_counters.incr("bypassed")
+    else:
+        hit = memo.get(key)
+        if hit is not None:
+            _memo_counters.incr("hits")
+            return base64.b64encode(hit[0]).decode('utf-8'), True
+        _memo_counters.incr("misses")
+
+    encoded, model_name = _generate_from_bytes(
+        read_upload(file1), read_upload(file2), keyword1, keyword2, api_key,
+        mime_type1=info1["mime_type"], mime_type2=info2["mime_type"]
+    )
+    if model_name == IMAGE_MODELS[0]:
+        try:
+            memo.set(key, base64.b64decode(encoded), {"model": model_name, "created_at": int(time.time())})
+            _memo_counters.incr("stored")
+        except OSError as e:
+            logger.warning("Photo memo write failed", extra={"error": str(e)})
+    else:
+        _memo_counters.incr("not_stored_fallback")
+    return encoded, False
+
+
+def _generate_from_bytes(img1_data, img2_data, keyword1, keyword2, api_key, mime_type1=None, mime_type2=None):
+    """Returns (base64 image, model that produced it). mime types come from the sniffed upload format."""
     # Create Parts with inline data
-    part1 = types.Part.from_bytes(data=img1_data, mime_type="image/jpeg")
-    part2 = types.Part.from_bytes(data=img2_data, mime_type="image/jpeg")
+    part1 = types.Part.from_bytes(data=img1_data, mime_type=mime_type1 or "image/jpeg")
+    part2 = types.Part.from_bytes(data=img2_data, mime_type=mime_type2 or "image/jpeg")
     prompt_part = types.Part.from_text(text=f"사진의 인물들을 추출하여 다음의 상황으로 합성해 주세요. 키워드 1: {keyword1}, 키워드 2: {keyword2}")
-    print(f"Debug - Prompt: {prompt_part}")
-    model_name = "gemini-3-pro-image-preview"
-    #model_name = "gemini-2.5-flash-image"
+    logger.debug("Image generation prompt", extra={"keyword1": keyword1, "keyword2": keyword2})
+    contents = [
+        types.Content(
+            role="user",
+            parts=[part1, part2, prompt_part]
+        )
+    ]
+
+    def call(model_name):
+        return _generate_with_model(model_name, contents, api_key)
+
+    # Model attempts run on the resilience executor, so time the whole fallback chain here
+    with downstream("gemini_image"):
+        encoded, model_name = call_with_fallback(
+            IMAGE_MODELS,
+            call,
+            deadline_s=IMAGE_TOTAL_DEADLINE_S,
+            hedge_delay_s=IMAGE_HEDGE_DELAY_S or None,
+            non_retryable=(ImageNotGeneratedError,)
+        )
+    if model_name != IMAGE_MODELS[0]:
+        logger.info("Image generated by fallback model", extra={"model": model_name})
+    return encoded, model_name
+
+
+def _generate_with_model(model_name, contents, api_key):
+    """One generation attempt on model_name, bounded by IMAGE_CALL_TIMEOUT_S."""
+    client = genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(timeout=int(IMAGE_CALL_TIMEOUT_S * 1000))
+    )
     
     # Configure Safety Settings
     safety_settings = [
@@ -52,12 +185,7 @@ def generate_merged_photo(path1, path2, keyword1, keyword2, api_key):
     # Generate Content
     response = client.models.generate_content(
         model=model_name,
-        contents=[
-            types.Content(
-                role="user",
-                parts=[part1, part2, prompt_part]
-            )
-        ],
+        contents=contents,
         config=types.GenerateContentConfig(
             response_modalities=["IMAGE"],
             safety_settings=safety_settings
@@ -65,7 +193,13 @@ def generate_merged_photo(path1, path2, keyword1, keyword2, api_key):
     )
 
     # Process Result
-    print(f"Debug - Full Response: {response}")
+    # Never log the full response: it carries the generated image bytes
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Image generation response", extra={
+            "model": model_name,
+            "candidates": len(response.candidates or []),
+            "finish_reason": str(response.candidates[0].finish_reason) if response.candidates else None,
+        })
     
     if hasattr(response, 'generated_images') and response.generated_images:
          image = response.generated_images[0]
@@ -81,9 +215,9 @@ def generate_merged_photo(path1, path2, keyword1, keyword2, api_key):
     
     # If we get here, likely failure or text response
     if response.text:
-         raise Exception(f"Model returned text instead of image: {response.text}")
+         raise ImageNotGeneratedError(f"Model returned text instead of image: {response.text}")
          
-    raise Exception("No image generated from Gemini")
+    raise ImageNotGeneratedError("No image generated from Gemini")
 
 
 @make_photo_bp.route('/makePhoto', methods=['POST'])
@@ -101,34 +235,29 @@ def make_photo():
     if file1.filename == '' or file2.filename == '':
         return jsonify({"error": "No selected files"}), 400
 
+    # fresh=true skips the memo and always calls the model
+    fresh = (request.form.get('fresh') or request.args.get('fresh', 'false')).lower() == 'true'
+
     api_key = os.environ.get('GEMINI_API_KEY')
     if not api_key:
         return jsonify({"error": "Server configuration error: Missing Gemini API Key"}), 500
 
-    temp1_path = None
-    temp2_path = None
+    # Size-capped, hashed and sniffed while the request was parsed; no temp-file copies
+    for file in (file1, file2):
+        if upload_info(file)["format"] is None:
+            return jsonify({"error": f"Unsupported image format: {file.filename}"}), 415
 
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp1, \
-             tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp2:
-            
-            file1.save(temp1.name)
-            file2.save(temp2.name)
-            
-            temp1_path = temp1.name
-            temp2_path = temp2.name
-
-        encoded_img = generate_merged_photo(temp1_path, temp2_path, keyword1, keyword2, api_key)
-        return jsonify({"image": encoded_img})
+        encoded_img, cached = generate_merged_photo_memoized(
+            file1, file2, keyword1, keyword2, api_key, fresh=fresh
+        )
+        return jsonify({"image": encoded_img, "cached": cached})
+
+    except ModelUnavailableError as e:
+        return jsonify({"error": f"Image models unavailable: {str(e)}"}), 503
 
     except Exception as e:
         return jsonify({"error": f"Gemini API error: {str(e)}"}), 500
-        
-    finally:
-        if temp1_path and os.path.exists(temp1_path):
-            os.remove(temp1_path)
-        if temp2_path and os.path.exists(temp2_path):
-            os.remove(temp2_path)
 
 if __name__ == "__main__":
     import sys
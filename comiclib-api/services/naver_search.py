@@ -1,25 +1,24 @@
 import os
+import time
 import requests
 from flask import Blueprint, request, jsonify
+from services.book_catalog import get_catalog, count, record_autocomplete_latency, BOOK_CATALOG_MIN_RESULTS
+from utils.log import get_logger
+from utils.traffic import downstream
 
 naver_bp = Blueprint('naver_search', __name__)
+logger = get_logger(__name__)
+
+NAVER_BOOK_API_URL = "https://openapi.naver.com/v1/search/book.json"
+NAVER_TIMEOUT = float(os.environ.get('NAVER_TIMEOUT', 5))
 
-@naver_bp.route('/naver/search/book.json', methods=['GET'])
-def search_book_proxy():
-    query = request.args.get('query')
-    display = request.args.get('display', 10)
-    start = request.args.get('start', 1)
-    
-    if not query:
-        return jsonify({"error": "Query parameter is required"}), 400
 
+def _search_naver(query, display, start):
     client_id = os.environ.get('NAVER_CLIENT_ID')
     client_secret = os.environ.get('NAVER_CLIENT_SECRET')
-    
     if not client_id or not client_secret:
-        return jsonify({"error": "Server configuration error: Missing Naver API credentials"}), 500
+        raise RuntimeError("Server configuration error: Missing Naver API credentials")
 
-    api_url = "https://openapi.naver.com/v1/search/book.json"
     headers = {
         "X-Naver-Client-Id": client_id,
         "X-Naver-Client-Secret": client_secret
@@ -30,9 +29,78 @@ def search_book_proxy():
         "start": start
     }
 
-    try:
-        response = requests.get(api_url, headers=headers, params=params)
+    count("upstream_calls")
+    with downstream("naver"):
+        response = requests.get(NAVER_BOOK_API_URL, headers=headers, params=params, timeout=NAVER_TIMEOUT)
         response.raise_for_status()
-        return jsonify(response.json())
+        data = response.json()
+
+    # Everything Naver returns feeds the local catalog
+    try:
+        added = get_catalog().ingest(data.get('items', []))
+        if added:
+            count("books_added", added)
+    except Exception as e:
+        logger.warning("Book catalog ingest failed", extra={"error": str(e)})
+    return data
+
+
+@naver_bp.route('/naver/search/book.json', methods=['GET'])
+def search_book_proxy():
+    query = request.args.get('query')
+    display = request.args.get('display', 10, type=int)
+    start = request.args.get('start', 1, type=int)
+    # deep=true always asks Naver (e.g. "search more" in the UI)
+    deep = request.args.get('deep', 'false').lower() == 'true'
+
+    if not query:
+        return jsonify({"error": "Query parameter is required"}), 400
+
+    # First page from the local catalog when it has enough matches. The catalog only holds books
+    # Naver returned before, so it can't know the real total: a local page reports len(items) + 1
+    # (a lower bound) so clients keep paging, and every later page (start > 1) comes from Naver,
+    # whose response carries the real total.
+    if deep:
+        count("deep_searches")
+    elif start == 1:
+        local = get_catalog().search(query, limit=display)
+        if local and len(local) >= min(display, BOOK_CATALOG_MIN_RESULTS):
+            count("local_hits")
+            get_catalog().record_selection(local)
+            return jsonify({
+                "total": len(local) + 1,
+                "start": 1,
+                "display": len(local),
+                "items": local,
+                "source": "local"
+            })
+        count("local_misses")
+
+    try:
+        data = _search_naver(query, display, start)
+        data["source"] = "naver"
+        return jsonify(data)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
     except requests.exceptions.RequestException as e:
-         return jsonify({"error": f"Naver API error: {str(e)}"}), 502
+        count("upstream_errors")
+        return jsonify({"error": f"Naver API error: {str(e)}"}), 502
+
+
+@naver_bp.route('/naver/search/book/autocomplete', methods=['GET'])
+def autocomplete_book():
+    """Local-only title/author suggestions; never calls Naver."""
+    query = request.args.get('query', '')
+    limit = min(request.args.get('limit', 8, type=int), 20)
+
+    started = time.perf_counter()
+    books = get_catalog().search(query, limit=limit) if query.strip() else []
+    record_autocomplete_latency((time.perf_counter() - started) * 1000)
+    count("autocomplete_requests")
+
+    return jsonify({"items": [{
+        "title": book.get("title"),
+        "author": book.get("author"),
+        "isbn": book.get("isbn"),
+        "image": book.get("image")
+    } for book in books]})
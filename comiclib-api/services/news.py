@@ -4,8 +4,12 @@ import datetime
 from flask import Blueprint, jsonify
 from google import genai
 from google.genai import types
+from utils.log import get_logger
+from utils.traffic import downstream
+from services.news_filter import clean_news_items
 
 news_bp = Blueprint('news', __name__)
+logger = get_logger(__name__)
 
 def get_daily_news(api_key):
     """
@@ -20,14 +24,15 @@ def get_daily_news(api_key):
     Format: [ {{ "title": "...", "date": "...", "description": "...", "link": "..." }} ]. 
     For the link, provide a source URL if found, otherwise empty string."""
 
-    response = client.models.generate_content(
-        model='gemini-2.0-flash-exp',
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json",
-            tools=[types.Tool(google_search=types.GoogleSearch())],
+    with downstream("gemini"):
+        response = client.models.generate_content(
+            model='gemini-2.0-flash-exp',
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                tools=[types.Tool(google_search=types.GoogleSearch())],
+            )
         )
-    )
     
     # Parse generic response
     # Since we requested JSON mime type, we might get a structured json string directly
@@ -41,11 +46,16 @@ def get_daily_news(api_key):
         if text_part.endswith("```"):
             text_part = text_part[:-3]
         
-        return json.loads(text_part)
+        items = json.loads(text_part)
     except Exception as e:
-        print(f"Error parsing news JSON: {e}")
+        logger.warning("Error parsing news JSON", extra={"error": str(e), "text": response.text})
         return []
 
+    # Drop repeated stories and dead links
+    if isinstance(items, list):
+        items = clean_news_items(items, text_fields=("title", "description"))
+    return items
+
 @news_bp.route('/news', methods=['GET'])
 def news():
     api_key = os.environ.get('GEMINI_API_KEY')
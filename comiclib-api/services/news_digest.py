@@ -0,0 +1,218 @@
+"""
+Nightly precomputation of /api/search/comprehensive.
+
+Usage (from comiclib-api/, e.g. a nightly Cloud Scheduler / cron job):
+    python -m services.news_digest [--concurrency 4] [--rps 1.0] [--dry-run]
+
+Every news_list = 'Y' character is searched once, however many users follow it
+(the same "character (title)" target is shared across users), through a throttled
+worker pool. Each user's digest is the merge of their characters' results and is
+stored with generated_at, so the endpoint can answer from the store instantly.
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from repositories import get_repository
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# A stored digest is served while younger than this (the nightly job refreshes it daily)
+NEWS_DIGEST_MAX_AGE_HOURS = float(os.environ.get("NEWS_DIGEST_MAX_AGE_HOURS", 36))
+NEWS_BATCH_CONCURRENCY = int(os.environ.get("NEWS_BATCH_CONCURRENCY", 4))
+# Upper bound on grounded calls started per second across all workers
+NEWS_BATCH_RPS = float(os.environ.get("NEWS_BATCH_RPS", 1.0))
+
+
+class _Throttle:
+    """Spaces call starts at least 1/rps apart across threads."""
+
+    def __init__(self, rps):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _merge_items(results):
+    """
+    Concatenate per-character items, dropping the same story found for several characters.
+    Links were already checked when each target's results were cleaned.
+    """
+    from services.news_filter import clean_news_items
+
+    return clean_news_items([item for items in results for item in items], check_links=False)
+
+
+def group_subscriptions(rows):
+    """
+    list_news_subscriptions() rows -> ({user_id: [target, ...]}, [unique target, ...]).
+    Targets use the same "CharacterName (작품: Title)" format as the live prompt.
+    """
+    from services.search_info import comprehensive_targets
+
+    users = {}
+    for row in rows:
+        users.setdefault(row["user_id"], []).extend(comprehensive_targets([row]))
+    unique = sorted({target for targets in users.values() for target in targets})
+    return users, unique
+
+
+def run_batch(api_key, concurrency=NEWS_BATCH_CONCURRENCY, rps=NEWS_BATCH_RPS, repo=None, dry_run=False):
+    from google import genai
+    from services.search_info import search_comprehensive_targets
+
+    repo = repo or get_repository()
+    users, unique = group_subscriptions(repo.list_news_subscriptions())
+    logger.info("News batch planned", extra={
+        "users": len(users),
+        "subscriptions": sum(len(t) for t in users.values()),
+        "unique_targets": len(unique)
+    })
+    if dry_run or not unique:
+        return {"users": len(users), "unique_targets": len(unique), "saved": 0, "failed_targets": 0}
+
+    client = genai.Client(api_key=api_key)
+    throttle = _Throttle(rps)
+    started = time.perf_counter()
+
+    def search(target):
+        throttle.wait()
+        return search_comprehensive_targets([target], api_key, client=client)["items"]
+
+    results, failed = {}, 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(search, target): target for target in unique}
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                results[target] = future.result()
+            except Exception as e:
+                failed += 1
+                logger.warning("News batch target failed", extra={"target": target, "error": str(e)})
+
+    saved = 0
+    generated_at = _now()
+    for user_id, targets in users.items():
+        items = _merge_items(results.get(t, []) for t in targets)
+        # Keep the previous digest rather than overwrite it with an empty (likely failed) result
+        if not items:
+            continue
+        try:
+            repo.save_news_digest(user_id, items, sorted(set(targets)), generated_at)
+            saved += 1
+        except Exception as e:
+            logger.warning("News digest save failed", extra={"user_id": user_id, "error": str(e)})
+
+    summary = {
+        "users": len(users),
+        "unique_targets": len(unique),
+        "saved": saved,
+        "failed_targets": failed,
+        "duration_s": round(time.perf_counter() - started, 1)
+    }
+    logger.info("News batch finished", extra=summary)
+    return summary
+
+
+def _age_hours(generated_at):
+    try:
+        ts = datetime.fromisoformat(str(generated_at).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - ts) / timedelta(hours=1)
+
+
+def digest_payload(digest, source, stale=False):
+    """Response body for /api/search/comprehensive with its freshness."""
+    age = _age_hours(digest["generated_at"])
+    return {
+        "items": digest["items"],
+        "generated_at": digest["generated_at"],
+        "age_hours": round(age, 2) if age is not None else None,
+        "source": source,
+        "stale": stale
+    }
+
+
+def get_comprehensive_news(user_id, api_key, refresh=False, repo=None):
+    """
+    Serve the stored digest when it is fresh and covers the user's current news_list
+    characters; otherwise run the live search and store its result for next time.
+    A stale digest is still returned (stale=True) if the live search fails or finds nothing.
+    """
+    from services.comic_service import ComicService
+    from services.search_info import comprehensive_targets, search_comprehensive_targets
+
+    repo = repo or get_repository()
+    targets = comprehensive_targets(ComicService().get_news_list_data(user_id))
+    if not targets:
+        return {"items": [], "generated_at": _now(), "age_hours": 0, "source": "live", "stale": False}
+
+    digest = None
+    try:
+        digest = repo.get_news_digest(user_id)
+    except Exception as e:
+        logger.warning("News digest read failed", extra={"user_id": user_id, "error": str(e)})
+
+    if digest and not refresh:
+        age = _age_hours(digest["generated_at"])
+        if age is not None and age < NEWS_DIGEST_MAX_AGE_HOURS and set(digest["targets"]) == set(targets):
+            return digest_payload(digest, "digest")
+
+    try:
+        items = search_comprehensive_targets(targets, api_key)["items"]
+    except Exception:
+        if digest:
+            logger.warning("Live comprehensive search failed; serving stale digest", exc_info=True,
+                           extra={"user_id": user_id})
+            return digest_payload(digest, "digest", stale=True)
+        raise
+
+    if not items and digest:
+        logger.warning("Live comprehensive search found nothing; serving stale digest", extra={"user_id": user_id})
+        return digest_payload(digest, "digest", stale=True)
+
+    live = {"items": items, "targets": sorted(set(targets)), "generated_at": _now()}
+    if items:
+        try:
+            repo.save_news_digest(user_id, items, live["targets"], live["generated_at"])
+        except Exception as e:
+            logger.warning("News digest save failed", extra={"user_id": user_id, "error": str(e)})
+    return digest_payload(live, "live")
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Precompute comprehensive news for every news_list user")
+    parser.add_argument("--concurrency", type=int, default=NEWS_BATCH_CONCURRENCY)
+    parser.add_argument("--rps", type=float, default=NEWS_BATCH_RPS, help="max grounded calls started per second")
+    parser.add_argument("--dry-run", action="store_true", help="only report users and deduplicated targets")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key and not args.dry_run:
+        raise SystemExit("GEMINI_API_KEY is required")
+
+    print(run_batch(api_key, concurrency=args.concurrency, rps=args.rps, dry_run=args.dry_run))
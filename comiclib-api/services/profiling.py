@@ -0,0 +1,154 @@
+import os
+import re
+import hmac
+import time
+import random
+import threading
+import pstats
+import cProfile
+import io
+from flask import Blueprint, request, jsonify, g, send_file
+from utils.log import get_logger
+
+profiling_bp = Blueprint('profiling', __name__)
+logger = get_logger(__name__)
+
+# On-demand profiling of single requests.
+# A request is profiled when it carries "X-Profile: <PROFILE_TOKEN>" or is picked by
+# PROFILE_SAMPLE_RATE. With neither configured no hooks are installed at all.
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/comiclib-profiles")
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 50))
+# Admin routes to list/download profiles (falls back to PROFILE_TOKEN)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or PROFILE_TOKEN
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+# cProfile hooks the whole interpreter and only one profiler may be active at a time (enable()
+# raises ValueError otherwise), so the fallback profiles one request per process and skips the rest
+_cprofile_lock = threading.Lock()
+
+_PROFILE_NAME = re.compile(r'^[\w.-]+\.(html|txt)$')
+
+
+def _token_matches(provided, expected):
+    return bool(provided and expected) and hmac.compare_digest(provided, expected)
+
+
+def _should_profile():
+    if _token_matches(request.headers.get("X-Profile"), PROFILE_TOKEN):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _prune():
+    """Keep only the newest PROFILE_MAX_FILES profiles."""
+    try:
+        files = [os.path.join(PROFILE_DIR, f) for f in os.listdir(PROFILE_DIR) if _PROFILE_NAME.match(f)]
+    except OSError:
+        return
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _start_profile():
+    if not _should_profile():
+        return
+    if SamplingProfiler is not None:
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+    else:
+        if not _cprofile_lock.acquire(blocking=False):
+            logger.info("Profile skipped, another request is being profiled", extra={"endpoint": request.endpoint})
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler (e.g. a debugger or coverage tool) already owns the hook
+            _cprofile_lock.release()
+            logger.warning("Profile skipped", extra={"endpoint": request.endpoint, "error": str(e)})
+            return
+    g.profiler = profiler
+    g.profile_started = time.perf_counter()
+
+
+def _stop_profile(exc):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return
+
+    duration_ms = round((time.perf_counter() - g.pop("profile_started")) * 1000, 1)
+    endpoint = (request.endpoint or "unknown").replace(".", "_")
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    base = f"{stamp}_{endpoint}_{int(duration_ms)}ms_{g.get('request_id', os.getpid())}"
+    base = re.sub(r'[^\w.-]', '_', base)
+
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if SamplingProfiler is not None:
+            profiler.stop()
+            path = os.path.join(PROFILE_DIR, base + ".html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        else:
+            try:
+                profiler.disable()
+            finally:
+                _cprofile_lock.release()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            path = os.path.join(PROFILE_DIR, base + ".txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(out.getvalue())
+        _prune()
+        logger.info("Request profiled", extra={"profile": os.path.basename(path), "duration_ms": duration_ms})
+    except Exception as e:
+        logger.warning("Failed to save profile", extra={"error": str(e)})
+
+
+def init_profiling(app):
+    """Install the profiling hooks only when profiling is configured (zero overhead otherwise)."""
+    if not PROFILE_TOKEN and PROFILE_SAMPLE_RATE <= 0:
+        return
+    app.before_request(_start_profile)
+    app.teardown_request(_stop_profile)
+
+
+@profiling_bp.before_request
+def _require_admin():
+    if not _token_matches(request.headers.get("X-Admin-Token"), ADMIN_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+
+
+@profiling_bp.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    try:
+        names = [f for f in os.listdir(PROFILE_DIR) if _PROFILE_NAME.match(f)]
+    except OSError:
+        names = []
+    names.sort(reverse=True)
+    profiles = [{
+        "name": name,
+        "size": os.path.getsize(os.path.join(PROFILE_DIR, name)),
+    } for name in names]
+    return jsonify({"profiler": "pyinstrument" if SamplingProfiler else "cProfile", "profiles": profiles}), 200
+
+
+@profiling_bp.route('/admin/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    if not _PROFILE_NAME.match(name):
+        return jsonify({"error": "Invalid profile name"}), 400
+    path = os.path.join(PROFILE_DIR, name)
+    if not os.path.exists(path):
+        return jsonify({"error": "Profile not found"}), 404
+    mimetype = "text/html" if name.endswith(".html") else "text/plain"
+    return send_file(path, mimetype=mimetype)
@@ -0,0 +1,69 @@
+import os
+import datetime
+
+# Which backend serves ComicService's hot read paths.
+# 'postgrest' (default) reads through the configured repository (supabase-py for COMICLIB_STORAGE=supabase);
+# 'postgres' uses a pooled direct connection.
+READ_BACKEND = os.environ.get("COMICLIB_READ_BACKEND", "postgrest")
+
+
+def _jsonable(row):
+    # Match PostgREST output: timestamps as ISO strings
+    if row is None:
+        return None
+    return {k: (v.isoformat() if isinstance(v, (datetime.datetime, datetime.date)) else v) for k, v in row.items()}
+
+
+class PostgresReadBackend:
+    """
+    Hot reads over a pooled direct Postgres connection.
+    Statements are fixed strings, so psycopg prepares each one once per connection.
+    """
+
+    name = "postgres"
+
+    SQL_COMIC_BY_ID = 'select * from public.comics where id = %s'
+    SQL_CHARACTER_BY_ID = 'select * from public.comic_character where id = %s'
+    SQL_USER_CHARACTERS = 'select * from public.comic_character where user_id = %s order by affinity desc nulls first'
+    SQL_USER_COMIC_CHARACTERS = 'select * from public.comic_character where user_id = %s and comics_id = %s order by affinity desc nulls first'
+    SQL_COMICS_SUMMARY = 'select id, title, rating, "coverImage" from public.comics where id = any(%s)'
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _fetchone(self, sql, params):
+        with self.pool.connection() as conn:
+            return _jsonable(conn.execute(sql, params).fetchone())
+
+    def _fetchall(self, sql, params):
+        with self.pool.connection() as conn:
+            return [_jsonable(row) for row in conn.execute(sql, params).fetchall()]
+
+    def get_comic_by_id(self, comic_id: int):
+        return self._fetchone(self.SQL_COMIC_BY_ID, (comic_id,))
+
+    def get_character_by_id(self, character_id: int):
+        return self._fetchone(self.SQL_CHARACTER_BY_ID, (character_id,))
+
+    def get_user_characters(self, user_id: str, comics_id: int = None):
+        if comics_id:
+            return self._fetchall(self.SQL_USER_COMIC_CHARACTERS, (user_id, int(comics_id)))
+        return self._fetchall(self.SQL_USER_CHARACTERS, (user_id,))
+
+    def get_comics_summary(self, comic_ids: list):
+        return self._fetchall(self.SQL_COMICS_SUMMARY, ([int(i) for i in comic_ids],))
+
+
+def create_read_backend(repository, backend: str = None):
+    """
+    Returns an object with get_comic_by_id, get_character_by_id,
+    get_user_characters and get_comics_summary.
+    """
+    backend = backend or READ_BACKEND
+    if backend == "postgres" and repository.name == "supabase":
+        from utils.pg import get_pg_pool
+        return PostgresReadBackend(get_pg_pool())
+    if backend in ("postgrest", "postgres"):
+        # Embedded storage (sqlite) already reads locally; the direct pool only applies to Supabase
+        return repository
+    raise ValueError(f"Unknown COMICLIB_READ_BACKEND: {backend}")
@@ -1,50 +1,74 @@
 import os
-from flask import Blueprint, request, jsonify
+import re
+import json
+import time
+import threading
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from google import genai
 from google.genai import types
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
+from utils.metrics import Counters, register_metrics
+from utils.prompt_cache import PROMPT_CACHE_ENABLED, get_prompt_cache, is_cache_error, record_cache_error
+from utils.prompt_cache import record_call as record_prompt_cache_call
+from utils.log import get_logger
+from utils.traffic import downstream
+from services.news_filter import clean_news_items
+
+logger = get_logger(__name__)
 
 search_info_bp = Blueprint('search_info', __name__)
 
 
-def get_search_info(query, api_key):
-    """
-    Performs a Google Search grounded query using Gemini.
-    Returns: Dict containing text, agent_role, and sources.
-    """
-    client = genai.Client(api_key=api_key)
+# Agent configuration: system instruction + tool
+# Define a persona for the agent
+COMIC_EXPERT_INSTRUCTION = "당신은 만화책 전문가 AI 에이전트입니다. 사용자의 질문에 대해 Google 검색을 사용하여 정확하고 풍부한 정보를 찾아 답변해주세요. 특히 만화 관련 리뷰나 영상(YouTube)이 있다면 해당 정보도 함께 찾아서 소개해 주세요. 답변은 한국어로 친절하게 작성해주세요."
 
-    # Agent configuration: system instruction + tool
-    # Define a persona for the agent
-    system_instruction = "당신은 만화책 전문가 AI 에이전트입니다. 사용자의 질문에 대해 Google 검색을 사용하여 정확하고 풍부한 정보를 찾아 답변해주세요. 특히 만화 관련 리뷰나 영상(YouTube)이 있다면 해당 정보도 함께 찾아서 소개해 주세요. 답변은 한국어로 친절하게 작성해주세요."
 
-    response = client.models.generate_content(
-        model='gemini-3-flash-preview',
-        contents=query,
-        config=types.GenerateContentConfig(
-            system_instruction=system_instruction,
-            tools=[types.Tool(google_search=types.GoogleSearch())],
-        )
+def _comic_expert_config():
+    return types.GenerateContentConfig(
+        system_instruction=COMIC_EXPERT_INSTRUCTION,
+        tools=[types.Tool(google_search=types.GoogleSearch())],
     )
-    
+
+
+def _extract_sources(response):
+    """Collect web/youtube sources from the grounding metadata of a response (or stream chunk)."""
     sources = []
     if response.candidates and response.candidates[0].grounding_metadata:
         gm = response.candidates[0].grounding_metadata
-        if hasattr(gm, 'grounding_chunks'):
+        if getattr(gm, 'grounding_chunks', None):
             for chunk in gm.grounding_chunks:
                 if hasattr(chunk, 'web') and chunk.web:
                     url = chunk.web.uri
                     source_type = "web"
                     if "youtube.com" in url or "youtu.be" in url:
                         source_type = "youtube"
-                        
+
                     sources.append({
                         "title": chunk.web.title,
                         "url": url,
                         "type": source_type
                     })
+    return sources
+
+
+def get_search_info(query, api_key):
+    """
+    Performs a Google Search grounded query using Gemini.
+    Returns: Dict containing text, agent_role, and sources.
+    """
+    client = genai.Client(api_key=api_key)
+
+    with downstream("gemini"):
+        response = client.models.generate_content(
+            model='gemini-3-flash-preview',
+            contents=query,
+            config=_comic_expert_config()
+        )
+
+    sources = _extract_sources(response)
 
     # Structure the result as an agent response
     result = {
@@ -54,6 +78,238 @@ def get_search_info(query, api_key):
     }
     return result
 
+
+def _sse_event(event, data):
+    """Format a single Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_search_info(query, api_key):
+    """
+    Streaming variant of get_search_info.
+    Yields SSE frames: one 'chunk' event per text delta as it arrives,
+    then a final 'sources' event with the grounding sources and a 'done' event.
+    """
+    client = genai.Client(api_key=api_key)
+
+    sources = []
+    seen_urls = set()
+    try:
+        stream = client.models.generate_content_stream(
+            model='gemini-3-flash-preview',
+            contents=query,
+            config=_comic_expert_config()
+        )
+
+        for chunk in stream:
+            text = chunk.text
+            if text:
+                yield _sse_event("chunk", {"text": text})
+
+            # Grounding metadata usually arrives with the last chunk, but collect from any chunk
+            for source in _extract_sources(chunk):
+                if source["url"] not in seen_urls:
+                    seen_urls.add(source["url"])
+                    sources.append(source)
+
+        yield _sse_event("sources", {"agent_role": "Comic Expert", "sources": sources})
+        yield _sse_event("done", {})
+    except Exception as e:
+        logger.exception("Gemini Agent stream error")
+        yield _sse_event("error", {"error": f"Gemini Agent error: {str(e)}"})
+
+# Structured output
+# Each agent requests schema-constrained JSON through its Pydantic response model.
+# Output is validated item by item so one malformed entry doesn't discard the whole list,
+# unparseable output is repaired locally and retried once, and failures are counted per agent.
+# When every attempt fails StructuredOutputError is raised, so callers can tell "no results" from an outage.
+STRUCTURED_OUTPUT_MAX_ATTEMPTS = int(os.environ.get('STRUCTURED_OUTPUT_MAX_ATTEMPTS', 2))
+
+
+class StructuredOutputError(Exception):
+    """No usable structured output after STRUCTURED_OUTPUT_MAX_ATTEMPTS attempts."""
+
+
+_structured_stats = {}
+_structured_stats_lock = threading.Lock()
+
+
+def _agent_stats(agent):
+    # Caller must hold _structured_stats_lock
+    return _structured_stats.setdefault(agent, {
+        "calls": 0, "ok": 0, "repaired": 0, "partial": 0, "retried": 0, "failed": 0, "dropped_items": 0
+    })
+
+
+def _record_structured_result(agent, outcome):
+    """outcome: 'ok' | 'repaired' | 'partial' | 'retried' | 'failed'"""
+    with _structured_stats_lock:
+        stats = _agent_stats(agent)
+        if outcome != "retried":
+            stats["calls"] += 1
+        stats[outcome] += 1
+
+
+def _record_dropped_items(agent, count):
+    with _structured_stats_lock:
+        _agent_stats(agent)["dropped_items"] += count
+
+
+def get_structured_output_stats():
+    """Snapshot of structured output outcomes per agent, with failure rate."""
+    with _structured_stats_lock:
+        result = {}
+        for agent, stats in _structured_stats.items():
+            calls = stats["calls"]
+            result[agent] = {
+                **stats,
+                "failure_rate": round(stats["failed"] / calls, 4) if calls else 0.0
+            }
+        return result
+
+
+register_metrics("structured_output", get_structured_output_stats)
+
+
+def _repair_json_text(text):
+    """Best-effort local repair: strip code fences and cut to the outermost JSON object."""
+    if not text:
+        return None
+    text = re.sub(r'```(?:json)?\s*|\s*```', '', text).strip()
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    candidate = text[start:end + 1]
+    # Trailing commas are the most common defect in model JSON
+    candidate = re.sub(r',\s*([}\]])', r'\1', candidate)
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        return None
+
+
+def _validate_items(data, schema, list_field):
+    """
+    Validate the list field of a response item by item.
+    Returns (validated_model, dropped_count) or (None, 0) if the payload has no usable list.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get(list_field), list):
+        return None, 0
+
+    item_model = schema.model_fields[list_field].annotation.__args__[0]
+    items = []
+    dropped = 0
+    for raw in data[list_field]:
+        try:
+            items.append(item_model.model_validate(raw))
+        except ValidationError:
+            dropped += 1
+    return schema(**{list_field: items}), dropped
+
+
+def _generate_with_prompt_cache(client, agent, model, schema, contents, config_kwargs):
+    """
+    generate_content with the system instruction + tools served from a Gemini context cache when
+    one is available. A request that references a cache may not also set them inline.
+    If the API rejects the cache handle the request is resent inline; other errors (429, 5xx,
+    timeouts) propagate to the caller's retry loop.
+    """
+    prefix = {k: config_kwargs[k] for k in ("system_instruction", "tools") if k in config_kwargs}
+    rest = {k: v for k, v in config_kwargs.items() if k not in prefix}
+
+    cache_name = None
+    if PROMPT_CACHE_ENABLED and prefix.get("system_instruction"):
+        cache_name = get_prompt_cache().get(client, agent, model, prefix["system_instruction"], prefix.get("tools"))
+
+    if cache_name:
+        started = time.perf_counter()
+        try:
+            with downstream("gemini"):
+                response = client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        response_mime_type="application/json",
+                        response_schema=schema,
+                        cached_content=cache_name,
+                        **rest
+                    )
+                )
+            record_prompt_cache_call(agent, response, (time.perf_counter() - started) * 1000, cached=True)
+            return response
+        except Exception as e:
+            if not is_cache_error(e, cache_name):
+                raise
+            # Expired, evicted or unusable handle: drop it and send this request inline
+            logger.warning("Cached prompt rejected, retrying inline", extra={"agent": agent, "cache": cache_name, "error": str(e)})
+            record_cache_error(agent)
+            get_prompt_cache().invalidate(client, agent, cache_name)
+
+    started = time.perf_counter()
+    with downstream("gemini"):
+        response = client.models.generate_content(
+            model=model,
+            contents=contents,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=schema,
+                **config_kwargs
+            )
+        )
+    record_prompt_cache_call(agent, response, (time.perf_counter() - started) * 1000, cached=False)
+    return response
+
+
+def _generate_structured(client, agent, schema, list_field, contents, config_kwargs, model='gemini-3-flash-preview'):
+    """
+    Calls Gemini with response_schema=schema and returns a validated dict.
+    Raises StructuredOutputError once repair and retries are exhausted.
+    """
+    last_error = None
+    for attempt in range(STRUCTURED_OUTPUT_MAX_ATTEMPTS):
+        if attempt > 0:
+            _record_structured_result(agent, "retried")
+        try:
+            response = _generate_with_prompt_cache(client, agent, model, schema, contents, config_kwargs)
+        except Exception as e:
+            logger.warning("Structured generation error", extra={"agent": agent, "attempt": attempt + 1, "error": str(e)})
+            last_error = e
+            continue
+
+        # 1. SDK-parsed output (fully valid against the schema)
+        parsed = getattr(response, 'parsed', None)
+        if isinstance(parsed, schema):
+            _record_structured_result(agent, "ok")
+            return parsed.model_dump()
+
+        # 2. Raw text: strict parse first, then local repair; validate item by item
+        outcome = "ok"
+        text = response.text or ""
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = _repair_json_text(text)
+            outcome = "repaired"
+
+        validated, dropped = _validate_items(data, schema, list_field)
+        if validated is not None:
+            if dropped:
+                _record_dropped_items(agent, dropped)
+                outcome = "partial"
+            _record_structured_result(agent, outcome)
+            return validated.model_dump()
+
+        logger.warning("Structured output unparseable", extra={"agent": agent, "attempt": attempt + 1, "text": text[:200]})
+        last_error = None
+
+    _record_structured_result(agent, "failed")
+    reason = str(last_error) if last_error else "unparseable output"
+    raise StructuredOutputError(
+        f"No structured output after {STRUCTURED_OUTPUT_MAX_ATTEMPTS} attempts: {reason}"
+    ) from last_error
+
+
 # Define Pydantic models for structured output
 class GameItem(BaseModel):
     title: str = Field(description="Title of the game or book")
@@ -91,27 +347,17 @@ def get_game_search_info(query, api_key):
     }
     """
 
-    import json
-    import re
-    
-    try:
-        response = client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=query,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-            )
+    return _generate_structured(
+        client,
+        agent="game",
+        schema=GameSearchResponse,
+        list_field="items",
+        contents=query,
+        config_kwargs=dict(
+            system_instruction=system_instruction,
+            tools=[types.Tool(google_search=types.GoogleSearch())],
         )
-        
-        text = response.text
-        # Remove code blocks if present
-        text = re.sub(r'```json\s*|\s*```', '', text)
-        return json.loads(text)
-    except Exception as e:
-        print(f"Gemini Game Agent error: {str(e)}")
-        # Fallback
-        return {"items": []}
+    )
 
 
 @search_info_bp.route('/searchInfo', methods=['GET'])
@@ -124,6 +370,17 @@ def search_info():
     if not api_key:
         return jsonify({"error": "Server configuration error: Missing Gemini API Key"}), 500
 
+    # Streaming mode: forward text chunks as Server-Sent Events as they arrive
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return Response(
+            stream_with_context(stream_search_info(query, api_key)),
+            mimetype='text/event-stream',
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx) so chunks flush immediately
+            }
+        )
+
     try:
         result = get_search_info(query, api_key)
         return jsonify(result)
@@ -132,6 +389,7 @@ def search_info():
         return jsonify({"error": f"Gemini Agent error: {str(e)}"}), 500
 
 
+
 @search_info_bp.route('/search/game', methods=['GET'])
 def search_game_info():
     query = request.args.get('query')
@@ -185,25 +443,44 @@ def get_character_info(query, api_key):
     }
     """
 
-    import json
-    import re
-
-    try:
-        response = client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=f"'{query}'에 등장하는 주요 캐릭터들을 찾아주세요.",
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-            )
+    return _generate_structured(
+        client,
+        agent="character",
+        schema=CharacterSearchResponse,
+        list_field="characters",
+        contents=f"'{query}'에 등장하는 주요 캐릭터들을 찾아주세요.",
+        config_kwargs=dict(
+            system_instruction=system_instruction,
+            tools=[types.Tool(google_search=types.GoogleSearch())],
         )
-        
-        text = response.text
-        text = re.sub(r'```json\s*|\s*```', '', text)
-        return json.loads(text)
-    except Exception as e:
-        print(f"Character Search Parsing Error: {e}")
-        return {"characters": []}
+    )
+
+# The local recommendation index answers the character search when a title has enough data
+RECOMMEND_MIN_CHARACTERS = int(os.environ.get('RECOMMEND_MIN_CHARACTERS', 3))
+RECOMMEND_MIN_REGISTRATIONS = int(os.environ.get('RECOMMEND_MIN_REGISTRATIONS', 5))
+
+_recommendation_counters = Counters("local", "gemini_fallback", "deep")
+register_metrics("character_recommendations", _recommendation_counters.snapshot)
+
+
+def recommend_characters(title, limit=10):
+    """
+    Characters for `title` from the local co-occurrence index, shaped like get_character_info's items.
+    Returns None when the title has too little local data to be useful.
+    """
+    from services.comic_service import ComicService
+
+    rows = ComicService().get_character_recommendations(title, limit)
+    if len(rows) < RECOMMEND_MIN_CHARACTERS or sum(r.get('registrations', 0) for r in rows) < RECOMMEND_MIN_REGISTRATIONS:
+        return None
+    return [{
+        "name": row['character_name'],
+        "image": row.get('photo_url') or "",
+        "description": f"{row['registrations']}명이 등록한 캐릭터",
+        "registrations": row['registrations'],
+        "avg_affinity": row.get('avg_affinity')
+    } for row in rows]
+
 
 @search_info_bp.route('/search/character', methods=['GET'])
 def search_character_info():
@@ -211,6 +488,21 @@ def search_character_info():
     if not query:
         return jsonify({"error": "Query parameter is required"}), 400
 
+    # deep=true skips the local index and always asks Gemini
+    deep = request.args.get('deep', 'false').lower() == 'true'
+    if deep:
+        _recommendation_counters.incr("deep")
+    else:
+        try:
+            local = recommend_characters(query)
+        except Exception as e:
+            logger.warning("Character recommendation lookup failed", extra={"error": str(e)})
+            local = None
+        if local:
+            _recommendation_counters.incr("local")
+            return jsonify({"characters": local, "source": "local"})
+        _recommendation_counters.incr("gemini_fallback")
+
     api_key = os.environ.get('GEMINI_API_KEY')
     if not api_key:
         return jsonify({"error": "Server configuration error: Missing Gemini API Key"}), 500
@@ -234,39 +526,30 @@ class SearchInfoItem(BaseModel):
 class ComprehensiveSearchResponse(BaseModel):
     items: List[SearchInfoItem]
 
-def get_comprehensive_search_info(user_id, api_key):
-    """
-    Performs a grounded search to find info for characters in user's news list.
-    Categories: Game Website, Publisher, Event, Collab, Popup Store, Game Sale, Release Date.
-    """
-    from services.comic_service import ComicService
-    comic_service = ComicService()
-    
-    # Fetch characters from news list
-    character_data = comic_service.get_news_list_data(user_id)
-    
-    if not character_data:
-         return {"items": []}
-         
-    # Construct a list string for the prompt
-    # format: "CharacterName (ComicTitle)"
+def comprehensive_targets(character_data):
+    """news_list rows -> ["CharacterName (작품: ComicTitle)", ...] in the prompt's target format."""
     target_list = []
     for item in character_data:
         char_name = item.get('character_name', 'Unknown')
         comic = item.get('comics', {})
         comic_title = comic.get('title', 'Unknown') if comic else 'Unknown'
         target_list.append(f"{char_name} (작품: {comic_title})")
-    
-    targets_str = ", ".join(target_list)
-    print(f"Targeting characters: {targets_str}")
+    return target_list
 
-    client = genai.Client(api_key=api_key)
+
+def search_comprehensive_targets(target_list, api_key, client=None):
+    """
+    One grounded comprehensive search over target_list.
+    Shared by the live endpoint and the nightly batch job (services/news_digest.py).
+    """
+    targets_str = ", ".join(target_list)
+    client = client or genai.Client(api_key=api_key)
     #오늘 날짜 -2달
-    today = datetime.now(timezone.utc).replace(microsecond=0)
+    # Day granularity keeps the system instruction and search window identical for a whole day,
+    # so the prefix can be served from the prompt cache
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
     two_months_before = today - timedelta(days=60)
     
-
-    print(two_months_before)
     system_instruction = f"""
     당신은 서브컬처(게임, 만화, 애니메이션) 정보 수집 전문 AI 에이전트입니다.
     사용자가 요청한 대상 캐릭터 위주의  최신 소식과 정보를 Google 검색을 통해 수집하여 카테고리별로 정리해주세요.
@@ -303,30 +586,47 @@ def get_comprehensive_search_info(user_id, api_key):
     
     """
 
-    import json
-    import re
-
-    try:
-        response = client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=f"다음 캐릭터들과 작품에 대한 최신 소식(홈페이지, 이벤트, 콜라보, 굿즈, 출판 등)을 모두 찾아주세요: {targets_str} ,{two_months_before} 이전의 정보는 목록에서 제외해주세요.",
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                tools=[types.Tool(google_search=types.GoogleSearch(
-                    time_range_filter=types.Interval(
-                        start_time=two_months_before,
-                        end_time=today
-                    )
-                ))],
-            )
+    result = _generate_structured(
+        client,
+        agent="comprehensive",
+        schema=ComprehensiveSearchResponse,
+        list_field="items",
+        contents=f"다음 캐릭터들과 작품에 대한 최신 소식(홈페이지, 이벤트, 콜라보, 굿즈, 출판 등)을 모두 찾아주세요: {targets_str} ,{two_months_before} 이전의 정보는 목록에서 제외해주세요.",
+        config_kwargs=dict(
+            system_instruction=system_instruction,
+            tools=[types.Tool(google_search=types.GoogleSearch(
+                time_range_filter=types.Interval(
+                    start_time=two_months_before,
+                    end_time=today + timedelta(days=1)
+                )
+            ))],
         )
-        
-        text = response.text
-        text = re.sub(r'```json\s*|\s*```', '', text)
-        return json.loads(text)
-    except Exception as e:
-        print(f"Comprehensive Search Agent Error: {e}")
-        return {"items": []}
+    )
+    # Drop repeated stories and dead links
+    result["items"] = clean_news_items(result["items"])
+    return result
+
+
+def get_comprehensive_search_info(user_id, api_key):
+    """
+    Performs a grounded search to find info for characters in user's news list.
+    Categories: Game Website, Publisher, Event, Collab, Popup Store, Game Sale, Release Date.
+    """
+    from services.comic_service import ComicService
+    comic_service = ComicService()
+    
+    # Fetch characters from news list
+    character_data = comic_service.get_news_list_data(user_id)
+    
+    if not character_data:
+         return {"items": []}
+         
+    # Construct a list string for the prompt
+    # format: "CharacterName (ComicTitle)"
+    target_list = comprehensive_targets(character_data)
+    logger.info("Comprehensive search targets", extra={"user_id": user_id, "target_count": len(target_list)})
+
+    return search_comprehensive_targets(target_list, api_key)
 
 @search_info_bp.route('/search/comprehensive', methods=['GET'])
 def search_comprehensive_info():
@@ -338,14 +638,23 @@ def search_comprehensive_info():
     if not api_key:
         return jsonify({"error": "Server configuration error: Missing Gemini API Key"}), 500
 
+    # Served from the nightly digest when fresh; refresh=true forces a live search
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
+
     try:
-        result = get_comprehensive_search_info(user_id, api_key)
+        from services.news_digest import get_comprehensive_news
+        result = get_comprehensive_news(user_id, api_key, refresh=refresh)
         return jsonify(result)
 
     except Exception as e:
         return jsonify({"error": f"Gemini Comprehensive Agent error: {str(e)}"}), 500
 
 
+@search_info_bp.route('/search/stats', methods=['GET'])
+def search_structured_stats():
+    return jsonify(get_structured_output_stats())
+
+
 if __name__ == "__main__":
     import sys
     from dotenv import load_dotenv
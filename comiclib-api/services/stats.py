@@ -0,0 +1,17 @@
+from flask import Blueprint, request, jsonify
+from services.comic_service import ComicService
+
+stats_bp = Blueprint('stats', __name__)
+comic_service = ComicService()
+
+@stats_bp.route('/stats', methods=['GET'])
+def get_user_stats():
+    try:
+        user_id = request.args.get('user_id')
+        if not user_id:
+             return jsonify({'error': 'user_id is required'}), 400
+
+        data = comic_service.get_user_stats(user_id)
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
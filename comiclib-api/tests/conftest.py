@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Tests run from comiclib-api/ against the SQLite backend; no Supabase/GCS/Gemini credentials needed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_data_dir = tempfile.mkdtemp(prefix="comiclib-tests-")
+os.environ.setdefault("COMICLIB_STORAGE", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(_data_dir, "comiclib.db"))
+os.environ.setdefault("BOOK_CATALOG_PATH", os.path.join(_data_dir, "book_catalog.db"))
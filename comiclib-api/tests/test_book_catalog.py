@@ -0,0 +1,65 @@
+import pytest
+from flask import Flask
+
+from services import book_catalog, naver_search
+from services.book_catalog import BookCatalog
+
+
+def book(isbn, title, author="작가"):
+    return {"isbn": f"00000 {isbn}", "title": title, "author": author, "image": ""}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return BookCatalog(str(tmp_path / "catalog.db"))
+
+
+def test_refreshed_book_no_longer_matches_old_title(catalog):
+    catalog.ingest([book("9780000000001", "원피스 1권")])
+    catalog.ingest([book("9780000000001", "나루토 1권")])
+
+    assert catalog.search("원피스") == []
+    assert catalog.search("피스") == []
+    assert [b["title"] for b in catalog.search("나루")] == ["나루토 1권"]
+    assert "원" not in catalog._trie.root.children
+
+
+def test_reindex_keeps_other_books_on_shared_tokens(catalog):
+    catalog.ingest([book("9780000000001", "원피스 1권"), book("9780000000002", "원피스 2권")])
+    catalog.ingest([book("9780000000001", "나루토 1권")])
+    assert [b["title"] for b in catalog.search("원피스")] == ["원피스 2권"]
+
+
+def test_reloaded_catalog_indexes_the_latest_version(catalog, tmp_path):
+    catalog.ingest([book("9780000000001", "원피스 1권")])
+    catalog.ingest([book("9780000000001", "나루토 1권")])
+    reloaded = BookCatalog(str(tmp_path / "catalog.db"))
+    assert reloaded.search("원피스") == []
+    assert len(reloaded.search("나루토")) == 1
+
+
+@pytest.fixture
+def client(catalog, monkeypatch):
+    monkeypatch.setattr(book_catalog, "_catalog", catalog)
+    app = Flask(__name__)
+    app.register_blueprint(naver_search.naver_bp, url_prefix="/api")
+    return app.test_client()
+
+
+def test_local_page_total_allows_paging_and_next_page_goes_to_naver(client, catalog, monkeypatch):
+    catalog.ingest([book(f"97800000000{i:02d}", f"원피스 {i}권") for i in range(10)])
+    naver_calls = []
+
+    def search_naver(query, display, start):
+        naver_calls.append(start)
+        return {"total": 120, "start": start, "display": display, "items": []}
+
+    monkeypatch.setattr(naver_search, "_search_naver", search_naver)
+
+    first = client.get("/api/naver/search/book.json?query=원피스&display=10").get_json()
+    assert first["source"] == "local"
+    assert first["total"] > first["start"] + first["display"] - 1
+
+    second = client.get("/api/naver/search/book.json?query=원피스&display=10&start=11").get_json()
+    assert second["source"] == "naver" and second["total"] == 120
+    assert naver_calls == [11]
@@ -0,0 +1,165 @@
+import io
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+from flask import Flask
+from requests.structures import CaseInsensitiveDict
+
+from services import image_proxy
+from services.image_proxy import ImageProxyError, image_proxy_bp
+
+HOSTS = {"cdn.example.com": "93.184.216.34", "internal.example.com": "10.0.0.5"}
+
+
+def FakeResponse(status_code=200, headers=None, body=b""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.raw = io.BytesIO(body)
+    return response
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    routes: url -> FakeResponse. requested records every URL asked for (by hostname);
+    connected records (address URL, Host header) as they reach the transport.
+    """
+    routes, requested, connected = {}, [], []
+
+    def getaddrinfo(host, port, proto=0):
+        if host not in HOSTS and host != "127.0.0.1":
+            raise socket.gaierror(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, proto, "", (HOSTS.get(host, host), port))]
+
+    def send(adapter, request, **kwargs):
+        connected.append((request.url, request.headers["Host"]))
+        url = f"{request.url.split('://')[0]}://{request.headers['Host']}{request.path_url}"
+        requested.append(url)
+        response = routes[url]
+        response.request, response.url = request, request.url
+        return response
+
+    monkeypatch.setattr(image_proxy.socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", send)
+    return routes, requested, connected
+
+
+def redirect(location):
+    return FakeResponse(302, {"Location": location})
+
+
+def test_follows_public_redirects(upstream):
+    routes, requested, connected = upstream
+    routes["https://cdn.example.com/a.jpg"] = redirect("/b.jpg")
+    routes["https://cdn.example.com/b.jpg"] = FakeResponse(200, {"Content-Type": "image/jpeg"}, b"jpeg")
+    assert image_proxy._fetch_upstream("https://cdn.example.com/a.jpg") == (b"jpeg", "image/jpeg")
+    assert requested == ["https://cdn.example.com/a.jpg", "https://cdn.example.com/b.jpg"]
+    # Connected to the validated address, not to whatever a second lookup would return
+    assert connected[0] == ("https://93.184.216.34/a.jpg", "cdn.example.com")
+
+
+@pytest.mark.parametrize("target", ["http://127.0.0.1/admin", "http://internal.example.com/x.png",
+                                    "file:///etc/passwd"])
+def test_redirect_into_disallowed_target_is_rejected(upstream, target):
+    routes, requested, connected = upstream
+    routes["https://cdn.example.com/a.jpg"] = redirect(target)
+    with pytest.raises(ImageProxyError) as exc:
+        image_proxy._fetch_upstream("https://cdn.example.com/a.jpg")
+    assert exc.value.status == 400
+    assert requested == ["https://cdn.example.com/a.jpg"]
+
+
+def test_redirect_loop_hits_hop_limit(upstream):
+    routes, requested, connected = upstream
+    routes["https://cdn.example.com/a.jpg"] = redirect("https://cdn.example.com/a.jpg")
+    with pytest.raises(ImageProxyError, match="Too many"):
+        image_proxy._fetch_upstream("https://cdn.example.com/a.jpg")
+    assert len(requested) == image_proxy.MAX_REDIRECTS + 1
+
+
+@pytest.mark.parametrize("urls", [[123], [None], ["https://cdn.example.com/a.jpg", {"url": "x"}], [""]])
+def test_prefetch_rejects_non_string_entries(urls):
+    app = Flask(__name__)
+    app.register_blueprint(image_proxy_bp, url_prefix="/api")
+    response = app.test_client().post("/api/image-proxy/prefetch", json={"urls": urls})
+    assert response.status_code == 400
+
+
+def test_rebinding_host_is_fetched_from_the_validated_address(upstream, monkeypatch):
+    routes, _, connected = upstream
+    routes["https://cdn.example.com/a.png"] = FakeResponse(200, {"Content-Type": "image/png"}, b"png")
+    answers = iter(["93.184.216.34", "10.0.0.5"])
+
+    def rebinding(host, port, proto=0):
+        return [(socket.AF_INET, socket.SOCK_STREAM, proto, "", (next(answers), port))]
+
+    monkeypatch.setattr(image_proxy.socket, "getaddrinfo", rebinding)
+    image_proxy._fetch_upstream("https://cdn.example.com/a.png")
+    assert connected == [("https://93.184.216.34/a.png", "cdn.example.com")]
+
+
+@pytest.mark.parametrize("content_type", ["image/svg+xml", "text/html", "image/x-icon", ""])
+def test_non_raster_types_are_rejected(upstream, content_type):
+    routes, _, connected = upstream
+    routes["https://cdn.example.com/a"] = FakeResponse(200, {"Content-Type": content_type}, b"<svg onload=x>")
+    with pytest.raises(ImageProxyError, match="supported image type"):
+        image_proxy._fetch_upstream("https://cdn.example.com/a")
+
+
+def test_https_pool_keeps_hostname_for_sni_and_certificate():
+    adapter = image_proxy.PinnedAdapter()
+    request = requests.Request("GET", "https://93.184.216.34/a.jpg").prepare()
+    request.pinned_hostname = "cdn.example.com"
+    host_params, pool_kwargs = adapter.build_connection_pool_key_attributes(request, True)
+    assert host_params["host"] == "93.184.216.34"
+    assert pool_kwargs["server_hostname"] == pool_kwargs["assert_hostname"] == "cdn.example.com"
+
+
+def test_pinned_adapter_sends_the_original_host_header():
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.headers["Host"])
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", "3")
+            self.end_headers()
+            self.wfile.write(b"png")
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        adapter = image_proxy.PinnedAdapter()
+        adapter.pin("cdn.example.com", "127.0.0.1")
+        with requests.Session() as session:
+            session.mount("http://", adapter)
+            response = session.get(f"http://cdn.example.com:{server.server_port}/a.png", timeout=5)
+        assert response.content == b"png"
+        assert seen == [f"cdn.example.com:{server.server_port}"]
+    finally:
+        server.shutdown()
+
+
+def test_proxied_images_carry_security_headers(monkeypatch):
+    monkeypatch.setattr(image_proxy, "get_image", lambda url, width: (b"png", {"content_type": "image/png", "etag": "e"}))
+    app = Flask(__name__)
+    app.register_blueprint(image_proxy_bp, url_prefix="/api")
+    response = app.test_client().get("/api/image-proxy?url=https://cdn.example.com/a.png")
+    assert response.status_code == 200
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["Content-Security-Policy"] == "default-src 'none'; sandbox"
+
+
+def test_cached_svg_is_not_served(monkeypatch):
+    monkeypatch.setattr(image_proxy, "get_image", lambda url, width: (b"<svg/>", {"content_type": "image/svg+xml", "etag": "e"}))
+    app = Flask(__name__)
+    app.register_blueprint(image_proxy_bp, url_prefix="/api")
+    assert app.test_client().get("/api/image-proxy?url=https://cdn.example.com/a.svg").status_code == 502
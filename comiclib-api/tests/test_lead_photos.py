@@ -0,0 +1,44 @@
+from repositories.sqlite_repository import SqliteRepository
+from repositories.supabase_repository import SupabaseRepository
+
+
+class FakeQuery:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return FakeQuery(self.rows)
+
+    def table(self, name):
+        raise AssertionError(f"lead photos must not scan {name} client-side")
+
+
+def test_sqlite_returns_the_lowest_num_per_character(tmp_path):
+    repo = SqliteRepository(str(tmp_path / "comiclib.db"))
+    comic = repo.insert_comic({"title": "원피스", "user_id": "u1"})[0]
+    luffy, zoro, nami = (repo.insert_character({"user_id": "u1", "comics_id": comic["id"], "character_name": name})[0]
+                         for name in ("루피", "조로", "나미"))
+    for character, nums in ((luffy, [3, 1, 2]), (zoro, [7])):
+        for num in nums:
+            repo.insert_photo({"id": character["id"], "num": num, "photo_base64": f"{character['id']}-{num}"})
+
+    lead = repo.get_lead_photos([str(luffy["id"]), zoro["id"], nami["id"]])
+    assert [(row["id"], row["num"]) for row in lead] == [(luffy["id"], 1), (zoro["id"], 7)]
+
+
+def test_supabase_picks_lead_rows_server_side():
+    rows = [{"id": 1, "num": 1, "photo_base64": "a", "keyword1": None, "keyword2": None}]
+    supabase = FakeSupabase(rows)
+    assert SupabaseRepository(supabase).get_lead_photos(["1", 2]) == rows
+    assert supabase.calls == [("get_lead_photos", {"p_ids": [1, 2]})]
+    assert SupabaseRepository(supabase).get_lead_photos([]) == []
@@ -0,0 +1,115 @@
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "DB"))
+
+migrate = pytest.importorskip("migrate")
+
+CREATED = re.compile(
+    r"create\s+(?:or\s+replace\s+)?(?:unique\s+)?(?:index|table|function|trigger|extension)\s+"
+    r"(?:concurrently\s+)?(?:if\s+not\s+exists\s+)?(?:public\.)?(\w+)",
+    re.IGNORECASE,
+)
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_versions_are_unique_and_contiguous():
+    versions = [version for version, _ in migrate.list_migrations()]
+    assert versions == [f"{n:04d}" for n in range(1, len(versions) + 1)]
+
+
+def test_no_migration_depends_on_a_later_one():
+    migrations = migrate.list_migrations()
+    created_by = {}
+    for version, path in migrations:
+        for name in CREATED.findall(read(path)):
+            created_by.setdefault(name.lower(), version)
+
+    for version, path in migrations:
+        # Statements only: comments name service methods that share a function's name
+        sql = " ".join(migrate.split_statements(read(path))).lower()
+        later = {name: by for name, by in created_by.items() if by > version and re.search(rf"\b{name}\b", sql)}
+        assert not later, f"{os.path.basename(path)} uses objects created by later migrations: {later}"
+
+
+def test_only_no_transaction_migrations_build_concurrently():
+    for _, path in migrate.list_migrations():
+        sql = read(path)
+        statements = " ".join(migrate.split_statements(sql)).lower()
+        if sql.startswith(migrate.NO_TRANSACTION_MARKER):
+            assert "concurrently" in statements, os.path.basename(path)
+        else:
+            # CREATE INDEX CONCURRENTLY fails inside the transaction apply() wraps the file in
+            assert "concurrently" not in statements, os.path.basename(path)
+
+
+class FakeConnection:
+    def __init__(self, applied):
+        self.applied = list(applied)
+        self.in_transaction = False
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @contextmanager
+    def transaction(self):
+        self.in_transaction = True
+        try:
+            yield
+        finally:
+            self.in_transaction = False
+
+    def execute(self, sql, params=None):
+        if sql.startswith("insert into public.schema_migrations"):
+            self.applied.append(params[0])
+            self.executed.append(("record", params[0], self.in_transaction))
+        elif sql.strip().startswith("select version"):
+            return [(version,) for version in self.applied]
+        else:
+            self.executed.append(("sql", sql, self.in_transaction))
+        return []
+
+
+def test_main_applies_pending_migrations_in_order(monkeypatch):
+    conn = FakeConnection(["0001", "0002"])
+    monkeypatch.setenv("DATABASE_URL", "postgresql://test")
+    monkeypatch.setattr(migrate.psycopg, "connect", lambda url, autocommit: conn)
+
+    migrate.main([])
+
+    versions = [version for version, _ in migrate.list_migrations()]
+    assert conn.applied == versions
+
+    no_transaction = {version for version, path in migrate.list_migrations()
+                      if read(path).startswith(migrate.NO_TRANSACTION_MARKER)}
+    for kind, value, in_transaction in conn.executed:
+        if kind == "record":
+            assert in_transaction == (value not in no_transaction)
+        elif "concurrently" in value.lower():
+            assert not in_transaction
+    # The CONCURRENTLY file ran statement by statement, never as one multi-statement string
+    assert all(";" not in value for kind, value, in_tx in conn.executed if kind == "sql" and not in_tx
+               and "schema_migrations" not in value)
+
+
+def test_main_dry_run_applies_nothing(monkeypatch):
+    conn = FakeConnection(["0001"])
+    monkeypatch.setenv("DATABASE_URL", "postgresql://test")
+    monkeypatch.setattr(migrate.psycopg, "connect", lambda url, autocommit: conn)
+
+    migrate.main(["--dry-run"])
+
+    assert conn.applied == ["0001"]
+    assert [kind for kind, _, _ in conn.executed] == ["sql"]  # only the schema_migrations bootstrap
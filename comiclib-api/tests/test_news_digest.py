@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services import news_digest, search_info
+from services.search_info import StructuredOutputError
+
+ROWS = [{"character_name": "루피", "comics": {"title": "원피스"}}]
+TARGETS = ["루피 (작품: 원피스)"]
+ITEM = {"title": "원피스 팝업", "link": "https://news.example.com/a", "content": "팝업 스토어", "date": ""}
+
+
+class FakeRepo:
+    def __init__(self, digest=None):
+        self.digest = digest
+        self.saved = []
+
+    def get_news_digest(self, user_id):
+        return self.digest
+
+    def save_news_digest(self, user_id, items, targets, generated_at):
+        self.saved.append(items)
+
+
+def old_digest(hours):
+    generated_at = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+    return {"items": [ITEM], "targets": TARGETS, "generated_at": generated_at}
+
+
+@pytest.fixture
+def live(monkeypatch):
+    """Set live["result"] to the items the live search returns, or to an exception it raises."""
+    import services.comic_service as comic_service
+
+    class FakeComicService:
+        def get_news_list_data(self, user_id):
+            return ROWS
+
+    state = {"result": [], "calls": 0}
+
+    def search(targets, api_key, client=None):
+        state["calls"] += 1
+        if isinstance(state["result"], Exception):
+            raise state["result"]
+        return {"items": state["result"]}
+
+    monkeypatch.setattr(comic_service, "ComicService", FakeComicService)
+    monkeypatch.setattr(search_info, "search_comprehensive_targets", search)
+    return state
+
+
+def test_fresh_digest_is_served_without_live_search(live):
+    result = news_digest.get_comprehensive_news("u1", "key", repo=FakeRepo(old_digest(1)))
+    assert (result["source"], result["stale"], live["calls"]) == ("digest", False, 0)
+
+
+@pytest.mark.parametrize("outcome", [StructuredOutputError("503"), []], ids=["live-fails", "live-empty"])
+def test_stale_digest_is_served_when_live_search_fails_or_is_empty(live, outcome):
+    live["result"] = outcome
+    repo = FakeRepo(old_digest(48))
+    result = news_digest.get_comprehensive_news("u1", "key", repo=repo)
+    assert (result["source"], result["stale"], result["items"]) == ("digest", True, [ITEM])
+    assert live["calls"] == 1 and repo.saved == []
+
+
+def test_live_failure_without_digest_propagates(live):
+    live["result"] = StructuredOutputError("503")
+    with pytest.raises(StructuredOutputError):
+        news_digest.get_comprehensive_news("u1", "key", repo=FakeRepo())
+
+
+def test_live_result_is_served_and_stored(live):
+    live["result"] = [ITEM]
+    repo = FakeRepo(old_digest(48))
+    result = news_digest.get_comprehensive_news("u1", "key", repo=repo)
+    assert (result["source"], result["stale"]) == ("live", False)
+    assert repo.saved == [[ITEM]]
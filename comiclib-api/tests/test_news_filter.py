@@ -0,0 +1,106 @@
+import socket
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from services import news_filter
+from services.news_filter import check_link, LINK_OK, LINK_DEAD, LINK_UNKNOWN
+
+HOSTS = {"news.example.com": "93.184.216.34", "intranet.example.com": "10.1.2.3"}
+
+
+@pytest.fixture
+def web(monkeypatch):
+    """routes: url -> status code, (status, location) or an exception to raise."""
+    routes, requested = {}, []
+
+    def getaddrinfo(host, port, proto=0):
+        if host == "flaky-dns.example.com":
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        if host not in HOSTS:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, proto, "", (HOSTS[host], port))]
+
+    def head(url, allow_redirects=True, **kwargs):
+        assert allow_redirects is False
+        requested.append(url)
+        route = routes[url]
+        if isinstance(route, Exception):
+            raise route
+        status, location = route if isinstance(route, tuple) else (route, None)
+        return SimpleNamespace(status_code=status, headers={"Location": location} if location else {})
+
+    monkeypatch.setattr(news_filter.socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(news_filter.requests, "head", head)
+    return routes, requested
+
+
+def test_ok_after_redirect_reports_final_url(web):
+    routes, _ = web
+    routes["https://news.example.com/a"] = (301, "/b")
+    routes["https://news.example.com/b"] = 200
+    assert check_link("https://news.example.com/a") == (LINK_OK, "https://news.example.com/b")
+
+
+def test_redirect_into_private_address_is_not_fetched(web):
+    routes, requested = web
+    routes["https://news.example.com/a"] = (302, "http://intranet.example.com/admin")
+    assert check_link("https://news.example.com/a") == (LINK_UNKNOWN, "https://news.example.com/a")
+    assert requested == ["https://news.example.com/a"]
+
+
+def test_redirect_loop_is_unknown(web):
+    routes, requested = web
+    routes["https://news.example.com/a"] = (302, "https://news.example.com/a")
+    assert check_link("https://news.example.com/a")[0] == LINK_UNKNOWN
+    assert len(requested) == news_filter.NEWS_LINK_MAX_REDIRECTS + 1
+
+
+@pytest.mark.parametrize("status", [404, 410])
+def test_gone_pages_are_dead(web, status):
+    routes, _ = web
+    routes["https://news.example.com/a"] = status
+    assert check_link("https://news.example.com/a")[0] == LINK_DEAD
+
+
+def test_nxdomain_is_dead_but_temporary_dns_failure_is_not(web):
+    assert check_link("https://no-such-host.example.com/a")[0] == LINK_DEAD
+    assert check_link("https://flaky-dns.example.com/a")[0] == LINK_UNKNOWN
+
+
+@pytest.mark.parametrize("route", [500, 429, requests.exceptions.ConnectionError("refused"),
+                                   requests.exceptions.ConnectTimeout("slow")])
+def test_transient_failures_are_unknown(web, route):
+    routes, _ = web
+    routes["https://news.example.com/a"] = route
+    assert check_link("https://news.example.com/a")[0] == LINK_UNKNOWN
+
+
+def test_unknown_links_are_cached_with_the_short_ttl(web):
+    routes, _ = web
+    routes["https://news.example.com/a"] = requests.exceptions.ConnectionError("refused")
+    ttls = {}
+    store = SimpleNamespace(get_many=lambda urls: {}, set=lambda url, health, ttl: ttls.__setitem__(url, ttl))
+    cache = news_filter.LinkHealthCache(store, workers=1)
+    assert cache.health(["https://news.example.com/a"])["https://news.example.com/a"]["status"] == LINK_UNKNOWN
+    assert ttls == {"https://news.example.com/a": news_filter.NEWS_LINK_UNKNOWN_TTL_S}
+
+
+def test_repeats_of_a_replacing_item_match_its_url():
+    short = {"title": "루피 현상금 공개", "content": "", "link": "https://news.example.com/a"}
+    rich = {"title": "루피 현상금 공개", "content": "30억 베리", "date": "2026-10-01", "link": "https://news.example.com/b"}
+    repeat = {"title": "다른 제목", "content": "", "link": "https://news.example.com/b"}
+    result = news_filter.clean_news_items([short, rich, repeat], check_links=False)
+    assert [item["link"] for item in result] == ["https://news.example.com/b"]
+
+
+def test_near_duplicates_compare_against_the_kept_item(monkeypatch):
+    # b is within the distance of a, c is within the distance of b but not of a
+    fingerprints = {"a": 0, "b b": (1 << 10) - 1, "c c c": (1 << 20) - 1}
+    monkeypatch.setattr(news_filter, "simhash", lambda text: fingerprints[text.strip()])
+    items = [{"title": "a", "link": "https://news.example.com/1"},
+             {"title": "b b", "date": "2026-10-01", "link": "https://news.example.com/2"},
+             {"title": "c c c", "link": "https://news.example.com/3"}]
+    result = news_filter.clean_news_items(items, check_links=False)
+    assert [item["title"] for item in result] == ["b b"]
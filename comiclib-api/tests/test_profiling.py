@@ -0,0 +1,49 @@
+import cProfile
+
+import pytest
+from flask import Flask, g
+
+from services import profiling
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "SamplingProfiler", None)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_should_profile", lambda: True)
+    yield Flask(__name__)
+    if profiling._cprofile_lock.locked():
+        profiling._cprofile_lock.release()
+
+
+def test_cprofile_fallback_profiles_one_request_at_a_time(app, tmp_path):
+    with app.test_request_context("/a"):
+        profiling._start_profile()
+        first = g.get("profiler")
+        assert first is not None
+
+        # Separate app context: g is per app context, not per request context
+        with app.app_context(), app.test_request_context("/b"):
+            profiling._start_profile()
+            assert g.get("profiler") is None
+
+        profiling._stop_profile(None)
+
+    assert not profiling._cprofile_lock.locked()
+    assert len(list(tmp_path.glob("*.txt"))) == 1
+
+    with app.test_request_context("/c"):
+        profiling._start_profile()
+        assert g.get("profiler") is not None
+        profiling._stop_profile(None)
+
+
+def test_enable_failure_skips_profile_and_releases_lock(app, monkeypatch):
+    def enable(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile.Profile, "enable", enable)
+    with app.test_request_context("/a"):
+        profiling._start_profile()
+        assert g.get("profiler") is None
+    assert not profiling._cprofile_lock.locked()
@@ -0,0 +1,132 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors
+
+from services import search_info
+from services.search_info import GameSearchResponse
+from utils import prompt_cache
+from utils.prompt_cache import PromptCache
+
+MODEL = "gemini-3-flash-preview"
+LONG_PREFIX = "x" * 8000  # 2000 tokens at 4 characters per token
+SHORT_PREFIX = "x" * 400
+
+
+def api_error(code, status, message=None):
+    cls = errors.ClientError if code < 500 else errors.ServerError
+    return cls(code, {"error": {"code": code, "status": status, "message": message or status}})
+
+
+class FakeCaches:
+    def __init__(self):
+        self.created, self.deleted = [], []
+        self.fail_update = None
+
+    def create(self, model, config):
+        name = f"cachedContents/{len(self.created) + 1}"
+        self.created.append(name)
+        return SimpleNamespace(name=name)
+
+    def update(self, name, config):
+        if self.fail_update:
+            raise self.fail_update
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+class FakeModels:
+    def __init__(self):
+        self.counted = 0
+        self.outcomes = []
+        self.configs = []
+
+    def count_tokens(self, model, contents):
+        self.counted += 1
+        return SimpleNamespace(total_tokens=len(contents) // 4)
+
+    def generate_content(self, model, contents, config):
+        self.configs.append(config)
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(parsed=None, text=json.dumps({"items": []}), candidates=[], usage_metadata=None)
+
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(caches=FakeCaches(), models=FakeModels())
+
+
+def test_prefix_below_minimum_is_never_cached(client):
+    cache = PromptCache()
+    assert cache.get(client, "test", MODEL, SHORT_PREFIX) is None
+    assert cache.get(client, "test", MODEL, SHORT_PREFIX) is None
+    assert client.caches.created == []
+    assert client.models.counted == 1
+
+
+def test_pro_models_need_a_larger_prefix(client):
+    assert PromptCache().get(client, "test", "gemini-2.5-pro", LONG_PREFIX) is None
+    assert PromptCache().get(client, "test", MODEL, LONG_PREFIX) == "cachedContents/1"
+
+
+def test_replaced_handle_is_deleted(client):
+    cache = PromptCache(ttl_s=100, margin_s=200)  # every get() wants a refresh
+    first = cache.get(client, "test", MODEL, LONG_PREFIX)
+    client.caches.fail_update = api_error(503, "UNAVAILABLE")
+    second = cache.get(client, "test", MODEL, LONG_PREFIX)
+    assert second != first
+    assert client.caches.deleted == [first]
+
+
+@pytest.fixture
+def cached_call(client, monkeypatch):
+    """Run _generate_with_prompt_cache against a fresh PromptCache holding one live handle."""
+    cache = PromptCache()
+    monkeypatch.setattr(search_info, "PROMPT_CACHE_ENABLED", True)
+    monkeypatch.setattr(search_info, "get_prompt_cache", lambda: cache)
+
+    def call():
+        return search_info._generate_with_prompt_cache(client, "test", MODEL, GameSearchResponse, "q",
+                                                       {"system_instruction": LONG_PREFIX})
+    return cache, call
+
+
+@pytest.mark.parametrize("error", [
+    api_error(404, "NOT_FOUND"),
+    api_error(400, "INVALID_ARGUMENT", "Cached content cachedContents/1 is expired"),
+    api_error(400, "INVALID_ARGUMENT", "cached_content cannot be combined with system_instruction"),
+])
+def test_rejected_handle_is_invalidated_and_request_sent_inline(client, cached_call, error):
+    cache, call = cached_call
+    client.models.outcomes = [error]
+    call()
+    assert client.caches.deleted == ["cachedContents/1"]
+    assert client.models.configs[-1].cached_content is None
+    assert client.models.configs[-1].system_instruction == LONG_PREFIX
+    assert cache.get(client, "test", MODEL, LONG_PREFIX) == "cachedContents/2"
+
+
+@pytest.mark.parametrize("error", [api_error(429, "RESOURCE_EXHAUSTED"), api_error(503, "UNAVAILABLE"),
+                                   api_error(400, "INVALID_ARGUMENT", "Invalid JSON payload: response_schema"),
+                                   api_error(400, "INVALID_ARGUMENT", "The input token count exceeds the maximum"),
+                                   TimeoutError("read timed out")])
+def test_non_cache_errors_propagate_and_keep_the_handle(client, cached_call, error):
+    cache, call = cached_call
+    client.models.outcomes = [error]
+    with pytest.raises(type(error)):
+        call()
+    assert len(client.models.configs) == 1
+    assert client.caches.deleted == []
+    assert cache.get(client, "test", MODEL, LONG_PREFIX) == "cachedContents/1"
+
+
+def test_is_cache_error():
+    assert prompt_cache.is_cache_error(api_error(404, "NOT_FOUND"))
+    assert not prompt_cache.is_cache_error(api_error(403, "PERMISSION_DENIED"))
+    assert not prompt_cache.is_cache_error(RuntimeError("404 NOT_FOUND"))
+    assert not prompt_cache.is_cache_error(api_error(400, "INVALID_ARGUMENT", "Request contains an invalid argument."))
+    assert prompt_cache.is_cache_error(api_error(400, "INVALID_ARGUMENT", "Bad handle cachedContents/7"), "cachedContents/7")
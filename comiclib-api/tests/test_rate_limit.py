@@ -0,0 +1,80 @@
+import pytest
+from flask import Flask
+
+from services.make_photo import make_photo_bp
+from utils.rate_limit import init_rate_limiting, RateLimiter, MemoryRateLimitStore
+
+PHOTO = "/api/makePhoto"
+PROXY_IP = "203.0.113.7"  # appended by the trusted proxy
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(make_photo_bp, url_prefix="/api")
+    init_rate_limiting(app)
+    return app.test_client()
+
+
+def post(client, xff=PROXY_IP, **headers):
+    # No files: admitted requests stop at the view's 400, so no model is ever called
+    return client.post(PHOTO, headers={"X-Forwarded-For": xff, **headers})
+
+
+def exhaust(client):
+    # makePhoto allows 4 calls per minute per address
+    statuses = [post(client).status_code for _ in range(4)]
+    assert 429 not in statuses
+    rejected = post(client)
+    assert rejected.status_code == 429
+    return rejected
+
+
+def test_rejects_after_route_burst_with_headers(client):
+    first = post(client)
+    assert first.status_code == 400
+    assert first.headers["RateLimit-Limit"] == "4"
+    assert first.headers["RateLimit-Remaining"] == "3"
+
+    for _ in range(3):
+        post(client)
+    rejected = post(client)
+    assert rejected.status_code == 429
+    assert rejected.headers["RateLimit-Remaining"] == "0"
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert rejected.get_json()["error"] == "Rate limit exceeded"
+
+
+def test_new_claimed_user_id_does_not_reset_budget(client):
+    exhaust(client)
+    for i in range(5):
+        assert post(client, **{"X-User-Id": f"user-{i}"}).status_code == 429
+        assert client.post(f"{PHOTO}?user_id=query-{i}", headers={"X-Forwarded-For": PROXY_IP}).status_code == 429
+
+
+def test_spoofed_first_forwarded_hop_does_not_reset_budget(client):
+    exhaust(client)
+    for i in range(5):
+        assert post(client, xff=f"10.0.0.{i}, {PROXY_IP}").status_code == 429
+
+
+def test_other_addresses_keep_their_own_budget(client):
+    exhaust(client)
+    assert post(client, xff="198.51.100.1").status_code == 400
+
+
+def test_one_address_cannot_exhaust_another_addresses_user(client):
+    # An attacker sending the victim's id drains only the attacker's own address
+    for _ in range(6):
+        post(client, **{"X-User-Id": "victim"})
+        client.post(f"{PHOTO}?user_id=victim", headers={"X-Forwarded-For": PROXY_IP})
+    assert post(client, **{"X-User-Id": "victim"}).status_code == 429
+
+    victim = "198.51.100.9"
+    assert post(client, xff=victim, **{"X-User-Id": "victim"}).status_code == 400
+    assert client.post(f"{PHOTO}?user_id=victim", headers={"X-Forwarded-For": victim}).status_code == 400
+
+
+def test_unlimited_endpoint_is_not_checked():
+    limiter = RateLimiter(MemoryRateLimitStore())
+    assert limiter.check("198.51.100.1", "comics.get_comics") is None
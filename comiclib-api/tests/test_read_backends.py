@@ -0,0 +1,100 @@
+import pytest
+from flask import Flask
+
+from repositories.sqlite_repository import SqliteRepository
+from repositories.supabase_repository import SupabaseRepository
+from services import comics
+from services.read_backend import PostgresReadBackend
+
+
+class FakeTable:
+    """Just enough of a PostgREST query builder: select("*").eq(column, value).limit(n).execute()."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return FakeTable([row for row in self.rows if row[column] == value])
+
+    def limit(self, n):
+        return FakeTable(self.rows[:n])
+
+    def single(self):
+        raise AssertionError(".single() raises on a missing row")
+
+    def execute(self):
+        self.data = self.rows
+        return self
+
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return FakeTable(self.tables.get(name, []))
+
+
+class FakePool:
+    """Direct-Postgres pool whose connections answer from the same rows."""
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def connection(self):
+        pool = self
+
+        class Connection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params):
+                table = "comic_character" if "comic_character" in sql else "comics"
+                rows = [row for row in pool.tables[table] if row["id"] == params[0]]
+
+                class Cursor:
+                    def fetchone(self):
+                        return rows[0] if rows else None
+
+                return Cursor()
+
+        return Connection()
+
+
+@pytest.fixture
+def backends(tmp_path):
+    sqlite = SqliteRepository(str(tmp_path / "comiclib.db"))
+    comic = sqlite.insert_comic({"title": "원피스", "author": "오다", "user_id": "u1"})[0]
+    character = sqlite.insert_character({"user_id": "u1", "comics_id": comic["id"], "character_name": "루피"})[0]
+    tables = {"comics": [comic], "comic_character": [character]}
+    return {
+        "sqlite": sqlite,
+        "postgrest": SupabaseRepository(FakeSupabase(tables)),
+        "postgres": PostgresReadBackend(FakePool(tables)),
+    }, comic, character
+
+
+@pytest.mark.parametrize("name", ["sqlite", "postgrest", "postgres"])
+def test_backends_agree_on_found_and_missing_rows(backends, name):
+    readers, comic, character = backends
+    reader = readers[name]
+    assert reader.get_comic_by_id(comic["id"]) == comic
+    assert reader.get_character_by_id(character["id"]) == character
+    assert reader.get_comic_by_id(comic["id"] + 1000) is None
+    assert reader.get_character_by_id(character["id"] + 1000) is None
+
+
+@pytest.mark.parametrize("path", ["/api/comics/987654", "/api/comics/character/987654"])
+def test_missing_rows_are_404(path, monkeypatch):
+    monkeypatch.setattr(comics.comic_service.reads, "get_comic_by_id", lambda comic_id: None)
+    monkeypatch.setattr(comics.comic_service.reads, "get_character_by_id", lambda character_id: None)
+    app = Flask(__name__)
+    app.register_blueprint(comics.comics_bp, url_prefix="/api")
+    response = app.test_client().get(path)
+    assert response.status_code == 404
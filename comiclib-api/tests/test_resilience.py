@@ -0,0 +1,158 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from utils import resilience
+from utils.resilience import CircuitBreaker, ModelUnavailableError, call_with_fallback
+
+
+class Refused(Exception):
+    pass
+
+
+@pytest.fixture
+def models():
+    """Fresh model names, so no breaker or stats state leaks between tests."""
+    suffix = uuid.uuid4().hex[:8]
+    return f"primary-{suffix}", f"fallback-{suffix}"
+
+
+@pytest.fixture
+def release():
+    """Set at teardown so calls blocked in the shared executor finish."""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_failure_falls_back_to_next_model(models):
+    primary, fallback = models
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        if model == primary:
+            raise RuntimeError("503")
+        return "image"
+
+    assert call_with_fallback(models, call, deadline_s=5) == ("image", fallback)
+    assert calls == [primary, fallback]
+    assert resilience.resilience_stats()[fallback]["served_as_fallback"] == 1
+
+
+def test_hedge_starts_fallback_and_first_success_wins(models, release):
+    primary, fallback = models
+    started = {}
+
+    def call(model):
+        started[model] = time.monotonic()
+        if model == primary:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    began = time.monotonic()
+    result = call_with_fallback(models, call, deadline_s=5, hedge_delay_s=0.1)
+    assert result == ("fast", fallback)
+    assert 0.1 <= started[fallback] - began < 1
+    assert resilience.resilience_stats()[fallback]["hedges"] == 1
+
+
+def test_primary_still_wins_if_it_finishes_first_after_hedging(models, release):
+    primary, fallback = models
+
+    def call(model):
+        if model == primary:
+            time.sleep(0.2)
+            return "primary"
+        release.wait(5)
+        return "fallback"
+
+    assert call_with_fallback(models, call, deadline_s=5, hedge_delay_s=0.05) == ("primary", primary)
+
+
+def test_no_hedge_before_the_delay(models):
+    primary, _ = models
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        time.sleep(0.05)
+        return model
+
+    assert call_with_fallback(models, call, deadline_s=5, hedge_delay_s=1) == (primary, primary)
+    assert calls == [primary]
+
+
+def test_deadline_raises_model_unavailable(models, release):
+    def call(model):
+        release.wait(5)
+        return model
+
+    began = time.monotonic()
+    with pytest.raises(ModelUnavailableError, match="deadline exceeded"):
+        call_with_fallback(models, call, deadline_s=0.2, hedge_delay_s=0.05)
+    assert time.monotonic() - began < 1
+
+
+def test_non_retryable_propagates_without_tripping_breaker(models):
+    primary, _ = models
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        raise Refused("text instead of image")
+
+    for _ in range(resilience.BREAKER_FAILURE_THRESHOLD + 1):
+        with pytest.raises(Refused):
+            call_with_fallback(models, call, deadline_s=5, non_retryable=(Refused,))
+    assert set(calls) == {primary}
+    breaker, _ = resilience._get(primary)
+    assert (breaker.state, breaker.failures) == (CircuitBreaker.CLOSED, 0)
+
+
+def test_open_breaker_is_skipped(models):
+    primary, fallback = models
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        if model == primary:
+            raise RuntimeError("503")
+        return model
+
+    for _ in range(resilience.BREAKER_FAILURE_THRESHOLD):
+        call_with_fallback(models, call, deadline_s=5)
+    calls.clear()
+    assert call_with_fallback(models, call, deadline_s=5) == (fallback, fallback)
+    assert calls == [fallback]
+    assert resilience.resilience_stats()[primary]["circuit"] == CircuitBreaker.OPEN
+
+
+def test_breaker_opens_after_threshold_and_lets_one_probe_through(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("model", failure_threshold=3, reset_s=60)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock[0] += 59
+    assert not breaker.allow()
+    clock[0] += 1
+    assert [breaker.allow() for _ in range(3)] == [True, False, False]
+
+    # A failed probe reopens for another reset_s; a successful one closes
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    clock[0] += 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert all(breaker.allow() for _ in range(3))
@@ -0,0 +1,46 @@
+import pytest
+from flask import Flask, jsonify
+
+from utils.responses import init_response_layer
+
+PAYLOAD = {"items": [{"id": n, "title": "원피스"} for n in range(200)]}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_response_layer(app)
+
+    @app.get("/items")
+    def items():
+        response = jsonify(PAYLOAD)
+        response.vary.add("Origin")
+        return response
+
+    return app.test_client()
+
+
+def test_vary_keeps_existing_values(client):
+    response = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert set(response.vary) == {"Origin", "Accept-Encoding"}
+
+
+def test_matching_etag_is_not_modified(client):
+    etag = client.get("/items").headers["ETag"]
+    response = client.get("/items", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+@pytest.mark.parametrize("header", ["*", '"stale", *'])
+def test_wildcard_if_none_match_is_not_modified(client, header):
+    response = client.get("/items", headers={"If-None-Match": header})
+    assert response.status_code == 304
+    assert response.headers["ETag"]
+
+
+def test_stale_etag_gets_the_body(client):
+    response = client.get("/items", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.get_json() == PAYLOAD
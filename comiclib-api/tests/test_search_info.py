@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from services import search_info
+from services.search_info import StructuredOutputError, GameSearchResponse, search_info_bp
+
+
+class FakeModels:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def generate_content(self, model, contents, config):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(parsed=None, text=outcome, candidates=[], usage_metadata=None)
+
+
+def fake_client(*outcomes):
+    return SimpleNamespace(models=FakeModels(outcomes))
+
+
+@pytest.fixture(autouse=True)
+def no_prompt_cache(monkeypatch):
+    monkeypatch.setattr(search_info, "PROMPT_CACHE_ENABLED", False)
+
+
+def generate(client, agent="test-game"):
+    return search_info._generate_structured(client, agent, GameSearchResponse, "items", "query",
+                                            {"system_instruction": "x"})
+
+
+def failed_count(agent):
+    return search_info.get_structured_output_stats().get(agent, {}).get("failed", 0)
+
+
+def test_retry_recovers_from_one_error():
+    client = fake_client(RuntimeError("503 UNAVAILABLE"), json.dumps({"items": []}))
+    assert generate(client, "test-recover") == {"items": []}
+    assert failed_count("test-recover") == 0
+
+
+@pytest.mark.parametrize("outcomes", [
+    [RuntimeError("503 UNAVAILABLE"), RuntimeError("503 UNAVAILABLE")],
+    ["not json", "still not json"],
+], ids=["api-errors", "unparseable"])
+def test_raises_and_counts_failure_after_retries(request, outcomes):
+    agent = f"test-fail-{request.node.callspec.id}"
+    client = fake_client(*outcomes)
+    with pytest.raises(StructuredOutputError):
+        generate(client, agent)
+    assert client.models.calls == search_info.STRUCTURED_OUTPUT_MAX_ATTEMPTS
+    assert failed_count(agent) == 1
+
+
+def test_route_returns_500_when_agent_fails(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    client = fake_client(RuntimeError("503 UNAVAILABLE"), RuntimeError("503 UNAVAILABLE"))
+    monkeypatch.setattr(search_info.genai, "Client", lambda api_key=None: client)
+    app = Flask(__name__)
+    app.register_blueprint(search_info_bp, url_prefix="/api")
+    response = app.test_client().get("/api/search/game?query=zelda")
+    assert response.status_code == 500
+    assert "error" in response.get_json()
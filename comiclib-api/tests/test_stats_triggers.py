@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from repositories.sqlite_repository import SqliteRepository
+
+USERS = ["u1", "u2"]
+AUTHORS = ["오다", "키시모토", "", None]
+TITLES = ["원피스", "원 피스", "나루토", "블리치"]
+NAMES = ["루피", "조로", "나미", "나루토"]
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return SqliteRepository(str(tmp_path / "comiclib.db"))
+
+
+def rows(repo, sql):
+    return sorted(tuple(row.values()) for row in repo._all(sql))
+
+
+def expected_aggregates(repo):
+    """Every trigger-maintained aggregate, recomputed from the base tables."""
+    key = lambda col: f"lower(replace(coalesce({col}, ''), ' ', ''))"
+    return {
+        "comics": rows(repo, "select user_id, count(*) from comics where user_id is not null group by 1"),
+        "characters": rows(repo, "select user_id, count(*) from comic_character group by 1"),
+        "authors": rows(repo, "select user_id, author, count(*) from comics "
+                              "where user_id is not null and author <> '' group by 1, 2"),
+        "top": rows(repo, "select c.comics_id, c.user_id, c.id, c.character_name, c.affinity from comic_character c "
+                          "where c.id = (select id from comic_character where comics_id = c.comics_id "
+                          "order by affinity desc nulls last, id limit 1)"),
+        "top_counts": rows(repo, "select t.user_id, t.character_name, count(*) from comic_character t "
+                                 "where t.id = (select id from comic_character where comics_id = t.comics_id "
+                                 "order by affinity desc nulls last, id limit 1) group by 1, 2"),
+        "recommendations": rows(repo, f"select {key('b.title')}, {key('a.character_name')}, count(*), "
+                                      f"coalesce(sum(a.affinity), 0) from comic_character a "
+                                      f"join comics b on a.comics_id = b.id where {key('b.title')} <> '' group by 1, 2"),
+    }
+
+
+def maintained_aggregates(repo):
+    return {
+        "comics": rows(repo, "select user_id, comics_count from user_stats where comics_count > 0"),
+        "characters": rows(repo, "select user_id, characters_count from user_stats where characters_count > 0"),
+        "authors": rows(repo, "select user_id, author, comics_count from user_author_stats where comics_count > 0"),
+        "top": rows(repo, "select comics_id, user_id, character_id, character_name, affinity from comic_top_character"),
+        "top_counts": rows(repo, "select user_id, character_name, first_count from user_top_character_stats "
+                                 "where first_count > 0"),
+        "recommendations": rows(repo, "select title_key, character_key, registrations, affinity_sum "
+                                      "from character_recommendation where registrations > 0"),
+    }
+
+
+def random_operation(repo, rng):
+    comics = repo.list_comics()
+    characters = repo._all("select * from comic_character")
+    op = rng.choice(["add_comic", "add_character", "add_character", "update_comic", "update_character",
+                     "delete_character", "delete_comic", "reorder"])
+
+    if op == "add_comic" or not comics:
+        repo.insert_comic({"title": rng.choice(TITLES), "author": rng.choice(AUTHORS), "user_id": rng.choice(USERS)})
+    elif op == "add_character" or not characters:
+        comic = rng.choice(comics)
+        repo.insert_character({"user_id": comic["user_id"], "comics_id": comic["id"],
+                               "character_name": rng.choice(NAMES), "affinity": rng.choice([None, *range(1, 6)])})
+    elif op == "update_comic":
+        comic = rng.choice(comics)
+        field = rng.choice(["title", "author", "user_id"])
+        value = {"title": rng.choice(TITLES), "author": rng.choice(AUTHORS), "user_id": rng.choice(USERS)}[field]
+        repo.update_comic(comic["id"], {field: value})
+    elif op == "update_character":
+        character = rng.choice(characters)
+        field = rng.choice(["character_name", "affinity", "comics_id", "user_id"])
+        value = {"character_name": rng.choice(NAMES), "affinity": rng.choice([None, *range(1, 6)]),
+                 "comics_id": rng.choice(comics)["id"], "user_id": rng.choice(USERS)}[field]
+        repo.update_character(character["id"], {field: value})
+    elif op == "delete_character":
+        repo.delete_character(rng.choice(characters)["id"])
+    elif op == "delete_comic":
+        comic = rng.choice(comics)
+        for character_id in repo.list_character_ids_for_comic(comic["id"]):
+            repo.delete_character(character_id)
+        repo.delete_comic(comic["id"])
+    else:
+        comic = rng.choice(comics)
+        owned = [c for c in characters if c["comics_id"] == comic["id"] and c["user_id"] == comic["user_id"]]
+        if owned:
+            affinities = rng.sample(range(100, 100 + len(owned) * 2), len(owned))
+            repo.reorder_characters(comic["user_id"], comic["id"],
+                                    [{"id": c["id"], "affinity": a} for c, a in zip(owned, affinities)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_triggers_mirror_aggregates_through_random_writes(repo, seed):
+    rng = random.Random(seed)
+    for step in range(150):
+        random_operation(repo, rng)
+        if step % 25 == 24:
+            assert maintained_aggregates(repo) == expected_aggregates(repo), f"diverged by step {step}"
+    assert maintained_aggregates(repo) == expected_aggregates(repo)
+
+
+def test_get_user_stats_reads_the_aggregates(repo):
+    one_piece = repo.insert_comic({"title": "원피스", "author": "오다", "user_id": "u1"})[0]
+    repo.insert_comic({"title": "나루토", "author": "키시모토", "user_id": "u1"})
+    repo.insert_comic({"title": "원피스 필름", "author": "오다", "user_id": "u1"})
+    repo.insert_character({"user_id": "u1", "comics_id": one_piece["id"], "character_name": "조로", "affinity": 1})
+    repo.insert_character({"user_id": "u1", "comics_id": one_piece["id"], "character_name": "루피", "affinity": 2})
+
+    stats = repo.get_user_stats("u1")
+    assert (stats["comics_count"], stats["characters_count"]) == (3, 2)
+    assert stats["top_author"] == {"author": "오다", "comics_count": 2}
+    assert stats["top_first_character"] == {"character_name": "루피", "first_count": 1}
+
+
+def test_reassigning_a_character_moves_it_between_users(repo):
+    comic = repo.insert_comic({"title": "원피스", "user_id": "u1"})[0]
+    character = repo.insert_character({"user_id": "u1", "comics_id": comic["id"], "character_name": "루피"})[0]
+    repo.update_character(character["id"], {"user_id": "u2"})
+
+    assert repo.get_user_stats("u1")["characters_count"] == 0
+    assert repo.get_user_stats("u2")["characters_count"] == 1
+    assert maintained_aggregates(repo) == expected_aggregates(repo)
@@ -0,0 +1,142 @@
+import io
+
+import pytest
+from flask import Flask
+
+from services import comic_service as comic_service_module
+from services import comics
+from services.comic_service import COVER_MAX_BYTES, UPLOAD_USER_META, UPLOAD_COMIC_META
+
+
+class FakeBlob:
+    def __init__(self, name, store):
+        self.name = name
+        self.store = store
+        self.metadata = None
+        self.content_type = "image/png"
+        self.size = 1024
+        self.signed = None
+
+    def generate_signed_url(self, **kwargs):
+        self.signed = kwargs
+        return f"https://storage.example.com/{self.name}?signed"
+
+    def create_resumable_upload_session(self, **kwargs):
+        self.store[self.name] = self
+        return f"https://storage.example.com/resumable/{self.name}"
+
+    def upload_from_file(self, stream, size=None, content_type=None, rewind=False):
+        if rewind:
+            stream.seek(0)
+        self.data = stream.read()
+        self.size, self.content_type = size, content_type
+        self.store[self.name] = self
+
+    def delete(self):
+        self.store.pop(self.name, None)
+
+    def patch(self):
+        pass
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}  # uploaded objects
+        self.handles = {}  # every blob handle the service asked for
+
+    def blob(self, name):
+        return self.objects.get(name) or self.handles.setdefault(name, FakeBlob(name, self.objects))
+
+    def get_blob(self, name):
+        return self.objects.get(name)
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket()
+    client = type("FakeStorage", (), {"bucket": lambda self, name: bucket})()
+    monkeypatch.setattr(comic_service_module, "get_storage_client", lambda: (client, None))
+    return bucket
+
+
+@pytest.fixture
+def client(bucket, monkeypatch):
+    owned = {1: {"id": 1, "user_id": "alice"}}
+    monkeypatch.setattr(comics.comic_service, "get_comic_by_id", lambda comic_id: owned.get(int(comic_id)))
+    monkeypatch.setattr(comics.comic_service, "update_comic", lambda comic_id, updates: None)
+    app = Flask(__name__)
+    app.register_blueprint(comics.comics_bp, url_prefix="/api")
+    return app.test_client()
+
+
+def create_session(client, **body):
+    return client.post("/api/comics/upload/session",
+                       json={"filename": "cover.png", "content_type": "image/png", **body})
+
+
+def upload(bucket, session):
+    """Simulate the client's PUT: GCS stores the object with the signed x-goog-meta-* headers."""
+    blob = bucket.blob(session["object_name"])
+    blob.metadata = {key[len("x-goog-meta-"):]: value for key, value in session["headers"].items()
+                     if key.startswith("x-goog-meta-")}
+    bucket.objects[blob.name] = blob
+    return blob
+
+
+def test_signed_url_carries_size_limit_and_binding(client, bucket):
+    session = create_session(client, user_id="alice", comic_id=1).get_json()
+    assert session["headers"]["x-goog-content-length-range"] == f"0,{COVER_MAX_BYTES}"
+    assert session["headers"][f"x-goog-meta-{UPLOAD_USER_META}"] == "alice"
+    assert session["headers"][f"x-goog-meta-{UPLOAD_COMIC_META}"] == "1"
+    signed = bucket.handles[session["object_name"]].signed
+    assert signed["method"] == "PUT"
+    assert signed["headers"] == {k: v for k, v in session["headers"].items() if k != "Content-Type"}
+
+
+def test_session_requires_user_and_owned_comic(client):
+    assert create_session(client).status_code == 400
+    assert create_session(client, user_id="mallory", comic_id=1).status_code == 403
+    assert create_session(client, user_id="alice", comic_id=99).status_code == 400
+
+
+def test_complete_accepts_the_bound_user_and_comic(client, bucket):
+    session = create_session(client, user_id="alice", comic_id=1).get_json()
+    upload(bucket, session)
+    response = client.post("/api/comics/upload/complete",
+                           json={"object_name": session["object_name"], "user_id": "alice", "comic_id": 1})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("caller", [{"user_id": "mallory", "comic_id": 1}, {"user_id": "alice", "comic_id": 2},
+                                    {"user_id": "alice"}])
+def test_complete_rejects_another_user_or_comic(client, bucket, caller):
+    session = create_session(client, user_id="alice", comic_id=1).get_json()
+    upload(bucket, session)
+    response = client.post("/api/comics/upload/complete", json={"object_name": session["object_name"], **caller})
+    assert response.status_code == 403
+    assert session["object_name"] in bucket.objects
+
+
+def test_resumable_session_binds_metadata(client, bucket):
+    session = create_session(client, user_id="alice", resumable=True).get_json()
+    assert bucket.objects[session["object_name"]].metadata == {UPLOAD_USER_META: "alice", UPLOAD_COMIC_META: ""}
+
+
+def test_legacy_upload_goes_to_the_bucket(client, bucket):
+    png = b"\x89PNG\r\n\x1a\n" + b"\0" * 100
+    response = client.post("/api/comics/upload", data={"file": (io.BytesIO(png), "cover.png")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200
+
+    (name, blob), = bucket.objects.items()
+    assert name.startswith("covers/") and name.endswith("_cover.png")
+    assert (blob.data, blob.size, blob.content_type) == (png, len(png), "image/png")
+    assert blob.cache_control.endswith("immutable")
+    assert response.get_json()["url"].endswith(f"/api/comics/cover/{name}")
+
+
+def test_legacy_upload_rejects_non_images(client, bucket):
+    response = client.post("/api/comics/upload", data={"file": (io.BytesIO(b"<svg/>"), "cover.png")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 415
+    assert not bucket.objects
@@ -0,0 +1,69 @@
+import hashlib
+import io
+
+import pytest
+from flask import Flask, jsonify, request
+
+from services.make_photo import make_photo_bp
+from utils import uploads
+from utils.uploads import init_uploads, upload_info, read_upload
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 200
+GIF = b"GIF89a\x01\x00\x01\x00"  # shorter than SNIFF_BYTES
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    init_uploads(app)
+    app.register_blueprint(make_photo_bp, url_prefix="/api")
+
+    @app.post("/inspect")
+    def inspect():
+        file = request.files["file"]
+        info = upload_info(file)
+        return jsonify({**info, "on_disk": file.stream.on_disk, "body_sha256": hashlib.sha256(read_upload(file)).hexdigest()})
+
+    return app
+
+
+def upload(client, data, name="a.png"):
+    return client.post("/inspect", data={"file": (io.BytesIO(data), name)}, content_type="multipart/form-data")
+
+
+def test_file_over_the_limit_is_413(app, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_FILE_BYTES", 1024)
+    response = upload(app.test_client(), PNG + b"\0" * 2048)
+    assert response.status_code == 413
+    assert "limit" in response.get_json()["error"]
+
+
+def test_small_file_is_hashed_and_sniffed(app):
+    body = upload(app.test_client(), GIF, "tiny.gif").get_json()
+    assert body["size"] == len(GIF)
+    assert body["sha256"] == body["body_sha256"] == hashlib.sha256(GIF).hexdigest()
+    assert (body["format"], body["mime_type"]) == ("gif", "image/gif")
+
+
+def test_only_files_over_the_threshold_spool_to_disk(app, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_SPOOL_THRESHOLD", 1024)
+    client = app.test_client()
+
+    small = upload(client, PNG).get_json()
+    assert small["on_disk"] is False
+
+    large_png = PNG + bytes(range(256)) * 16
+    large = upload(client, large_png).get_json()
+    assert large["on_disk"] is True
+    assert large["sha256"] == large["body_sha256"] == hashlib.sha256(large_png).hexdigest()
+    assert large["format"] == "png"
+
+
+def test_make_photo_rejects_non_images_with_415(app, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    response = app.test_client().post("/api/makePhoto", data={
+        "image1": (io.BytesIO(PNG), "a.png"),
+        "image2": (io.BytesIO(b"#!/bin/sh\necho not an image\n"), "b.png"),
+    }, content_type="multipart/form-data")
+    assert response.status_code == 415
+    assert "b.png" in response.get_json()["error"]
@@ -0,0 +1,170 @@
+import pytest
+
+from repositories.sqlite_repository import SqliteRepository
+from services import comic_service as comic_service_module
+from services.comic_service import ComicService, VIEW_CHARACTERS
+from services.read_backend import create_read_backend
+from utils.cache import ViewCache, MemoryCacheBackend, RedisCacheBackend, ALL_USERS
+
+
+def memory_backend():
+    return MemoryCacheBackend()
+
+
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCacheBackend(client=fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=[memory_backend, redis_backend], ids=["memory", "redis"])
+def cache(request):
+    return ViewCache(request.param())
+
+
+def test_hit_after_load_and_miss_after_invalidate(cache):
+    loads = []
+    load = lambda: loads.append(1) or ["v"]
+    assert cache.get_or_load("u1", "view", "", load) == ["v"]
+    assert cache.get_or_load("u1", "view", "", load) == ["v"]
+    assert len(loads) == 1
+    cache.invalidate("u1", "view")
+    cache.get_or_load("u1", "view", "", load)
+    assert len(loads) == 2
+
+
+def test_load_started_before_invalidation_does_not_repopulate(cache):
+    db = {"value": "old"}
+
+    def slow_load():
+        # The read sees the old row, then a mutator commits and invalidates before the write-back
+        seen = db["value"]
+        db["value"] = "new"
+        cache.invalidate("u1", "view")
+        return [seen]
+
+    assert cache.get_or_load("u1", "view", "", slow_load) == ["old"]
+    assert cache.get_or_load("u1", "view", "", lambda: [db["value"]]) == ["new"]
+
+
+def test_invalidation_is_scoped_to_user_and_view(cache):
+    cache.get_or_load("u1", "a", "", lambda: ["u1-a"])
+    cache.get_or_load("u1", "b", "", lambda: ["u1-b"])
+    cache.get_or_load("u2", "a", "", lambda: ["u2-a"])
+    cache.invalidate("u1", "a")
+    fail = lambda: pytest.fail("should have been a hit")
+    assert cache.get_or_load("u1", "b", "", fail) == ["u1-b"]
+    assert cache.get_or_load("u2", "a", "", fail) == ["u2-a"]
+
+
+def test_evicted_generation_still_rejects_stale_write():
+    cache = ViewCache(MemoryCacheBackend(max_entries=1))
+
+    def slow_load():
+        cache.invalidate("u1", "view")
+        cache.invalidate("u2", "view")  # evicts u1's generation record
+        return ["stale"]
+
+    cache.get_or_load("u1", "view", "", slow_load)
+    assert cache.get_or_load("u1", "view", "", lambda: ["fresh"]) == ["fresh"]
+
+
+# Every ComicService mutator must invalidate the views it changes
+
+
+class FakeStorage:
+    def __init__(self):
+        self.blobs = set()
+
+    def bucket(self, name):
+        return self
+
+    def blob(self, name):
+        storage = self
+        return type("FakeBlob", (), {
+            "upload_from_string": lambda self, data, content_type=None: storage.blobs.add(name),
+            "delete": lambda self: storage.blobs.discard(name),
+        })()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(comic_service_module, "get_storage_client", lambda: (FakeStorage(), None))
+    monkeypatch.setattr(comic_service_module, "sign_blob_urls", lambda paths, **kwargs: {})
+    service = ComicService()
+    service.repo = SqliteRepository(str(tmp_path / "comiclib.db"))
+    service.reads = create_read_backend(service.repo)
+    service.cache = ViewCache(MemoryCacheBackend())
+    return service
+
+
+def add_comic(service, title="원피스", user_id="u1"):
+    return service.add_comic({"title": title, "author": "오다", "user_id": user_id})[0]
+
+
+def add_character(service, comic, name="루피", affinity=1, news_list="Y"):
+    return service.add_comic_character({"user_id": comic["user_id"], "comics_id": comic["id"],
+                                        "character_name": name, "affinity": affinity, "news_list": news_list})[0]
+
+
+def names(service, user_id="u1"):
+    return [c["character_name"] for c in service.get_characters_info(user_id)]
+
+
+def test_comic_mutators_invalidate_comics_and_embedding_views(service):
+    assert service.get_comics() == []
+    comic = add_comic(service)
+    assert [c["title"] for c in service.get_comics()] == ["원피스"]
+
+    add_character(service, comic)
+    assert service.get_characters_info("u1")[0]["comics"]["title"] == "원피스"
+    assert service.get_news_list_data("u1")[0]["comics"]["title"] == "원피스"
+
+    service.update_comic(comic["id"], {"title": "ONE PIECE"})
+    assert [c["title"] for c in service.get_comics()] == ["ONE PIECE"]
+    assert service.get_characters_info("u1")[0]["comics"]["title"] == "ONE PIECE"
+    assert service.get_news_list_data("u1")[0]["comics"]["title"] == "ONE PIECE"
+
+    service.delete_comic(comic["id"])
+    assert service.get_comics() == []
+    assert service.get_characters_info("u1") == []
+    assert service.get_news_list_data("u1") == []
+
+
+def test_character_mutators_invalidate_character_and_news_views(service):
+    comic = add_comic(service)
+    assert names(service) == [] and service.get_news_list_data("u1") == []
+
+    luffy = add_character(service, comic, "루피", affinity=2)
+    zoro = add_character(service, comic, "조로", affinity=1)
+    assert names(service) == ["루피", "조로"]
+    assert len(service.get_news_list_data("u1")) == 2
+
+    service.update_comic_character(zoro["id"], {"news_list": "N"})
+    assert [r["character_name"] for r in service.get_news_list_data("u1")] == ["루피"]
+
+    service.reorder_comic_characters("u1", comic["id"], [{"id": luffy["id"], "affinity": 1},
+                                                         {"id": zoro["id"], "affinity": 2}])
+    assert names(service) == ["조로", "루피"]
+
+    service.delete_comic_character(luffy["id"])
+    assert names(service) == ["조로"]
+    assert service.get_news_list_data("u1") == []
+
+
+def test_photo_mutators_invalidate_lead_photos(service):
+    character = add_character(service, add_comic(service))
+    assert service.get_characters_info("u1", with_photos=True)[0]["lead_photo"] is None
+
+    service.add_photo_info({"id": character["id"], "photo_base64": "aGVsbG8=", "keyword1": "a", "keyword2": "b"})
+    assert service.get_characters_info("u1", with_photos=True)[0]["lead_photo"]["num"] == 1
+
+    service.delete_photo_info_by_id(character["id"])
+    assert service.get_characters_info("u1", with_photos=True)[0]["lead_photo"] is None
+
+
+def test_comics_view_is_shared_across_users(service):
+    service.get_comics()
+    add_comic(service, "나루토", user_id="u2")
+    assert [c["title"] for c in service.get_comics()] == ["나루토"]
+    assert service.cache.backend.get(ALL_USERS, "comics", "")[1] is not None
+    assert service.cache.backend.get("u1", VIEW_CHARACTERS, "")[1] is None
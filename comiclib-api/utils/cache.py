@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from utils.metrics import register_metrics
+from utils.log import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Read-through cache for per-user library views (see ComicService).
+# COMICLIB_CACHE=memory (default) | redis | off
+# 'memory' is per process; use 'redis' (any Redis-protocol server) to keep several API instances coherent.
+# Entries are keyed by a per-(user_id, view) generation that invalidate() bumps. A read returns the
+# generation it saw and the repopulating write goes under it, so a load that started before an
+# invalidation can't write its stale result where later reads look.
+CACHE_BACKEND = os.environ.get("COMICLIB_CACHE", "memory")
+CACHE_TTL = int(os.environ.get("COMICLIB_CACHE_TTL", 300))
+CACHE_MAX_ENTRIES = int(os.environ.get("COMICLIB_CACHE_MAX_ENTRIES", 10000))
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+KEY_PREFIX = "comiclib:view"
+
+# Cache key for views that aren't scoped to one user (e.g. get_comics)
+ALL_USERS = "*"
+
+
+class NullCacheBackend:
+    name = "off"
+
+    def get(self, user_id, view, args):
+        return None, None
+
+    def set(self, user_id, view, generation, args, value):
+        pass
+
+    def invalidate(self, user_id, views):
+        pass
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU over (user_id, view, generation) entries; each entry holds the cached
+    variants of that view (e.g. one per comics_id filter).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # (user_id, view) -> generation; values come from one process-wide clock and never repeat.
+        # Keys without a record are at _generation_floor, which rises past every evicted record.
+        self._generations = OrderedDict()
+        self._generation_floor = 0
+        self._clock = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _generation(self, user_id, view):
+        # Caller holds self._lock
+        return self._generations.get((user_id, view), self._generation_floor)
+
+    def get(self, user_id, view, args):
+        """(generation, value or None)"""
+        with self._lock:
+            generation = self._generation(user_id, view)
+            key = (user_id, view, generation)
+            variants = self._entries.get(key)
+            if variants is None or args not in variants:
+                return generation, None
+            expires_at, value = variants[args]
+            if expires_at < time.monotonic():
+                del variants[args]
+                return generation, None
+            self._entries.move_to_end(key)
+            return generation, value
+
+    def set(self, user_id, view, generation, args, value):
+        with self._lock:
+            if generation != self._generation(user_id, view):
+                # Invalidated while this value was loading
+                return
+            key = (user_id, view, generation)
+            self._entries.setdefault(key, {})[args] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id, views):
+        with self._lock:
+            for view in views:
+                self._entries.pop((user_id, view, self._generation(user_id, view)), None)
+                self._generations[(user_id, view)] = next(self._clock)
+                self._generations.move_to_end((user_id, view))
+            while len(self._generations) > self.max_entries:
+                _, evicted = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, evicted)
+
+
+# Generation and cached value in one round trip. KEYS: generation key. ARGV: data key prefix, field.
+_GET_SCRIPT = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+return {generation, redis.call('HGET', ARGV[1] .. ':' .. generation, ARGV[2])}
+"""
+
+
+class RedisCacheBackend:
+    """
+    One Redis hash per (user_id, view, generation); fields are the view arguments. The generation
+    lives in its own key; invalidation is a single INCR, so every instance sees writes immediately
+    and superseded hashes just expire.
+    """
+
+    name = "redis"
+
+    def __init__(self, url=REDIS_URL, ttl=CACHE_TTL, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+        self.ttl = ttl
+        self._get = self.client.register_script(_GET_SCRIPT)
+
+    def _key(self, user_id, view):
+        return f"{KEY_PREFIX}:{user_id}:{view}"
+
+    def _generation_key(self, user_id, view):
+        return f"{KEY_PREFIX}gen:{user_id}:{view}"
+
+    def get(self, user_id, view, args):
+        try:
+            generation, raw = self._get(keys=[self._generation_key(user_id, view)], args=[self._key(user_id, view), args])
+        except Exception as e:
+            logger.warning("Cache get failed", extra={"error": str(e)})
+            return None, None
+        return int(generation), json.loads(raw) if raw is not None else None
+
+    def set(self, user_id, view, generation, args, value):
+        if generation is None:
+            return
+        key = f"{self._key(user_id, view)}:{generation}"
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(key, args, json.dumps(value, ensure_ascii=False))
+            pipe.expire(key, self.ttl)
+            # The generation must outlive every hash written under it, or it could reset to a live one
+            pipe.expire(self._generation_key(user_id, view), self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Cache set failed", extra={"error": str(e)})
+
+    def invalidate(self, user_id, views):
+        try:
+            pipe = self.client.pipeline()
+            for view in views:
+                pipe.incr(self._generation_key(user_id, view))
+                pipe.expire(self._generation_key(user_id, view), self.ttl)
+            generations = pipe.execute()[::2]
+            # Free the superseded hashes now rather than at their TTL
+            self.client.delete(*[f"{self._key(user_id, view)}:{generation - 1}" for view, generation in zip(views, generations)])
+        except Exception as e:
+            # A missed invalidation is bounded by the TTL
+            logger.warning("Cache invalidate failed", extra={"error": str(e)})
+
+
+class ViewCache:
+    """Read-through wrapper: get_or_load() on reads, invalidate() from every mutator."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, user_id, view, args, loader):
+        user_id = str(user_id)
+        args = str(args)
+        generation, value = self.backend.get(user_id, view, args)
+        if value is not None:
+            with self._stats_lock:
+                self.hits += 1
+            return value
+
+        with self._stats_lock:
+            self.misses += 1
+        value = loader()
+        self.backend.set(user_id, view, generation, args, value)
+        return value
+
+    def invalidate(self, user_id, *views):
+        if user_id is None:
+            return
+        self.backend.invalidate(str(user_id), views)
+
+    def stats(self):
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+_view_cache = None
+_view_cache_lock = threading.Lock()
+
+
+def create_cache_backend(backend: str = None):
+    backend = backend or CACHE_BACKEND
+    if backend == "memory":
+        return MemoryCacheBackend()
+    if backend == "redis":
+        return RedisCacheBackend()
+    if backend == "off":
+        return NullCacheBackend()
+    raise ValueError(f"Unknown COMICLIB_CACHE: {backend}")
+
+
+def get_view_cache():
+    """Process-wide ViewCache shared by every ComicService instance."""
+    global _view_cache
+    if _view_cache is None:
+        with _view_cache_lock:
+            if _view_cache is None:
+                _view_cache = ViewCache(create_cache_backend())
+    return _view_cache
+
+
+register_metrics("view_cache", lambda: get_view_cache().stats())
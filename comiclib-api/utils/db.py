@@ -1,5 +1,5 @@
 import os
-from supabase import create_client, Client
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,10 +7,19 @@ load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
-if not url or not key:
-    raise ValueError("Supabase URL and Key must be set in environment variables.")
+# Created on first use so the API can start without cloud credentials
+# (e.g. COMICLIB_STORAGE=sqlite).
+supabase = None
+_supabase_lock = threading.Lock()
 
-supabase: Client = create_client(url, key)
+def get_supabase():
+    global supabase
+    if supabase is None:
+        with _supabase_lock:
+            if supabase is None:
+                if not url or not key:
+                    raise ValueError("Supabase URL and Key must be set in environment variables.")
 
-def get_supabase() -> Client:
+                from supabase import create_client
+                supabase = create_client(url, key)
     return supabase
@@ -0,0 +1,97 @@
+import os
+import json
+import threading
+
+
+class DiskLRUCache:
+    """
+    Stores each entry as <key>.bin plus <key>.json metadata.
+    File mtime is the recency marker; eviction removes the least recently used
+    entries until the total size is under max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".bin", base + ".json"
+
+    def _current_size(self):
+        if self._size is None:
+            total = 0
+            for name in os.listdir(self.directory):
+                if name.endswith(".bin"):
+                    try:
+                        total += os.path.getsize(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+            self._size = total
+        return self._size
+
+    def get(self, key):
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(data_path, "rb") as f:
+                data = f.read()
+            # Touch to mark as recently used
+            os.utime(data_path, None)
+            return data, meta
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, data, meta):
+        data_path, meta_path = self._paths(key)
+        tmp_path = data_path + f".{threading.get_ident()}.tmp"
+        with self._lock:
+            size = self._current_size()
+            try:
+                size -= os.path.getsize(data_path)
+            except OSError:
+                pass
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, data_path)
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+            self._size = size + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Caller must hold self._lock
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".bin"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        # Evict down to 90% so we don't evict on every insert once full
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            for p in (path, path[:-4] + ".json"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+        self._size = total
+
+    def stats(self):
+        with self._lock:
+            return {"bytes": self._current_size(), "max_bytes": self.max_bytes}
@@ -0,0 +1,113 @@
+import os
+import time
+import threading
+from datetime import timedelta
+from google.cloud import storage
+from google.oauth2 import service_account
+import google.auth
+import google.auth.transport.requests
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+BUCKET_NAME = os.environ.get("GCS_BUCKET", "2dfriend_photo")
+KEY_PATH = "hackton-team-pro-68bac217be8c.json"
+
+SIGNED_URL_EXPIRATION = timedelta(hours=1)
+# A signed URL is handed out again until this long before it expires
+SIGNED_URL_REUSE_MARGIN_S = 10 * 60
+SIGNED_URL_MEMO_MAX = 20000
+
+_signed_urls = {}
+_signed_urls_lock = threading.Lock()
+
+
+def get_storage_client():
+    """
+    Returns (client, credentials).
+    Local dev uses the service account key file; Cloud Run uses default credentials
+    and signs through IAM, so credentials are refreshed to make sure a token is present.
+    """
+    credentials = None
+    if os.path.exists(KEY_PATH):
+        try:
+            credentials = service_account.Credentials.from_service_account_file(KEY_PATH)
+            return storage.Client(credentials=credentials), credentials
+        except Exception as e:
+            logger.warning("Failed to load key file", extra={"error": str(e)})
+            return storage.Client(), None
+
+    try:
+        credentials, project_id = google.auth.default()
+        if not credentials.valid:
+            request = google.auth.transport.requests.Request()
+            credentials.refresh(request)
+        return storage.Client(credentials=credentials), credentials
+    except Exception as e:
+        logger.warning("Auth default failed", extra={"error": str(e)})
+        return storage.Client(), None
+
+
+def signing_kwargs(credentials):
+    """
+    Extra generate_signed_url kwargs for IAM-based signing.
+    Standard Compute Engine creds don't sign locally, so pass the email and token explicitly.
+    """
+    kwargs = {}
+    if credentials is None or isinstance(credentials, service_account.Credentials):
+        return kwargs
+
+    service_account_email = getattr(credentials, 'service_account_email', None) or getattr(credentials, 'signer_email', None)
+    if service_account_email:
+        kwargs["service_account_email"] = service_account_email
+        kwargs["access_token"] = credentials.token
+    return kwargs
+
+
+def sign_blob_urls(blob_paths, expiration=SIGNED_URL_EXPIRATION):
+    """
+    {blob_path: V4 signed GET URL} for a batch of objects.
+    Credentials are resolved once per batch, and URLs signed recently are reused, so a
+    list response costs at most one IAM signing round per new object instead of one
+    client setup per item. Paths that fail to sign are left out of the result.
+    """
+    now = time.monotonic()
+    result, missing = {}, []
+    with _signed_urls_lock:
+        for path in dict.fromkeys(blob_paths):
+            entry = _signed_urls.get(path)
+            if entry and entry[0] > now:
+                result[path] = entry[1]
+            else:
+                missing.append(path)
+    if not missing:
+        return result
+
+    client, credentials = get_storage_client()
+    bucket = client.bucket(BUCKET_NAME)
+    kwargs = {"version": "v4", "expiration": expiration, "method": "GET", **signing_kwargs(credentials)}
+    reuse_until = now + expiration.total_seconds() - SIGNED_URL_REUSE_MARGIN_S
+
+    signed = {}
+    for path in missing:
+        try:
+            signed[path] = bucket.blob(path).generate_signed_url(**kwargs)
+        except Exception as e:
+            logger.error("Error generating signed URL", extra={"blob_path": path, "error": str(e)})
+            if "private key" in str(e):
+                logger.error("HINT: On Cloud Run, ensure Service Account has 'Service Account Token Creator' role.")
+
+    with _signed_urls_lock:
+        if len(_signed_urls) + len(signed) > SIGNED_URL_MEMO_MAX:
+            _signed_urls.clear()
+        for path, url in signed.items():
+            _signed_urls[path] = (reuse_until, url)
+    result.update(signed)
+    return result
+
+
+def forget_signed_urls(blob_paths):
+    """Drop memoized URLs for deleted objects."""
+    with _signed_urls_lock:
+        for path in blob_paths:
+            _signed_urls.pop(path, None)
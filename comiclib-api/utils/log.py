@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+# Structured, non-blocking logging.
+# Records are formatted as one JSON line each (Cloud Logging reads "severity") and written
+# to stdout by a background QueueListener, so request threads never block on stdout I/O.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+# Longest string kept for any single field; longer values are cut with a "...(+N chars)" marker
+LOG_MAX_FIELD_CHARS = int(os.environ.get("LOG_MAX_FIELD_CHARS", 500))
+# Fraction of successful requests that get an access log line (errors are always logged)
+LOG_ACCESS_SAMPLE_RATE = float(os.environ.get("LOG_ACCESS_SAMPLE_RATE", 0.1))
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+_setup_lock = threading.Lock()
+_listener = None
+_dropped = 0
+
+
+def truncate(value, limit=None):
+    """Shorten long strings/bytes/containers for logging."""
+    limit = limit or LOG_MAX_FIELD_CHARS
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str):
+        return value if len(value) <= limit else f"{value[:limit]}...(+{len(value) - limit} chars)"
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)) and len(value) > 10:
+        return {"count": len(value), "head": [truncate(v, limit) for v in value[:3]]}
+    if isinstance(value, (list, tuple, dict)):
+        return truncate(json.dumps(value, default=str, ensure_ascii=False), limit)
+    return truncate(repr(value), limit)
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def set_request_id(request_id):
+    return _request_id.set(request_id)
+
+
+class _RequestIdFilter(logging.Filter):
+    # Runs in the calling thread (before the record is queued), so the contextvar is still visible
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage()),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = truncate(value)
+        if record.exc_info:
+            entry["exception"] = truncate(self.formatException(record.exc_info), 4000)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never block the caller: when the queue is full the record is dropped and counted."""
+
+    def prepare(self, record):
+        # Keep the record as-is (extra fields intact); formatting happens on the listener thread
+        record.request_id = getattr(record, "request_id", None)
+        return record
+
+    def enqueue(self, record):
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped += 1
+
+
+def setup_logging():
+    """Idempotent: install the queue handler on the root logger and start the listener."""
+    global _listener
+    if _listener is not None:
+        return
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(_JsonFormatter())
+
+        handler = _DroppingQueueHandler(log_queue)
+        handler.addFilter(_RequestIdFilter())
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(LOG_LEVEL)
+
+        _listener = QueueListener(log_queue, stream, respect_handler_level=False)
+        _listener.start()
+
+
+def get_logger(name):
+    setup_logging()
+    return logging.getLogger(name)
+
+
+def sampled(rate):
+    """True for roughly `rate` of calls; use to thin out high-volume events."""
+    return rate >= 1 or random.random() < rate
+
+
+def logging_stats():
+    return {"dropped_records": _dropped, "level": LOG_LEVEL}
+
+
+def init_request_logging(app):
+    """Attach a request id to every request (X-Request-ID in and out) and emit sampled access logs."""
+    from flask import request, g
+    from uuid import uuid4
+    from utils.metrics import register_metrics
+
+    access_logger = get_logger("comiclib.access")
+
+    @app.before_request
+    def _start_request():
+        request_id = request.headers.get("X-Request-ID")
+        if not request_id:
+            # Cloud Run: "TRACE_ID/SPAN_ID;o=1"
+            trace = request.headers.get("X-Cloud-Trace-Context", "")
+            request_id = trace.split("/")[0] if trace else uuid4().hex
+        g.request_id = request_id[:64]
+        g.request_started = time.perf_counter()
+        g.request_id_token = set_request_id(g.request_id)
+
+    @app.after_request
+    def _finish_request(response):
+        request_id = g.get("request_id")
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+        started = g.get("request_started")
+        if started is not None and (response.status_code >= 400 or sampled(LOG_ACCESS_SAMPLE_RATE)):
+            access_logger.info(
+                "request completed",
+                extra={
+                    "method": request.method,
+                    "path": request.path,
+                    "route": request.url_rule.rule if request.url_rule else None,
+                    "status": response.status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "sample_rate": 1.0 if response.status_code >= 400 else LOG_ACCESS_SAMPLE_RATE,
+                }
+            )
+        return response
+
+    @app.teardown_request
+    def _reset_request_id(exc):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            try:
+                _request_id.reset(token)
+            except ValueError:
+                pass
+
+    register_metrics("logging", logging_stats)
@@ -0,0 +1,40 @@
+import threading
+
+# Process-wide metrics registry. Subsystems register a snapshot function;
+# GET /api/metrics returns all of them.
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def register_metrics(name, snapshot_fn):
+    with _providers_lock:
+        _providers[name] = snapshot_fn
+
+
+def snapshot():
+    with _providers_lock:
+        providers = dict(_providers)
+
+    result = {}
+    for name, fn in providers.items():
+        try:
+            result[name] = fn()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
+
+
+class Counters:
+    """Thread-safe named counters."""
+
+    def __init__(self, *names):
+        self._lock = threading.Lock()
+        self._values = {name: 0 for name in names}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
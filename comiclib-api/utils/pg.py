@@ -0,0 +1,38 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Direct Postgres access for hot read paths (see services/read_backend.py).
+# Use the session-mode / direct connection string (port 5432): transaction-mode
+# poolers (pgbouncer on 6543) don't keep server-side prepared statements.
+DATABASE_URL = os.environ.get("DATABASE_URL")
+PG_POOL_MIN_SIZE = int(os.environ.get("PG_POOL_MIN_SIZE", 1))
+PG_POOL_MAX_SIZE = int(os.environ.get("PG_POOL_MAX_SIZE", 10))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pg_pool():
+    """Lazily create the shared psycopg connection pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if not DATABASE_URL:
+                    raise ValueError("DATABASE_URL must be set to use the postgres read backend.")
+
+                from psycopg.rows import dict_row
+                from psycopg_pool import ConnectionPool
+
+                _pool = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=PG_POOL_MIN_SIZE,
+                    max_size=PG_POOL_MAX_SIZE,
+                    # prepare_threshold=0: server-side prepare every statement on first use
+                    kwargs={"row_factory": dict_row, "prepare_threshold": 0, "autocommit": True},
+                    open=True
+                )
+    return _pool
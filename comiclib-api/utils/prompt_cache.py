@@ -0,0 +1,262 @@
+import os
+import math
+import time
+import hashlib
+import threading
+from collections import deque
+from google.genai import types
+from google.genai import errors as genai_errors
+from utils.metrics import register_metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# The structured agents resend the same long system instruction + tools on every call. With
+# explicit context caching that prefix is uploaded once per model as a CachedContent and requests
+# only reference it by name; Gemini bills cached tokens at a discount and skips re-processing them.
+# A handle is refreshed (TTL extended) once it is within PROMPT_CACHE_REFRESH_MARGIN_S of expiry;
+# a handle that is replaced or rejected is deleted server-side rather than left to bill storage.
+# Gemini refuses to cache prefixes below a minimum size (1024 tokens on Flash, 4096 on Pro), so each
+# prefix is measured with count_tokens once and smaller ones are always sent inline. If creation
+# fails it is retried only after PROMPT_CACHE_RETRY_S; until then prompts go inline.
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+PROMPT_CACHE_TTL_S = int(os.environ.get("PROMPT_CACHE_TTL_S", 3600))
+PROMPT_CACHE_REFRESH_MARGIN_S = int(os.environ.get("PROMPT_CACHE_REFRESH_MARGIN_S", 300))
+PROMPT_CACHE_RETRY_S = int(os.environ.get("PROMPT_CACHE_RETRY_S", 900))
+PROMPT_CACHE_MIN_TOKENS = int(os.environ.get("PROMPT_CACHE_MIN_TOKENS", 1024))
+PROMPT_CACHE_MIN_TOKENS_PRO = int(os.environ.get("PROMPT_CACHE_MIN_TOKENS_PRO", 4096))
+LATENCY_WINDOW = 200
+
+# Errors that mean the cached_content reference itself is unusable (expired, evicted, wrong model).
+# INVALID_ARGUMENT also covers malformed requests unrelated to the cache (bad schema, oversized
+# input), so it only counts when the message names the cached content.
+_STATUS_BY_CODE = {400: "INVALID_ARGUMENT", 404: "NOT_FOUND"}
+
+
+def is_cache_error(error, cache_name=None):
+    """True if the API rejected the cache handle; anything else (429, 5xx, timeouts) is not cache-related."""
+    if not isinstance(error, genai_errors.ClientError):
+        return False
+    status = error.status or _STATUS_BY_CODE.get(error.code)
+    if status == "NOT_FOUND":
+        return True
+    if status != "INVALID_ARGUMENT":
+        return False
+    message = (error.message or "").lower()
+    return bool(cache_name and cache_name.lower() in message) or \
+        "cachedcontent" in message.replace(" ", "").replace("_", "")
+
+
+def min_cache_tokens(model):
+    return PROMPT_CACHE_MIN_TOKENS_PRO if "pro" in model else PROMPT_CACHE_MIN_TOKENS
+
+
+class _Entry:
+    __slots__ = ("name", "expires_at", "retry_at")
+
+    def __init__(self, name=None, expires_at=0.0, retry_at=0.0):
+        self.name = name
+        self.expires_at = expires_at
+        self.retry_at = retry_at
+
+
+class PromptCache:
+    """
+    Process-wide registry of Gemini CachedContent handles, keyed by model + prefix content.
+    The deployment uses a single GEMINI_API_KEY, so handles are shared by every client.
+    """
+
+    def __init__(self, ttl_s=PROMPT_CACHE_TTL_S, margin_s=PROMPT_CACHE_REFRESH_MARGIN_S, retry_s=PROMPT_CACHE_RETRY_S):
+        self.ttl_s = ttl_s
+        self.margin_s = margin_s
+        self.retry_s = retry_s
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def key(model, system_instruction, tools):
+        digest = hashlib.sha256()
+        for part in (model, system_instruction, repr(tools)):
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, client, agent, model, system_instruction, tools=None):
+        """Name of a live CachedContent holding this prefix, or None if the caller should send it inline."""
+        key = self.key(model, system_instruction, tools)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if entry.name and entry.expires_at - now > self.margin_s:
+                return entry.name
+            if not entry.name and entry.retry_at > now:
+                return None
+
+        # One create/refresh per prefix at a time; concurrent callers wait and reuse the result
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None:
+                if entry.name and entry.expires_at - now > self.margin_s:
+                    return entry.name
+                if not entry.name and entry.retry_at > now:
+                    return None
+                if entry.name and entry.expires_at > now:
+                    if self._refresh(client, agent, entry):
+                        return entry.name
+                    # Still live server-side; don't leave it behind when it is replaced
+                    self._delete(client, agent, entry.name)
+            return self._create(client, agent, key, model, system_instruction, tools)
+
+    def _refresh(self, client, agent, entry):
+        try:
+            client.caches.update(name=entry.name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_s}s"))
+        except Exception as e:
+            logger.warning("Prompt cache refresh failed", extra={"agent": agent, "cache": entry.name, "error": str(e)})
+            _stats.incr(agent, "cache_errors")
+            return False
+        entry.expires_at = time.monotonic() + self.ttl_s
+        _stats.incr(agent, "cache_refreshes")
+        return True
+
+    def _prefix_tokens(self, client, agent, model, system_instruction):
+        """Token count of the prefix, or None if it couldn't be measured."""
+        try:
+            return client.models.count_tokens(model=model, contents=system_instruction).total_tokens
+        except Exception as e:
+            logger.warning("Prompt prefix token count failed", extra={"agent": agent, "model": model, "error": str(e)})
+            return None
+
+    def _create(self, client, agent, key, model, system_instruction, tools):
+        tokens = self._prefix_tokens(client, agent, model, system_instruction)
+        if tokens is None:
+            self._entries[key] = _Entry(retry_at=time.monotonic() + self.retry_s)
+            return None
+        if tokens < min_cache_tokens(model):
+            # The key covers the prefix content, so this prefix never becomes cacheable
+            logger.info("Prompt prefix below the minimum cacheable size, sending it inline",
+                        extra={"agent": agent, "model": model, "tokens": tokens})
+            _stats.incr(agent, "cache_skipped_small")
+            self._entries[key] = _Entry(retry_at=math.inf)
+            return None
+        try:
+            cached = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"comiclib-{agent}",
+                    system_instruction=system_instruction,
+                    tools=tools,
+                    ttl=f"{self.ttl_s}s",
+                )
+            )
+        except Exception as e:
+            logger.warning("Prompt cache create failed, sending prompt inline",
+                           extra={"agent": agent, "model": model, "error": str(e)})
+            _stats.incr(agent, "cache_errors")
+            self._entries[key] = _Entry(retry_at=time.monotonic() + self.retry_s)
+            return None
+        self._entries[key] = _Entry(name=cached.name, expires_at=time.monotonic() + self.ttl_s)
+        _stats.incr(agent, "cache_creates")
+        logger.info("Prompt cache created", extra={"agent": agent, "model": model, "cache": cached.name})
+        return cached.name
+
+    def _delete(self, client, agent, name):
+        try:
+            client.caches.delete(name=name)
+        except Exception as e:
+            # Already gone (expired/evicted) or the API is unavailable; the server-side TTL cleans up
+            logger.info("Prompt cache delete failed", extra={"agent": agent, "cache": name, "error": str(e)})
+            return
+        _stats.incr(agent, "cache_deletes")
+
+    def invalidate(self, client, agent, name):
+        """Forget and delete a handle the API rejected; the next call recreates it."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.name == name:
+                    del self._entries[key]
+        self._delete(client, agent, name)
+
+
+class _AgentStats:
+    def __init__(self):
+        self.values = {"calls": 0, "cached_calls": 0, "inline_calls": 0, "cache_creates": 0,
+                       "cache_refreshes": 0, "cache_deletes": 0, "cache_skipped_small": 0, "cache_errors": 0,
+                       "prompt_tokens": 0, "cached_tokens": 0}
+        self.latencies_ms = {"cached": deque(maxlen=LATENCY_WINDOW), "inline": deque(maxlen=LATENCY_WINDOW)}
+
+
+class _PromptCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents = {}
+
+    def _agent(self, agent):
+        # Caller holds self._lock
+        return self._agents.setdefault(agent, _AgentStats())
+
+    def incr(self, agent, name, amount=1):
+        with self._lock:
+            self._agent(agent).values[name] += amount
+
+    def record_call(self, agent, response, latency_ms, cached):
+        usage = getattr(response, "usage_metadata", None)
+        with self._lock:
+            stats = self._agent(agent)
+            stats.values["calls"] += 1
+            stats.values["cached_calls" if cached else "inline_calls"] += 1
+            stats.values["prompt_tokens"] += getattr(usage, "prompt_token_count", None) or 0
+            stats.values["cached_tokens"] += getattr(usage, "cached_content_token_count", None) or 0
+            stats.latencies_ms["cached" if cached else "inline"].append(latency_ms)
+
+    def snapshot(self):
+        with self._lock:
+            agents = {agent: (dict(stats.values), {mode: sorted(window) for mode, window in stats.latencies_ms.items()})
+                      for agent, stats in self._agents.items()}
+
+        def pct(ordered, p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1) if ordered else None
+
+        result = {"enabled": PROMPT_CACHE_ENABLED}
+        for agent, (values, latencies) in agents.items():
+            prompt_tokens = values["prompt_tokens"]
+            result[agent] = {
+                **values,
+                "cached_token_ratio": round(values["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0,
+                **{f"{mode}_p{p}_ms": pct(ordered, p / 100) for mode, ordered in latencies.items() for p in (50, 95)},
+            }
+        return result
+
+
+_stats = _PromptCacheStats()
+_prompt_cache = None
+_prompt_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    global _prompt_cache
+    if _prompt_cache is None:
+        with _prompt_cache_lock:
+            if _prompt_cache is None:
+                _prompt_cache = PromptCache()
+    return _prompt_cache
+
+
+def record_call(agent, response, latency_ms, cached):
+    _stats.record_call(agent, response, latency_ms, cached)
+
+
+def record_cache_error(agent):
+    _stats.incr(agent, "cache_errors")
+
+
+def prompt_cache_stats():
+    return _stats.snapshot()
+
+
+register_metrics("prompt_cache", prompt_cache_stats)
@@ -0,0 +1,282 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import OrderedDict
+from utils.cache import REDIS_URL
+from utils.metrics import register_metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Per-caller fair share for the expensive endpoints.
+# The caller is the client address the trusted proxy saw; nothing the client sends can pick a new bucket.
+# Every limited request takes `cost` units from that address's budget bucket (shared by all routes)
+# and one call from its bucket for that route; a request is admitted only if both have room.
+# The user_id / X-User-Id a client claims is not authenticated, so it never picks a bucket: a
+# per-user bucket would let anyone drain a chosen user's budget by sending their id.
+# The check runs in before_request, before the body is parsed or any model/API is called.
+# RATE_LIMIT_STORE=memory (default, per process) | redis (any Redis-protocol server, shared by
+# every instance) | off. A failing store lets requests through rather than rejecting everyone.
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "memory")
+# Budget per caller: RATE_LIMIT_USER_CAPACITY units, refilled at RATE_LIMIT_USER_REFILL_PER_S
+RATE_LIMIT_USER_CAPACITY = float(os.environ.get("RATE_LIMIT_USER_CAPACITY", 300))
+RATE_LIMIT_USER_REFILL_PER_S = float(os.environ.get("RATE_LIMIT_USER_REFILL_PER_S", 1))
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", 100000))
+# Proxies in front of the app that append to X-Forwarded-For (Cloud Run's front end: 1). The client
+# address is the hop that many entries from the end; earlier hops are client-supplied. 0 = remote_addr.
+RATE_LIMIT_TRUSTED_PROXY_HOPS = int(os.environ.get("RATE_LIMIT_TRUSTED_PROXY_HOPS", 1))
+KEY_PREFIX = "comiclib:ratelimit"
+
+# endpoint -> (cost in budget units, calls per minute on that route, which is also its burst)
+# Image generation >> grounded Gemini searches >> Naver / image fetches. Endpoints not listed are not limited.
+DEFAULT_RULES = {
+    "make_photo.make_photo": (60, 4),
+    "search_info.search_comprehensive_info": (20, 10),
+    "search_info.search_info": (10, 20),
+    "search_info.search_game_info": (10, 20),
+    "search_info.search_character_info": (5, 30),
+    "news.news": (5, 20),
+    "naver_search.search_book_proxy": (1, 60),
+    "naver_search.autocomplete_book": (0.2, 300),
+    "image_proxy.image_proxy": (0.5, 300),
+    "image_proxy.image_proxy_prefetch": (2, 30),
+    "comics.upload_file": (3, 30),
+}
+
+
+def _load_rules():
+    rules = dict(DEFAULT_RULES)
+    # e.g. RATE_LIMIT_RULES='{"make_photo.make_photo": [100, 2]}'
+    overrides = os.environ.get("RATE_LIMIT_RULES")
+    if overrides:
+        rules.update({endpoint: tuple(rule) for endpoint, rule in json.loads(overrides).items()})
+    return rules
+
+
+class Decision:
+    __slots__ = ("allowed", "limit", "remaining", "reset_s", "retry_after_s")
+
+    def __init__(self, allowed, limit, remaining, reset_s, retry_after_s):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_s = reset_s
+        self.retry_after_s = retry_after_s
+
+    def headers(self):
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset_s),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after_s)
+        return headers
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    if tokens is None:
+        return capacity
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class NullRateLimitStore:
+    name = "off"
+
+    def take(self, buckets, now):
+        return True, [capacity for _, capacity, _, _ in buckets]
+
+
+class MemoryRateLimitStore:
+    """In-process token buckets; the least recently used buckets are dropped past max_buckets."""
+
+    name = "memory"
+
+    def __init__(self, max_buckets=RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        """
+        buckets: [(key, capacity, refill_per_s, cost)]. Takes cost from every bucket only if all
+        of them have enough. Returns (allowed, [tokens left per bucket]).
+        """
+        with self._lock:
+            levels = []
+            for key, capacity, rate, _ in buckets:
+                tokens, updated = self._buckets.get(key, (None, now))
+                levels.append(_refill(tokens, updated, capacity, rate, now))
+            allowed = all(level >= cost for level, (_, _, _, cost) in zip(levels, buckets))
+            if allowed:
+                levels = [level - cost for level, (_, _, _, cost) in zip(levels, buckets)]
+            for level, (key, _, _, _) in zip(levels, buckets):
+                self._buckets[key] = (level, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return allowed, levels
+
+
+# Same all-or-nothing take as MemoryRateLimitStore, atomically on the Redis server.
+# KEYS: bucket keys. ARGV: now, then capacity, refill_per_s, cost for each bucket.
+_TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local allowed = 1
+for i = 1, #KEYS do
+  local capacity = tonumber(ARGV[i * 3 - 1])
+  local rate = tonumber(ARGV[i * 3])
+  local cost = tonumber(ARGV[i * 3 + 1])
+  local state = redis.call('HMGET', KEYS[i], 't', 'u')
+  local tokens = capacity
+  if state[1] then
+    tokens = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+  end
+  levels[i] = tokens
+  if tokens < cost then allowed = 0 end
+end
+local result = {allowed}
+for i = 1, #KEYS do
+  local capacity = tonumber(ARGV[i * 3 - 1])
+  local rate = tonumber(ARGV[i * 3])
+  if allowed == 1 then levels[i] = levels[i] - tonumber(ARGV[i * 3 + 1]) end
+  redis.call('HSET', KEYS[i], 't', tostring(levels[i]), 'u', tostring(now))
+  redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 1)
+  result[i + 1] = tostring(levels[i])
+end
+return result
+"""
+
+
+class RedisRateLimitStore:
+    """One Redis hash per bucket, updated by a Lua script so concurrent instances can't overspend."""
+
+    name = "redis"
+
+    def __init__(self, url=REDIS_URL):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    def take(self, buckets, now):
+        keys = [f"{KEY_PREFIX}:{key}" for key, _, _, _ in buckets]
+        args = [now]
+        for _, capacity, rate, cost in buckets:
+            args.extend((capacity, rate, cost))
+        result = self._take(keys=keys, args=args)
+        return bool(int(result[0])), [float(level) for level in result[1:]]
+
+
+class RateLimiter:
+    def __init__(self, store, rules=None, user_capacity=RATE_LIMIT_USER_CAPACITY,
+                 user_refill_per_s=RATE_LIMIT_USER_REFILL_PER_S):
+        self.store = store
+        self.rules = rules if rules is not None else _load_rules()
+        self.user_capacity = user_capacity
+        self.user_refill_per_s = user_refill_per_s
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        self.store_errors = 0
+
+    def check(self, client_ip, endpoint, now=None):
+        """Decision for one request, or None if the endpoint isn't limited."""
+        rule = self.rules.get(endpoint)
+        if rule is None:
+            return None
+        cost, per_minute = rule
+        route_rate = per_minute / 60.0
+        buckets = [
+            (f"ip:{client_ip}", self.user_capacity, self.user_refill_per_s, cost),
+            (f"route:ip:{client_ip}:{endpoint}", per_minute, route_rate, 1),
+        ]
+        try:
+            allowed, levels = self.store.take(buckets, now if now is not None else time.time())
+        except Exception as e:
+            logger.warning("Rate limit store failed, allowing request", extra={"endpoint": endpoint, "error": str(e)})
+            with self._stats_lock:
+                self.store_errors += 1
+            return None
+
+        # Expressed in calls of this endpoint: whichever bucket runs out first
+        user_left, route_left = levels
+        remaining = max(0, int(min(user_left / cost if cost else math.inf, route_left)))
+        limit = int(min(self.user_capacity / cost if cost else math.inf, per_minute))
+        reset_s = math.ceil(max((self.user_capacity - user_left) / self.user_refill_per_s,
+                                (per_minute - route_left) / route_rate))
+        retry_after_s = 0
+        if not allowed:
+            retry_after_s = math.ceil(max((cost - user_left) / self.user_refill_per_s,
+                                          (1 - route_left) / route_rate, 1))
+        self._record(endpoint, allowed)
+        return Decision(allowed, limit, remaining, reset_s, retry_after_s)
+
+    def _record(self, endpoint, allowed):
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {"allowed": 0, "rejected": 0})
+            stats["allowed" if allowed else "rejected"] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {"store": self.store.name, "store_errors": self.store_errors,
+                    "endpoints": {endpoint: dict(stats) for endpoint, stats in self._stats.items()}}
+
+
+def create_rate_limit_store(store: str = None):
+    store = store or RATE_LIMIT_STORE
+    if store == "memory":
+        return MemoryRateLimitStore()
+    if store == "redis":
+        return RedisRateLimitStore()
+    if store == "off":
+        return NullRateLimitStore()
+    raise ValueError(f"Unknown RATE_LIMIT_STORE: {store}")
+
+
+def client_ip(request, trusted_hops=None):
+    """
+    The address the trusted proxy saw: the X-Forwarded-For entry `trusted_hops` from the end
+    (the proxy appends it after whatever the client sent), else remote_addr. Never reads the body.
+    """
+    trusted_hops = RATE_LIMIT_TRUSTED_PROXY_HOPS if trusted_hops is None else trusted_hops
+    if trusted_hops > 0:
+        hops = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return request.remote_addr or "unknown"
+
+
+def init_rate_limiting(app):
+    """Reject over-budget requests with 429 before the view runs; add RateLimit-* headers."""
+    from flask import request, g, jsonify
+
+    if RATE_LIMIT_STORE == "off":
+        return
+    limiter = RateLimiter(create_rate_limit_store())
+
+    @app.before_request
+    def _check_rate_limit():
+        if request.method == "OPTIONS" or request.endpoint not in limiter.rules:
+            return None
+        decision = limiter.check(client_ip(request), request.endpoint)
+        if decision is None:
+            return None
+        if not decision.allowed:
+            response = jsonify({"error": "Rate limit exceeded", "retry_after": decision.retry_after_s})
+            response.status_code = 429
+            response.headers.update(decision.headers())
+            return response
+        g.rate_limit = decision
+        return None
+
+    @app.after_request
+    def _rate_limit_headers(response):
+        decision = g.pop("rate_limit", None)
+        if decision is not None:
+            response.headers.update(decision.headers())
+        return response
+
+    register_metrics("rate_limit", limiter.stats)
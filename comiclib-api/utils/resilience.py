@@ -0,0 +1,207 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.metrics import register_metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Per-model circuit breaker: after BREAKER_FAILURE_THRESHOLD consecutive failures the model
+# is skipped for BREAKER_RESET_S, then a single probe call decides whether it closes again.
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_S = float(os.environ.get("BREAKER_RESET_S", 60))
+RESILIENCE_WORKERS = int(os.environ.get("RESILIENCE_WORKERS", 16))
+LATENCY_WINDOW = 200
+
+
+class ModelUnavailableError(Exception):
+    """Every candidate model failed, timed out or was short-circuited."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_s=BREAKER_RESET_S):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+                # Let exactly one probe through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit opened", extra={"model": self.name, "failures": self.failures})
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class _ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.served_as_fallback = 0
+        self.hedges = 0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self):
+        ordered = sorted(self.latencies_ms)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1) if ordered else None
+
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "served_as_fallback": self.served_as_fallback,
+            "hedges": self.hedges,
+            "latency_p50_ms": pct(0.5),
+            "latency_p95_ms": pct(0.95),
+        }
+
+
+_breakers = {}
+_stats = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=RESILIENCE_WORKERS, thread_name_prefix="resilience")
+
+
+def _get(name):
+    with _lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+            _stats[name] = _ModelStats()
+        return _breakers[name], _stats[name]
+
+
+def _record(name, field, latency_ms=None):
+    breaker, stats = _get(name)
+    with _lock:
+        setattr(stats, field, getattr(stats, field) + 1)
+        if latency_ms is not None:
+            stats.latencies_ms.append(latency_ms)
+
+
+def call_with_fallback(candidates, call, deadline_s, hedge_delay_s=None, non_retryable=()):
+    """
+    Run call(model) against the first available candidate, falling back in order.
+
+    - A failed attempt starts the next candidate immediately.
+    - If hedge_delay_s is set and the current attempt is still running after that long,
+      the next candidate is started in parallel and the first success wins.
+    - Nothing waits past deadline_s; attempts still running are abandoned (their
+      outcome is still recorded against their breaker when they finish).
+    - Exceptions in non_retryable (e.g. a content refusal) are raised as-is and
+      don't count against the model's breaker.
+    """
+    queue = list(candidates)
+    pending = {}
+    errors = []
+
+    def attempt(model):
+        breaker, _ = _get(model)
+        started = time.perf_counter()
+        try:
+            result = call(model)
+        except non_retryable:
+            breaker.record_success()
+            raise
+        except Exception:
+            breaker.record_failure()
+            _record(model, "failures", (time.perf_counter() - started) * 1000)
+            raise
+        breaker.record_success()
+        _record(model, "successes", (time.perf_counter() - started) * 1000)
+        return result
+
+    def launch_next(hedge=False):
+        while queue:
+            model = queue.pop(0)
+            breaker, _ = _get(model)
+            if not breaker.allow():
+                _record(model, "short_circuited")
+                errors.append(f"{model}: circuit open")
+                continue
+            _record(model, "calls")
+            if hedge:
+                _record(model, "hedges")
+            pending[_executor.submit(attempt, model)] = model
+            return True
+        return False
+
+    deadline_at = time.monotonic() + deadline_s
+    hedge_at = time.monotonic() + hedge_delay_s if hedge_delay_s else None
+    launch_next()
+
+    while pending:
+        now = time.monotonic()
+        wake_at = min(deadline_at, hedge_at) if hedge_at and queue else deadline_at
+        done, _ = wait(list(pending), timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            model = pending.pop(future)
+            try:
+                result = future.result()
+            except non_retryable:
+                raise
+            except Exception as e:
+                errors.append(f"{model}: {e}")
+                logger.warning("Model attempt failed", extra={"model": model, "error": str(e)})
+                continue
+            if model != candidates[0]:
+                _record(model, "served_as_fallback")
+            return result, model
+
+        now = time.monotonic()
+        if now >= deadline_at:
+            errors.extend(f"{model}: deadline exceeded" for model in pending.values())
+            break
+        if not pending:
+            launch_next()
+        elif not done and hedge_at and now >= hedge_at and queue:
+            logger.info("Hedging slow model call", extra={"model": list(pending.values())[0]})
+            launch_next(hedge=True)
+            hedge_at = now + hedge_delay_s
+
+    raise ModelUnavailableError("; ".join(errors) or "no model available")
+
+
+def resilience_stats():
+    with _lock:
+        names = list(_breakers)
+    result = {}
+    for name in names:
+        breaker, stats = _get(name)
+        with _lock:
+            entry = stats.snapshot()
+        entry["circuit"] = breaker.state
+        result[name] = entry
+    return result
+
+
+register_metrics("models", resilience_stats)
@@ -0,0 +1,128 @@
+import os
+import gzip
+import hashlib
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from utils.metrics import Counters, register_metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_counters = Counters(
+    "json_responses", "not_modified", "compressed_gzip", "compressed_br",
+    "bytes_uncompressed", "bytes_sent", "bytes_saved_not_modified", "bytes_saved_compression"
+)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify() through orjson when available; falls back to the stdlib encoder."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def _etag_tokens(header):
+    return {token.strip().removeprefix("W/").strip('"') for token in header.split(",") if token.strip()}
+
+
+def _choose_encoding(accept_encoding):
+    accept_encoding = accept_encoding.lower()
+    if brotli is not None and "br" in accept_encoding:
+        return "br"
+    if "gzip" in accept_encoding:
+        return "gzip"
+    return None
+
+
+def _finalize_json(response):
+    """ETag + conditional GET + compression for successful JSON GET responses."""
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+    if response.mimetype != "application/json" or response.is_streamed or response.direct_passthrough:
+        return response
+    if response.headers.get("Content-Encoding"):
+        return response
+
+    body = response.get_data()
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    _counters.incr("json_responses")
+    _counters.incr("bytes_uncompressed", len(body))
+
+    encoding = _choose_encoding(request.headers.get("Accept-Encoding", "")) if len(body) >= COMPRESS_MIN_BYTES else None
+    # Strong ETag per representation: the compressed variant gets its own tag
+    etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+    # Keep any Vary the view already set (e.g. Origin from CORS)
+    response.vary.add("Accept-Encoding")
+    response.headers.setdefault("Cache-Control", "no-cache")
+
+    # "*" matches any current representation; otherwise any representation of the same body does
+    tokens = _etag_tokens(request.headers.get("If-None-Match", ""))
+    if "*" in tokens or digest in {t.split("-")[0] for t in tokens}:
+        _counters.incr("not_modified")
+        _counters.incr("bytes_saved_not_modified", len(body))
+        response.status_code = 304
+        response.set_data(b"")
+        response.headers["ETag"] = etag
+        response.headers.pop("Content-Length", None)
+        response.headers.pop("Content-Type", None)
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    else:
+        compressed = None
+
+    if compressed is not None and len(compressed) < len(body):
+        _counters.incr(f"compressed_{encoding}")
+        _counters.incr("bytes_saved_compression", len(body) - len(compressed))
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        response.headers["ETag"] = etag
+        _counters.incr("bytes_sent", len(compressed))
+    else:
+        response.headers["ETag"] = f'"{digest}"'
+        _counters.incr("bytes_sent", len(body))
+    return response
+
+
+def _bandwidth_metrics():
+    stats = _counters.snapshot()
+    uncompressed = stats["bytes_uncompressed"]
+    stats["bandwidth_saved_ratio"] = round(1 - stats["bytes_sent"] / uncompressed, 4) if uncompressed else 0.0
+    stats["json_encoder"] = "orjson" if orjson is not None else "stdlib"
+    return stats
+
+
+def init_response_layer(app):
+    app.json = OrjsonProvider(app)
+    app.after_request(_finalize_json)
+    register_metrics("responses", _bandwidth_metrics)
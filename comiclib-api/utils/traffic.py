@@ -0,0 +1,186 @@
+import os
+import hmac
+import json
+import time
+import queue
+import random
+import hashlib
+import logging
+import functools
+import contextlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from utils.metrics import Counters, register_metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Opt-in request trace recorder for capacity planning (replayed by benchmarks/replay_traffic.py).
+# With TRAFFIC_RECORD_DIR unset no hooks are installed. Each sampled request becomes one JSON line:
+# route template, anonymized params, body/response sizes, status, duration and the time spent in
+# each downstream call (Gemini, Naver, DB, image fetch). Lines go through a queue to a rotating file,
+# so request threads never block on disk I/O.
+TRAFFIC_RECORD_DIR = os.environ.get("TRAFFIC_RECORD_DIR")
+TRAFFIC_RECORD_SAMPLE_RATE = float(os.environ.get("TRAFFIC_RECORD_SAMPLE_RATE", 1.0))
+TRAFFIC_RECORD_MAX_BYTES = int(os.environ.get("TRAFFIC_RECORD_MAX_BYTES", 50 * 1024 * 1024))
+TRAFFIC_RECORD_BACKUPS = int(os.environ.get("TRAFFIC_RECORD_BACKUPS", 10))
+# Keyed hash for identifying values; set it to keep the same user -> token mapping across restarts
+TRAFFIC_RECORD_SALT = os.environ.get("TRAFFIC_RECORD_SALT") or os.urandom(16).hex()
+TRAFFIC_QUEUE_SIZE = 10000
+
+# Values kept in clear: numbers and flags. Everything else (user ids, queries, URLs, keywords) is hashed.
+_CLEAR_VALUES = {"true", "false", "1", "0", "yes", "no", ""}
+
+_counters = Counters("recorded", "dropped")
+_queue = None
+_listener = None
+_trace_logger = logging.getLogger("comiclib.traffic")
+
+
+def recording_enabled():
+    return bool(TRAFFIC_RECORD_DIR)
+
+
+def anonymize(value):
+    value = str(value)
+    if value.lower() in _CLEAR_VALUES or value.lstrip("-").isdigit():
+        return value
+    digest = hmac.new(TRAFFIC_RECORD_SALT.encode(), value.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"anon:{digest[:12]}"
+
+
+def _current_trace():
+    from flask import has_request_context, g
+    return g.get("traffic_trace") if has_request_context() else None
+
+
+@contextlib.contextmanager
+def downstream(name):
+    """Time a downstream call into the current request's trace (no-op when it isn't recorded)."""
+    trace = _current_trace()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        trace["downstream"].append({
+            "name": name,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "ok": ok,
+        })
+
+
+class _TimedProxy:
+    """Wraps every method call of `target` in downstream(f"{prefix}.{method}")."""
+
+    def __init__(self, target, prefix):
+        self._target = target
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        @functools.wraps(attr)
+        def timed(*args, **kwargs):
+            with downstream(f"{self._prefix}.{name}"):
+                return attr(*args, **kwargs)
+        return timed
+
+
+def timed_proxy(target, prefix):
+    return _TimedProxy(target, prefix) if recording_enabled() else target
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _counters.incr("dropped")
+
+
+def _start_writer():
+    global _queue, _listener
+    os.makedirs(TRAFFIC_RECORD_DIR, exist_ok=True)
+    # One file per process (Cloud Run / gunicorn workers each write their own)
+    path = os.path.join(TRAFFIC_RECORD_DIR, f"traffic-{os.getpid()}.jsonl")
+    file_handler = RotatingFileHandler(path, maxBytes=TRAFFIC_RECORD_MAX_BYTES,
+                                       backupCount=TRAFFIC_RECORD_BACKUPS, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    _queue = queue.Queue(maxsize=TRAFFIC_QUEUE_SIZE)
+    _trace_logger.handlers = [_DroppingQueueHandler(_queue)]
+    _trace_logger.setLevel(logging.INFO)
+    _trace_logger.propagate = False
+    _listener = QueueListener(_queue, file_handler)
+    _listener.start()
+    logger.info("Traffic recording enabled", extra={"path": path, "sample_rate": TRAFFIC_RECORD_SAMPLE_RATE})
+
+
+def _file_sizes(request):
+    # Only report uploads the view already parsed; never force parsing from here
+    files = request.__dict__.get("files")
+    if not files:
+        return []
+    sizes = []
+    for file in files.values():
+        size = getattr(file.stream, "size", None)
+        if size is None:
+            try:
+                size = os.fstat(file.stream.fileno()).st_size
+            except (AttributeError, OSError, ValueError):
+                size = None
+        sizes.append(size)
+    return sizes
+
+
+def init_traffic_recording(app):
+    """Install the recorder hooks only when TRAFFIC_RECORD_DIR is set (zero overhead otherwise)."""
+    if not recording_enabled():
+        return
+    from flask import request, g
+
+    _start_writer()
+
+    @app.before_request
+    def _start_trace():
+        if random.random() >= TRAFFIC_RECORD_SAMPLE_RATE:
+            return
+        g.traffic_trace = {"downstream": []}
+        g.traffic_started = time.perf_counter()
+        g.traffic_ts = time.time()
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = g.pop("traffic_trace", None)
+        if trace is None:
+            return response
+        content_type = (request.content_type or "").split(";")[0]
+        trace.update({
+            "ts": round(g.pop("traffic_ts"), 3),
+            "method": request.method,
+            "route": request.url_rule.rule if request.url_rule else None,
+            "blueprint": request.blueprint,
+            "endpoint": request.endpoint,
+            "view_args": {k: anonymize(v) for k, v in (request.view_args or {}).items()},
+            "args": {k: [anonymize(v) for v in request.args.getlist(k)] for k in request.args},
+            "content_type": content_type or None,
+            "request_bytes": request.content_length or 0,
+            "file_bytes": _file_sizes(request),
+            "status": response.status_code,
+            "response_bytes": response.calculate_content_length() if not response.is_streamed else None,
+            "duration_ms": round((time.perf_counter() - g.pop("traffic_started")) * 1000, 2),
+        })
+        _trace_logger.info(json.dumps(trace, ensure_ascii=False))
+        _counters.incr("recorded")
+        return response
+
+    register_metrics("traffic_recording", _counters.snapshot)
@@ -0,0 +1,147 @@
+import os
+import hashlib
+import tempfile
+from flask import Request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from utils.metrics import Counters, register_metrics
+
+# Multipart uploads are parsed in chunks straight into UploadSpool objects: every file is
+# size-checked, hashed and format-sniffed as its bytes arrive, and only files larger than
+# UPLOAD_SPOOL_THRESHOLD touch the disk. Peak memory per upload is bounded by the threshold.
+UPLOAD_MAX_REQUEST_BYTES = int(os.environ.get("UPLOAD_MAX_REQUEST_BYTES", 40 * 1024 * 1024))
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get("UPLOAD_MAX_FILE_BYTES", 15 * 1024 * 1024))
+UPLOAD_SPOOL_THRESHOLD = int(os.environ.get("UPLOAD_SPOOL_THRESHOLD", 512 * 1024))
+# Non-file form fields (keywords etc.) are small
+UPLOAD_MAX_FORM_MEMORY = int(os.environ.get("UPLOAD_MAX_FORM_MEMORY", 1024 * 1024))
+UPLOAD_MAX_FORM_PARTS = 50
+
+SNIFF_BYTES = 32
+
+IMAGE_MIME_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "heic": "image/heic",
+    "avif": "image/avif",
+}
+
+_counters = Counters("files", "bytes", "spooled_to_disk", "rejected_too_large")
+
+
+def sniff_image_format(head):
+    """Image format from the first bytes of a file, or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"hevc", b"heim", b"heis", b"mif1", b"msf1"):
+            return "heic"
+        if brand in (b"avif", b"avis"):
+            return "avif"
+    return None
+
+
+class UploadSpool:
+    """
+    Werkzeug file-part container: a SpooledTemporaryFile that enforces max_bytes and
+    computes sha256 / sniffed format while the parser writes into it.
+    """
+
+    def __init__(self, max_bytes=None, threshold=None):
+        self.max_bytes = UPLOAD_MAX_FILE_BYTES if max_bytes is None else max_bytes
+        self.size = 0
+        self.format = None
+        self._complete = False
+        self._head = b""
+        self._sha256 = hashlib.sha256()
+        self._file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD if threshold is None else threshold)
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            _counters.incr("rejected_too_large")
+            self._file.close()
+            raise RequestEntityTooLarge(f"File exceeds the {self.max_bytes // (1024 * 1024)} MB limit")
+        if len(self._head) < SNIFF_BYTES:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self.format = sniff_image_format(self._head)
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    def seek(self, *args):
+        # The parser rewinds once the part is complete
+        if not self._complete:
+            self._complete = True
+            if self.format is None and self._head:
+                self.format = sniff_image_format(self._head)
+            _counters.incr("files")
+            _counters.incr("bytes", self.size)
+            if self.on_disk:
+                _counters.incr("spooled_to_disk")
+        return self._file.seek(*args)
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    @property
+    def on_disk(self):
+        return getattr(self._file, "_rolled", False)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    max_form_memory_size = UPLOAD_MAX_FORM_MEMORY
+    max_form_parts = UPLOAD_MAX_FORM_PARTS
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Reject a part that declares its own oversize length before reading it
+        if content_length is not None and content_length > UPLOAD_MAX_FILE_BYTES:
+            _counters.incr("rejected_too_large")
+            raise RequestEntityTooLarge(f"File exceeds the {UPLOAD_MAX_FILE_BYTES // (1024 * 1024)} MB limit")
+        return UploadSpool()
+
+
+def upload_info(file_storage):
+    """{"size", "sha256", "format", "mime_type"} for a file parsed by UploadRequest."""
+    stream = file_storage.stream
+    if not isinstance(stream, UploadSpool):
+        # Fallback for streams not created by UploadRequest (e.g. tests building FileStorage by hand)
+        data = stream.read()
+        stream.seek(0)
+        fmt = sniff_image_format(data[:SNIFF_BYTES])
+        return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest(), "format": fmt,
+                "mime_type": IMAGE_MIME_TYPES.get(fmt)}
+    return {"size": stream.size, "sha256": stream.sha256, "format": stream.format,
+            "mime_type": IMAGE_MIME_TYPES.get(stream.format)}
+
+
+def read_upload(file_storage):
+    file_storage.stream.seek(0)
+    return file_storage.stream.read()
+
+
+def init_uploads(app):
+    """Bounded, streaming multipart parsing for every route."""
+    app.request_class = UploadRequest
+    # Requests that declare a larger body are rejected before any of it is read
+    app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_REQUEST_BYTES
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def _too_large(e):
+        return jsonify({"error": e.description or "Request too large"}), 413
+
+    register_metrics("uploads", _counters.snapshot)